@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#################################################################
+#  Benchmark reprodutível do renoma.py                          #
+#    • Gera mídias sintéticas localmente (ffmpeg lavfi)         #
+#    • Mede vazão dos lotes de vídeo e áudio                    #
+#    • Mede custo de probe / spawn de processos                 #
+#    • Mede listagem, ordenação natural e plano de renomeação   #
+#  Resultados em JSON, para comparar execuções ao longo do tempo#
+#################################################################
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+from pathlib import Path
+
+# O cache de probes do benchmark fica isolado do cache do usuário.
+_BENCH_CACHE = tempfile.mkdtemp(prefix="renoma-bench-cache-")
+os.environ['RENOMA_CACHE_DIR'] = _BENCH_CACHE
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import renoma  # noqa: E402
+
+# (nome, duração em s, contêiner, args de vídeo, args de áudio ou None)
+VIDEO_FIXTURES = [
+    ("h264_aac_curto", 5, "mkv", ["-c:v", "libx264", "-preset", "ultrafast"], ["-c:a", "aac"]),
+    ("h264_aac_medio", 20, "mkv", ["-c:v", "libx264", "-preset", "ultrafast"], ["-c:a", "aac"]),
+    ("mpeg4_mp3", 10, "avi", ["-c:v", "mpeg4", "-q:v", "5"], ["-c:a", "libmp3lame"]),
+    ("h264_sem_audio", 10, "mkv", ["-c:v", "libx264", "-preset", "ultrafast"], None),
+]
+AUDIO_FIXTURES = [("tom_curto", 10, "flac"), ("tom_longo", 60, "flac"), ("tom_wav", 30, "wav")]
+
+def make_fixtures(root: Path, copies: int):
+    """Gera `copies` cópias de cada mídia sintética em root/video e root/audio."""
+    video_dir, audio_dir = root / "video", root / "audio"
+    video_dir.mkdir(parents=True, exist_ok=True); audio_dir.mkdir(parents=True, exist_ok=True)
+    for name, dur, ext, vargs, aargs in VIDEO_FIXTURES:
+        first = video_dir / f"{name}_00.{ext}"
+        cmd = [renoma.FFMPEG, "-nostdin", "-y", "-v", "error",
+               "-f", "lavfi", "-i", f"testsrc2=size=640x360:rate=25:duration={dur}"]
+        if aargs: cmd += ["-f", "lavfi", "-i", f"sine=frequency=440:duration={dur}"]
+        cmd += [*vargs, *(aargs or []), "-shortest", str(first)]
+        subprocess.run(cmd, check=True)
+        for i in range(1, copies): shutil.copyfile(first, video_dir / f"{name}_{i:02d}.{ext}")
+    for name, dur, ext in AUDIO_FIXTURES:
+        first = audio_dir / f"{name}_00.{ext}"
+        subprocess.run([renoma.FFMPEG, "-nostdin", "-y", "-v", "error", "-f", "lavfi",
+                        "-i", f"sine=frequency=440:duration={dur}", "-ac", "2", str(first)], check=True)
+        for i in range(1, copies): shutil.copyfile(first, audio_dir / f"{name}_{i:02d}.{ext}")
+    return video_dir, audio_dir
+
+def _reset_probe_cache():
+    """Esvazia memória e cache SQLite de probes, para medir o caso frio."""
+    renoma._probe_memo.clear()
+    renoma._probe_cache = None
+    db = Path(_BENCH_CACHE) / renoma.PROBE_CACHE_FILE
+    for suffix in ("", "-wal", "-shm"): Path(str(db) + suffix).unlink(missing_ok=True)
+
+def bench_spawn(repeats):
+    """Custo de criar um processo do ffmpeg (`-version`)."""
+    start = time.perf_counter()
+    for _ in range(repeats):
+        subprocess.run([renoma.FFMPEG, "-hide_banner", "-version"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return {'repeats': repeats, 'ms_per_spawn': (time.perf_counter() - start) * 1000 / repeats}
+
+def bench_probe(files):
+    """Custo por arquivo do probe frio (ffprobe), morno (SQLite) e quente (memória)."""
+    _reset_probe_cache()
+    t0 = time.perf_counter()
+    for f in files: renoma.probe_media(f)
+    cold = time.perf_counter() - t0
+    renoma._probe_memo.clear()
+    t0 = time.perf_counter()
+    for f in files: renoma.probe_media(f)
+    warm = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    for f in files: renoma.probe_media(f)
+    hot = time.perf_counter() - t0
+    n = max(1, len(files))
+    return {'files': len(files), 'cold_ms_per_file': cold * 1000 / n,
+            'sqlite_ms_per_file': warm * 1000 / n, 'memory_ms_per_file': hot * 1000 / n}
+
+def _media_seconds(files):
+    return sum(renoma.get_duration(str(f)) for f in files)
+
+def bench_video_batch(video_dir: Path, jobs, out_ext="mp4"):
+    """Vazão do lote de vídeo (libx264 ultrafast, sempre re-encodando) com N jobs."""
+    files = sorted(p for p in video_dir.iterdir() if p.suffix.lower() != f".{out_ext}")
+    encoder = {'name': 'libx264 ultrafast', 'codec': 'libx264', 'preset': 'ultrafast'}
+    threads = renoma.split_thread_budget(renoma.default_core_budget(), jobs)
+    media = _media_seconds(files)
+    t0 = time.perf_counter()
+    ok = sum(1 for _, res in renoma.run_job_pool(
+        files, lambda f, slot: renoma.convert_one_video(f, out_ext, encoder, 3, threads=threads,
+                                                        position=slot, remux='never'), jobs) if res is True)
+    wall = time.perf_counter() - t0
+    for f in files: f.with_suffix(f".{out_ext}").unlink(missing_ok=True)
+    return {'jobs': jobs, 'files': len(files), 'ok': ok, 'wall_s': wall,
+            'files_per_s': len(files) / wall, 'media_s_per_wall_s': media / wall}
+
+def bench_audio_batch(audio_dir: Path, preset_keys):
+    """Vazão do lote de áudio (sequencial, como no menu), com um ou vários presets por origem."""
+    files = sorted(audio_dir.iterdir())
+    presets = [renoma.AUDIO_PRESETS[k] for k in preset_keys]
+    media = _media_seconds(files)
+    t0 = time.perf_counter()
+    ok = sum(1 for f in files if renoma.convert_one_audio(f, presets) is True)
+    wall = time.perf_counter() - t0
+    for f in files:
+        for dst in renoma.audio_outputs_for(f, presets): dst.unlink(missing_ok=True)
+    return {'presets': preset_keys, 'files': len(files), 'ok': ok, 'wall_s': wall,
+            'files_per_s': len(files) / wall, 'media_s_per_wall_s': media / wall}
+
+def bench_listing(root: Path, entries):
+    """Listagem, ordenação natural e plano de renomeação numa pasta com `entries` arquivos vazios."""
+    big = root / "listagem"; big.mkdir(exist_ok=True)
+    for i in range(entries): (big / f"Episodio {i} - Titulo.mkv").touch()
+    cwd = os.getcwd(); os.chdir(big)
+    try:
+        t0 = time.perf_counter(); names = renoma.list_files_with_extension("mkv"); t_list = time.perf_counter() - t0
+        t0 = time.perf_counter(); renoma.iter_files_with_extension("mkv"); t_iter = time.perf_counter() - t0
+        t0 = time.perf_counter(); ordered = sorted(names, key=renoma.natural_sort_key); t_sort = time.perf_counter() - t0
+        t0 = time.perf_counter(); plan = renoma.plan_season_renames(ordered, "Serie", "01", "mkv"); t_plan = time.perf_counter() - t0
+    finally:
+        os.chdir(cwd)
+    return {'entries': entries, 'list_s': t_list, 'iter_sorted_s': t_iter,
+            'natural_sort_s': t_sort, 'plan_renames_s': t_plan, 'planned': len(plan)}
+
+def compare(current, previous_path):
+    """Imprime a razão atual/anterior dos tempos e vazões de uma execução anterior."""
+    previous = json.loads(Path(previous_path).read_text(encoding='utf-8'))['results']
+    print(f"\n>> Comparação com '{previous_path}' (razão atual/anterior):")
+    for section, value in current.items():
+        rows = value if isinstance(value, list) else [value]
+        old_rows = previous.get(section)
+        old_rows = old_rows if isinstance(old_rows, list) else [old_rows]
+        for new, old in zip(rows, old_rows):
+            if not old: continue
+            for key, v in new.items():
+                if key.endswith(('_s', '_ms_per_file', '_per_s', 'ms_per_spawn')) and old.get(key):
+                    print(f"   {section}.{key}: {v / old[key]:.2f}x")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark reprodutível do renoma.py")
+    parser.add_argument("--copies", type=int, default=3, help="cópias de cada mídia sintética (padrão: 3)")
+    parser.add_argument("--jobs", type=int, nargs="+", default=[1, max(2, renoma.default_core_budget() // 4)],
+                        help="níveis de paralelismo do lote de vídeo")
+    parser.add_argument("--entries", type=int, default=100_000, help="arquivos na pasta do teste de listagem")
+    parser.add_argument("--spawns", type=int, default=20, help="repetições do teste de spawn")
+    parser.add_argument("--skip", nargs="*", default=[], choices=["video", "audio", "probe", "listing"])
+    parser.add_argument("--output", default="bench_results.json", help="arquivo JSON de saída")
+    parser.add_argument("--compare", help="JSON de uma execução anterior para comparar")
+    args = parser.parse_args()
+
+    if not os.path.isfile(renoma.FFMPEG): sys.exit("ERRO: FFmpeg não encontrado.")
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="renoma-bench-") as tmp:
+        root = Path(tmp)
+        print(">> Gerando mídias sintéticas...")
+        video_dir, audio_dir = make_fixtures(root, args.copies)
+        results['spawn'] = bench_spawn(args.spawns)
+        if "probe" not in args.skip:
+            results['probe'] = bench_probe(sorted(video_dir.iterdir()) + sorted(audio_dir.iterdir()))
+        if "video" not in args.skip:
+            results['video_batch'] = [bench_video_batch(video_dir, j) for j in args.jobs]
+        if "audio" not in args.skip:
+            results['audio_batch'] = [bench_audio_batch(audio_dir, ['2']), bench_audio_batch(audio_dir, ['2', '3'])]
+        if "listing" not in args.skip:
+            print(f">> Criando {args.entries} arquivos para o teste de listagem...")
+            results['listing'] = bench_listing(root, args.entries)
+    shutil.rmtree(_BENCH_CACHE, ignore_errors=True)
+
+    report = {'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S"), 'python': platform.python_version(),
+              'platform': platform.platform(), 'cpu_count': renoma.default_core_budget(),
+              'ffmpeg': renoma.ffmpeg_fingerprint(), 'results': results}
+    Path(args.output).write_text(json.dumps(report, indent=2), encoding='utf-8')
+    print(json.dumps(results, indent=2))
+    print(f"\n>> Resultados gravados em '{args.output}'.")
+    if args.compare: compare(results, args.compare)
+
+if __name__ == "__main__":
+    main()
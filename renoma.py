@@ -11,15 +11,40 @@
 
 import os
 import sys
+import asyncio
+import argparse
 import re
 import glob
+import json
+import errno
+import ctypes
+import ctypes.util
+import select
+import struct
+import fnmatch
 import shutil
+import sqlite3
+import tempfile
+import threading
 import time
 import subprocess
 import platform
+import queue
+import socket
+import itertools
+import collections
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, asdict, fields, replace as dataclass_replace
+from typing import ClassVar, List, Optional
 from pathlib import Path
 from tqdm import tqdm
 
+try:
+    import resource  # tempo de CPU dos processos filhos (indisponível no Windows)
+except ImportError:
+    resource = None
+
 # ────────────────────────── Configurações ──────────────────────────
 BANNER_COLORS = [
     '\033[0;31m', '\033[1;31m', '\033[0;32m', '\033[1;32m',
@@ -35,7 +60,55 @@ IS_ANDROID = 'com.termux' in os.environ.get('PREFIX', '')
 FFMPEG = shutil.which("ffmpeg") or ("ffmpeg.exe" if IS_WINDOWS else "/usr/bin/ffmpeg")
 FFPROBE = shutil.which("ffprobe") or ("ffprobe.exe" if IS_WINDOWS else "/usr/bin/ffprobe")
 VAAPI_DEVICE = "/dev/dri/renderD128"
-WATCHDOG_TIMEOUT = 120
+WATCHDOG_TIMEOUT = 120         # segundos sem avanço do ffmpeg antes de abortar o job
+WALLCLOCK_TIMEOUT = None       # limite total por job em segundos (None = sem limite)
+MAX_PARALLEL_JOBS = 1          # conversões simultâneas padrão (1 = sequencial)
+SCAN_WORKERS = 8               # listagens de pastas simultâneas na varredura paralela
+PROBE_CACHE_FILE = "probe_cache.sqlite"
+PROBE_MEMO_MAX = 4096  # probes mantidos em memória por processo; os usados há mais tempo saem primeiro
+THROUGHPUT_CACHE_FILE = "throughput.sqlite"  # vazão aprendida por codificador e resolução
+THROUGHPUT_DECAY = 0.9         # peso do histórico a cada job novo (jobs recentes valem mais)
+JOB_ORDERS = {'natural': 'Ordem NATURAL dos nomes', 'longest': 'Mais LONGOS primeiro (melhor encaixe em paralelo)',
+              'shortest': 'Mais CURTOS primeiro (resultados parciais mais cedo)'}
+# Codecs de vídeo que podem ser copiados (-c:v copy) para cada contêiner de saída.
+REMUX_VIDEO_CODECS = {'mp4': {'h264', 'hevc'}, 'mkv': {'h264', 'hevc'}}
+SEGMENT_MIN_DURATION = 20 * 60  # só divide em segmentos vídeos com pelo menos 20 min
+SEGMENT_THREADS = 4             # threads do ffmpeg por segmento no modo dividido
+JOURNAL_FILE = ".renoma_journal.jsonl"  # diário do lote, gravado na pasta dos arquivos
+CALIBRATION_FILE = "encoder_calibration.json"
+METRICS_JSONL = os.environ.get('RENOMA_METRICS_JSONL')        # padrão: jobs.jsonl no diretório de cache
+METRICS_PROM_TEXTFILE = os.environ.get('RENOMA_PROM_TEXTFILE')  # ex.: /var/lib/node_exporter/textfile/renoma.prom
+LADDER_SEGMENT_SECONDS = 6     # duração dos segmentos HLS/DASH (keyframes alinhados entre degraus)
+HLS_MASTER, DASH_MANIFEST = "master.m3u8", "manifest.mpd"
+DEFAULT_LISTEN = "127.0.0.1:7070"  # endereço padrão do coordenador (host:porta ou unix:/caminho.sock)
+HEARTBEAT_INTERVAL = 5         # segundos entre heartbeats de um worker ocupado
+HEARTBEAT_TIMEOUT = 30         # sem notícias por esse tempo, o job do worker volta para a fila
+DISTRIBUTED_MAX_ATTEMPTS = 3   # tentativas de um job antes de contar como erro
+SAMPLE_COUNT = 3               # trechos codificados na previsão de tamanho
+SAMPLE_SECONDS = 8             # duração de cada trecho de amostra
+FINGERPRINT_CACHE_FILE = "audio_fingerprints.sqlite"
+FINGERPRINT_CACHE_MAX = 50_000  # entradas por tabela; as menos usadas saem primeiro (LRU)
+SCRATCH_DIR = os.environ.get('RENOMA_SCRATCH_DIR')  # disco rápido (SSD/tmpfs) para preparar os jobs
+IO_PER_DEVICE = None           # jobs simultâneos lendo/escrevendo no mesmo dispositivo (None = sem limite)
+UNDO_FILE = ".renoma_undo.jsonl"  # diário para desfazer a última renomeação, gravado na pasta raiz
+RENAME_TMP_PREFIX = ".renoma-tmp-"  # nomes temporários usados para quebrar ciclos (a↔b)
+STAGE_PREFIX = ".renoma-stage-"    # pastas de preparo: .renoma-stage-<máquina>-<pid>-<aleatório>
+RENAME_VIDEO_EXTS = "mp4,mkv,avi,rmvb"  # extensões renomeadas no modo biblioteca
+ENCODE_NICE = None             # niceness dos ffmpeg de codificação (0-19; None = a do renoma)
+ENCODE_IONICE = None           # prioridade de disco: 'idle', 'best-effort' ou 'best-effort:<0-7>' (None = padrão)
+PROBE_TIMEOUT = 60             # limite de um ffprobe de metadados
+TOOL_TIMEOUT = 30 * 60         # limite dos ffmpeg/ffprobe auxiliares que leem o arquivo inteiro
+GOVERNOR_INTERVAL = 5          # segundos entre leituras do governador de recursos
+GOVERNOR_MAX_LOAD = 1.25       # carga média (1 min) por núcleo acima da qual o governador reduz o trabalho
+GOVERNOR_MIN_FREE_MB = 512     # memória disponível mínima (MemAvailable)
+GOVERNOR_MIN_BATTERY = 30      # % de bateria mínima quando fora da tomada
+GOVERNOR_MAX_TEMP = 42         # °C da bateria (Android) acima dos quais o governador reduz o trabalho
+GOVERNOR_RAISE_AFTER = 3       # leituras folgadas seguidas antes de devolver um job/threads
+WATCH_SETTLE_SECONDS = 10      # tempo sem mudar de tamanho/mtime para um arquivo novo ser processado
+WATCH_POLL_INTERVAL = 5        # segundos entre verificações no modo polling (sem inotify)
+CALIBRATION_SECONDS = 5        # duração do clipe sintético de teste
+CALIBRATION_X264_PRESETS = ['ultrafast', 'superfast', 'veryfast', 'faster', 'fast', 'medium']
+CALIBRATION_SIZE_MARGIN = 1.15 # no teste, até 15% maior que o preset padrão da CPU ainda pode ser o padrão
 
 def print_art(current_color_index=0):
     """Função para imprimir a arte ASCII"""
@@ -69,17 +142,133 @@ def clear_screen():
     """Limpa a tela de forma multiplataforma"""
     os.system('cls' if IS_WINDOWS else 'clear')
 
+def get_cache_dir():
+    """Diretório do cache persistente (RENOMA_CACHE_DIR, ou o cache padrão do sistema)."""
+    base = os.environ.get('RENOMA_CACHE_DIR')
+    if not base:
+        if IS_WINDOWS: base = os.path.join(os.environ.get('LOCALAPPDATA') or str(Path.home()), 'renoma')
+        else: base = os.path.join(os.environ.get('XDG_CACHE_HOME') or str(Path.home() / '.cache'), 'renoma')
+    path = Path(base)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+# ─────────────── Metadados (ffprobe único + cache SQLite) ───────────────
+class MediaInfo:
+    """Resultado de um único ffprobe (-show_format -show_streams) de um arquivo."""
+
+    def __init__(self, data):
+        self.data = data
+        self.format = data.get('format') or {}
+        self.streams = data.get('streams') or []
+
+    def streams_of(self, codec_type):
+        return [st for st in self.streams if st.get('codec_type') == codec_type]
+
+    @property
+    def video_streams(self):
+        # Capas anexadas (attached_pic) não contam como vídeo.
+        return [st for st in self.streams_of('video') if not (st.get('disposition') or {}).get('attached_pic')]
+
+    @property
+    def audio_streams(self):
+        return self.streams_of('audio')
+
+    @property
+    def duration(self):
+        """Duração em segundos, ou None se o ffprobe não informou."""
+        try:
+            return float(self.format.get('duration'))
+        except (TypeError, ValueError):
+            return None
+
+    @property
+    def first_audio_codec(self):
+        audio = self.audio_streams
+        if not audio: return None
+        return (audio[0].get('codec_name') or '').lower() or None
+
+class ProbeCache:
+    """Cache SQLite de saídas do ffprobe, válido enquanto (caminho, tamanho, mtime_ns) não mudar."""
+
+    def __init__(self, db_path):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(db_path), timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""CREATE TABLE IF NOT EXISTS probes (
+                path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, data TEXT NOT NULL)""")
+
+    def get(self, path, size, mtime_ns):
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM probes WHERE path = ? AND size = ? AND mtime_ns = ?",
+                                     (path, size, mtime_ns)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, path, size, mtime_ns, data):
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO probes (path, size, mtime_ns, data) VALUES (?, ?, ?, ?)",
+                               (path, size, mtime_ns, json.dumps(data)))
+
+_probe_cache = None
+_probe_cache_lock = threading.Lock()
+_probe_memo = collections.OrderedDict()  # (caminho, tamanho, mtime_ns) -> MediaInfo, LRU até PROBE_MEMO_MAX
+_probe_memo_lock = threading.Lock()
+
+def _memo_get(key):
+    with _probe_memo_lock:
+        info = _probe_memo.get(key)
+        if info is not None: _probe_memo.move_to_end(key)
+        return info
+
+def _memo_put(key, info):
+    with _probe_memo_lock:
+        _probe_memo[key] = info; _probe_memo.move_to_end(key)
+        while len(_probe_memo) > PROBE_MEMO_MAX: _probe_memo.popitem(last=False)
+    return info
+
+def get_probe_cache():
+    """Abre (uma vez) o cache de probes; retorna None se o disco não permitir."""
+    global _probe_cache
+    with _probe_cache_lock:
+        if _probe_cache is None:
+            try: _probe_cache = ProbeCache(get_cache_dir() / PROBE_CACHE_FILE)
+            except (OSError, sqlite3.Error): _probe_cache = False
+        return _probe_cache or None
+
+def probe_media(file_path):
+    """
+    Retorna o MediaInfo de um arquivo com um único ffprobe em JSON.
+    Consulta primeiro a memória e o cache SQLite; retorna None se o probe falhar.
+    """
+    try:
+        path = os.path.abspath(str(file_path)); st = os.stat(path)
+    except OSError:
+        return None
+    key = (path, st.st_size, st.st_mtime_ns)
+    info = _memo_get(key)
+    if info is not None: return info
+    cache = get_probe_cache()
+    data = cache.get(*key) if cache else None
+    if data is None:
+        returncode, out = run_media_tool([FFPROBE, '-v', 'error', '-show_format', '-show_streams', '-of', 'json', path],
+                                         PROBE_TIMEOUT, text=True)
+        try:
+            if returncode != 0: return None
+            data = json.loads(out)
+        except ValueError:
+            return None
+        if cache:
+            try: cache.put(*key, data)
+            except sqlite3.Error: pass
+    return _memo_put(key, MediaInfo(data))
+
 def get_duration(file_path):
     """Obtém a duração de um arquivo de mídia em segundos"""
-    try:
-        result = subprocess.check_output([
-            FFPROBE, '-v', 'error', '-show_entries', 'format=duration',
-            '-of', 'default=noprint_wrappers=1:nokey=1', file_path
-        ], text=True, stderr=subprocess.DEVNULL)
-        return float(result.strip())
-    except Exception:
-        print(f"  ⚠️  Não foi possível obter a duração de {file_path}. Usando valor padrão.")
-        return 1.0
+    info = probe_media(file_path)
+    if info is not None and info.duration:
+        return info.duration
+    print(f"  ⚠️  Não foi possível obter a duração de {file_path}. Usando valor padrão.")
+    return 1.0
 
 def natural_sort_key(s):
     """
@@ -90,54 +279,128 @@ def natural_sort_key(s):
             for text in re.split(r'([0-9]+)', s)]
 
 # ───────── Auxiliares para áudio / listagem de arquivos ─────────
-def list_files_with_extension(ext):
-    """Lista arquivos por extensão (case-insensitive), retornando nomes (str)."""
-    ext = ext.lower().lstrip('.')
-    return [p.name for p in Path('.').iterdir()
-            if p.is_file() and p.suffix.lower() == f'.{ext}']
-
-def iter_files_with_extension(ext):
-    """Lista arquivos por extensão (case-insensitive), retornando Paths ordenados naturalmente."""
-    ext = ext.lower().lstrip('.')
-    return sorted([p for p in Path('.').iterdir()
-                   if p.is_file() and p.suffix.lower() == f'.{ext}'],
-                  key=lambda p: natural_sort_key(p.name))
+def parse_extensions(exts):
+    """Normaliza 'mkv,AVI' / ['.mkv', 'avi'] em {'mkv', 'avi'}."""
+    if isinstance(exts, str): exts = exts.split(',')
+    return {e.strip().lower().lstrip('.') for e in exts if e and e.strip()}
+
+def _scandir_files(path, exts):
+    """Arquivos de `path` com extensão em `exts`; o tipo vem do dirent, sem stat extra na maioria dos sistemas."""
+    with os.scandir(path) as it:
+        return [e for e in it if e.is_file() and os.path.splitext(e.name)[1][1:].lower() in exts]
+
+def list_files_with_extension(ext, root='.'):
+    """Lista arquivos de `root` por extensão (case-insensitive), retornando nomes (str)."""
+    return [e.name for e in _scandir_files(root, parse_extensions(ext))]
+
+def iter_files_with_extension(ext, root='.'):
+    """Lista arquivos de `root` por extensão (case-insensitive), retornando Paths ordenados naturalmente."""
+    return [Path(root) / name for name in sorted(list_files_with_extension(ext, root), key=natural_sort_key)]
+
+def is_ladder_package(path):
+    """Pasta HLS/DASH gerada pela escada ('nome_hls' com a playlist principal, 'nome_dash' com o manifesto)."""
+    name = os.path.basename(path)
+    if name.endswith('_hls'): return os.path.isfile(os.path.join(path, HLS_MASTER))
+    if name.endswith('_dash'): return os.path.isfile(os.path.join(path, DASH_MANIFEST))
+    return False
+
+def _matches(rel, name, patterns):
+    return any(fnmatch.fnmatch(rel, pat) or fnmatch.fnmatch(name, pat) for pat in patterns)
+
+def _list_dir(path, rel, exts, include, exclude):
+    """Lista uma pasta numa passada de os.scandir: (arquivos aceitos em ordem natural, subpastas)."""
+    files, subdirs = [], []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                child_rel = f"{rel}/{entry.name}" if rel else entry.name
+                if exclude and _matches(child_rel, entry.name, exclude): continue
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        # Pastas ocultas incluem as temporárias do próprio renoma (.renoma-seg-*); as
+                        # pastas HLS/DASH da escada são saídas, não origens.
+                        if not entry.name.startswith('.') and not is_ladder_package(entry.path): subdirs.append((entry.path, child_rel))
+                    elif entry.is_file() and os.path.splitext(entry.name)[1][1:].lower() in exts:
+                        if not include or _matches(child_rel, entry.name, include): files.append(entry.path)
+                except OSError:
+                    continue
+    except OSError as e:
+        tqdm.write(f"  ⚠️  Não foi possível listar '{path}': {e}")
+    files.sort(key=lambda f: natural_sort_key(os.path.basename(f)))
+    subdirs.sort(key=lambda d: natural_sort_key(d[1]))
+    return files, subdirs
+
+def walk_media_dirs(root='.', exts=(), recursive=False, include=None, exclude=None, workers=1):
+    """
+    Gera (pasta, caminho relativo, [arquivos]) à medida que as pastas são listadas,
+    uma passada de os.scandir por pasta. include/exclude são globs (fnmatch) testados
+    no caminho relativo e no nome; exclude também poda pastas. Com workers > 1, várias
+    pastas são listadas ao mesmo tempo (útil em NFS/SMB, onde cada listagem espera
+    pela rede); a ordem entre pastas deixa de ser determinística, mas cada pasta
+    sai em ordem natural.
+    """
+    exts, include, exclude = parse_extensions(exts), list(include or []), list(exclude or [])
+    root = str(root)
+    if workers <= 1 or not recursive:
+        pending = [(root, '')]
+        while pending:
+            path, rel = pending.pop(0)
+            files, subdirs = _list_dir(path, rel, exts, include, exclude)
+            yield path, rel, files
+            if recursive: pending[0:0] = subdirs  # profundidade primeiro, preservando a ordem natural
+        return
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        _list = carry_job_context(_list_dir)
+        running = {pool.submit(_list, root, '', exts, include, exclude): (root, '')}
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                path, rel = running.pop(future)
+                files, subdirs = future.result()
+                for sub_path, sub_rel in subdirs:
+                    running[pool.submit(_list, sub_path, sub_rel, exts, include, exclude)] = (sub_path, sub_rel)
+                yield path, rel, files
+
+def scan_media_files(root='.', exts=(), recursive=False, include=None, exclude=None, workers=1):
+    """
+    Gera (Path) os arquivos de `root` com extensão em `exts` conforme walk_media_dirs
+    os encontra, para que a conversão comece antes do fim da varredura.
+    """
+    for _, _, files in walk_media_dirs(root, exts, recursive, include, exclude, workers):
+        for f in files: yield Path(os.path.relpath(f) if str(root) == '.' else f)
+
+def seed_probe(file_path, data):
+    """Usa um probe feito em outra máquina (mesmo arquivo no storage compartilhado) sem rodar o ffprobe."""
+    try: st = os.stat(file_path)
+    except OSError: return
+    _memo_put((os.path.abspath(str(file_path)), st.st_size, st.st_mtime_ns), MediaInfo(data))
+
+def alias_probe(original, copy):
+    """Reaproveita o probe de `original` para uma cópia idêntica (hardlink ou cópia de preparo), sem novo ffprobe."""
+    info = probe_media(original)
+    try: st = os.stat(copy)
+    except OSError: return
+    if info: _memo_put((os.path.abspath(str(copy)), st.st_size, st.st_mtime_ns), info)
 
 def probe_first_audio_codec(file_path):
     """Retorna o codec de áudio (str) do primeiro stream, ou None."""
-    try:
-        out = subprocess.check_output([
-            FFPROBE, '-v', 'error',
-            '-select_streams', 'a:0',
-            '-show_entries', 'stream=codec_name',
-            '-of', 'default=noprint_wrappers=1:nokey=1',
-            str(file_path)
-        ], text=True, stderr=subprocess.DEVNULL).strip()
-        return out.lower() if out else None
-    except Exception:
-        return None
+    info = probe_media(file_path)
+    return info.first_audio_codec if info else None
 
 def has_audio_stream(file_path):
     """True se arquivo tem stream de áudio."""
-    try:
-        out = subprocess.check_output([
-            FFPROBE, '-v', 'error',
-            '-select_streams', 'a',
-            '-show_entries', 'stream=index',
-            '-of', 'csv=p=0', str(file_path)
-        ], text=True, stderr=subprocess.DEVNULL).strip()
-        return bool(out)
-    except Exception:
-        return False
+    info = probe_media(file_path)
+    return bool(info and info.audio_streams)
 
 def choose_audio_params(src: Path, out_ext: str):
     """
     MP4: copia se for compatível (aac/mp3/ac3/eac3/alac); senão, re-encoda para AAC.
     MKV: copia praticamente tudo. Se não houver áudio, retorna [].
     """
-    if not has_audio_stream(src):
+    info = probe_media(src)
+    if not (info and info.audio_streams):
         return []
-    codec = probe_first_audio_codec(src)
+    codec = info.first_audio_codec
     if out_ext.lower() == 'mp4':
         allowed = {'aac', 'mp3', 'ac3', 'eac3', 'alac'}
         if codec in allowed:
@@ -147,7 +410,1251 @@ def choose_audio_params(src: Path, out_ext: str):
     else:
         return ['-c:a', 'copy']
 
+# ───────────────── Supervisor assíncrono do ffmpeg ─────────────────
+def format_eta(seconds):
+    """Formata segundos como H:MM:SS (ou '?' se desconhecido)."""
+    if seconds is None or seconds < 0: return "?"
+    seconds = int(seconds)
+    return f"{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+def parse_progress_block(block, duration):
+    """Converte um bloco chave=valor do `-progress` em estatísticas numéricas (fps, speed, ETA...)."""
+    def _num(key, strip=''):
+        try: return float(block.get(key, '').rstrip(strip))
+        except ValueError: return None
+    # out_time_ms também vem em microssegundos (nome histórico do ffmpeg).
+    out_us = _num('out_time_us')
+    if out_us is None: out_us = _num('out_time_ms')
+    out_time = max(0.0, out_us / 1_000_000) if out_us is not None else None
+    stats = {'out_time': out_time, 'frame': _num('frame'), 'fps': _num('fps'), 'speed': _num('speed', 'x'),
+             'bitrate': block.get('bitrate', 'N/A').strip(), 'total_size': _num('total_size'),
+             'percent': None, 'eta': None}
+    if out_time is not None and duration:
+        stats['percent'] = min(100.0, out_time * 100 / duration)
+        if stats['speed']: stats['eta'] = max(0.0, (duration - out_time) / stats['speed'])
+    return stats
+
+async def supervise_ffmpeg(cmd, duration=None, bar=None, on_progress=None,
+                           watchdog_timeout=None, wallclock_timeout=None):
+    """
+    Executa o ffmpeg (com `-progress pipe:1` no cmd) e lê o progresso sem bloquear.
+    Os limites de tempo valem mesmo que o ffmpeg pare de escrever:
+      • watchdog_timeout: segundos sem avanço de out_time;
+      • wallclock_timeout: duração total máxima do job.
+    Retorna (returncode, stats) com as últimas estatísticas e o tempo decorrido.
+    """
+    watchdog_timeout = WATCHDOG_TIMEOUT if watchdog_timeout is None else watchdog_timeout
+    wallclock_timeout = WALLCLOCK_TIMEOUT if wallclock_timeout is None else wallclock_timeout
+    loop = asyncio.get_running_loop()
+    proc = await asyncio.create_subprocess_exec(*priority_prefix(), *map(str, cmd), stdin=subprocess.DEVNULL,
+                                                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                                **priority_spawn_kwargs())
+    apply_encode_nice(proc.pid)
+    start = last_advance = loop.time()
+    block, stats, abort_reason = {}, {}, None
+    last_out_time = -1.0
+    while True:
+        now = loop.time()
+        remaining = watchdog_timeout - (now - last_advance)
+        if wallclock_timeout: remaining = min(remaining, wallclock_timeout - (now - start))
+        if remaining <= 0:
+            if wallclock_timeout and now - start >= wallclock_timeout: abort_reason = f"Tempo máximo de {wallclock_timeout}s excedido"
+            else: abort_reason = f"Sem progresso por {watchdog_timeout}s"
+            break
+        try:
+            raw = await asyncio.wait_for(proc.stdout.readline(), timeout=remaining)
+        except asyncio.TimeoutError:
+            continue  # o laço recalcula os prazos e aborta se for o caso
+        if not raw: break
+        key, _, value = raw.decode('utf-8', errors='replace').strip().partition('=')
+        block[key] = value
+        if key != 'progress': continue
+        # 'progress=' fecha um bloco completo de estatísticas.
+        stats = parse_progress_block(block, duration); block = {}
+        if stats['out_time'] is not None and stats['out_time'] > last_out_time:
+            last_out_time = stats['out_time']; last_advance = loop.time()
+        if bar is not None:
+            if stats['percent'] is not None: bar.n = int(stats['percent'])
+            parts = []
+            if stats['fps']: parts.append(f"{stats['fps']:.0f}fps")
+            if stats['speed']: parts.append(f"{stats['speed']:.2f}x")
+            if stats['eta'] is not None: parts.append(f"ETA {format_eta(stats['eta'])}")
+            bar.set_postfix_str(" ".join(parts), refresh=False); bar.refresh()
+        if on_progress is not None: on_progress(stats)
+    if abort_reason:
+        (bar.write if bar is not None else tqdm.write)(f"⚠️  {abort_reason}. Abortando...")
+        try: proc.kill()
+        except ProcessLookupError: pass
+    returncode = await proc.wait()
+    stats = dict(stats, elapsed=loop.time() - start, aborted=abort_reason)
+    return returncode, stats
+
+_job_context = threading.local()  # on_progress e quiet do job que roda nesta thread (workers, API)
+
+class _ConsoleGate:
+    """sys.stdout/sys.stderr que descarta o que as threads com `_job_context.quiet` escrevem (prints e tqdm)."""
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    def write(self, text):
+        if getattr(_job_context, 'quiet', False): return len(text)
+        return self._stream.write(text)
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+_console_gate_lock = threading.Lock()
+_console_gate_users = [0]
+
+def install_console_gate():
+    """
+    Instala o filtro de console (contado por usuário); enquanto instalado,
+    `_job_context.quiet = True` silencia a thread. Desfaça com release_console_gate().
+    """
+    with _console_gate_lock:
+        _console_gate_users[0] += 1
+        if not isinstance(sys.stdout, _ConsoleGate): sys.stdout = _ConsoleGate(sys.stdout)
+        if not isinstance(sys.stderr, _ConsoleGate): sys.stderr = _ConsoleGate(sys.stderr)
+
+def release_console_gate():
+    """Quando o último usuário sai, devolve os sys.stdout/sys.stderr originais (se ninguém os trocou depois)."""
+    with _console_gate_lock:
+        if _console_gate_users[0] == 0: return
+        _console_gate_users[0] -= 1
+        if _console_gate_users[0]: return
+        if isinstance(sys.stdout, _ConsoleGate): sys.stdout = sys.stdout._stream
+        if isinstance(sys.stderr, _ConsoleGate): sys.stderr = sys.stderr._stream
+
+def carry_job_context(fn):
+    """Envolve fn para rodar em outra thread (pool, varredura) com o modo silencioso da thread atual."""
+    quiet = getattr(_job_context, 'quiet', False)
+    def _run(*args, **kwargs):
+        previous, _job_context.quiet = getattr(_job_context, 'quiet', False), quiet
+        try: return fn(*args, **kwargs)
+        finally: _job_context.quiet = previous
+    return _run
+
+def run_ffmpeg_with_progress(cmd, duration=None, desc=None, position=None, on_progress=None):
+    """
+    Caminho único de execução do ffmpeg para os conversores: barra tqdm opcional
+    (quando `desc` é dado) e supervisão assíncrona. Retorna (returncode, stats).
+    Sem `on_progress`, usa o da thread atual (_job_context), se houver.
+    """
+    on_progress = on_progress or getattr(_job_context, 'on_progress', None)
+    bar = None
+    if desc is not None:
+        bar = tqdm(total=100, desc=desc, ncols=100, unit="%", position=position, leave=position is None)
+    try:
+        returncode, stats = asyncio.run(supervise_ffmpeg(cmd, duration, bar, on_progress))
+        if bar is not None and returncode == 0: bar.n = 100; bar.refresh()
+    finally:
+        if bar is not None: bar.close()
+    return returncode, stats
+
+def progress_desc(src: Path, verb="Convertendo"):
+    """Rótulo da barra de progresso, truncando nomes longos."""
+    return f"{verb} {src.name[:40]}..." if len(src.name) > 40 else f"{verb} {src.name}"
+
+# ──────────────────── Métricas por job (JSONL / Prometheus) ────────────────────
+def child_cpu_seconds():
+    """CPU (usuário + sistema) já consumida pelos processos filhos encerrados; None sem `resource`."""
+    if resource is None: return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+_metrics_lock = threading.Lock()
+_prom_counters = {}
+_prom_gauges = {}
+
+def _prom_labels(labels):
+    """Formata rótulos no formato de exposição do Prometheus (escapando \\ e aspas)."""
+    def _esc(value): return str(value).replace('\\', '\\\\').replace('"', '\\"')
+    return ",".join(f'{k}="{_esc(v)}"' for k, v in sorted(labels.items()))
+
+def write_prom_textfile(path):
+    """Regrava o textfile do node_exporter (troca atômica, para nunca ser lido pela metade)."""
+    lines = []
+    for kind, metrics in (('counter', _prom_counters), ('gauge', _prom_gauges)):
+        for name, (help_text, series) in sorted(metrics.items()):
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            lines += [f"{name}{{{labels}}} {value}" for labels, value in sorted(series.items())]
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as fh: fh.write("\n".join(lines) + "\n")
+    os.replace(tmp, path)
+
+def export_job_metrics(record):
+    """Anexa o registro ao JSONL e atualiza os contadores do textfile Prometheus (se configurado)."""
+    with _metrics_lock:
+        try:
+            jsonl = METRICS_JSONL or str(get_cache_dir() / "jobs.jsonl")
+            with open(jsonl, 'a', encoding='utf-8') as fh: fh.write(json.dumps(record, ensure_ascii=False) + "\n")
+        except OSError:
+            pass
+        if not METRICS_PROM_TEXTFILE: return
+        # Contadores acumulados desde o início deste processo (o Prometheus trata os reinícios).
+        labels = _prom_labels({'kind': record['kind'], 'encoder': record['encoder']})
+        status = _prom_labels({'kind': record['kind'], 'encoder': record['encoder'], 'status': 'ok' if record['ok'] else 'failed'})
+        def _add(name, help_text, key, value):
+            series = _prom_counters.setdefault(name, (help_text, {}))[1]
+            series[key] = series.get(key, 0) + (value or 0)
+        _add('renoma_jobs_total', 'Jobs de conversão concluídos.', status, 1)
+        _add('renoma_job_input_bytes_total', 'Bytes lidos das origens.', labels, record['input_bytes'])
+        _add('renoma_job_output_bytes_total', 'Bytes gravados nas saídas.', labels, record['output_bytes'])
+        _add('renoma_job_media_seconds_total', 'Segundos de mídia processados.', labels, record['duration'])
+        _add('renoma_job_wall_seconds_total', 'Tempo de relógio gasto nos jobs.', labels, record['wall_time'])
+        _add('renoma_job_child_cpu_seconds_total', 'CPU dos processos ffmpeg.', labels, record['child_cpu'])
+        _prom_gauges.setdefault('renoma_last_job_speed', ('Multiplicador de velocidade do último job.', {}))[1][labels] = record['speed'] or 0
+        _prom_gauges.setdefault('renoma_last_job_timestamp_seconds', ('Fim do último job (epoch).', {}))[1][labels] = record['ts']
+        try: write_prom_textfile(METRICS_PROM_TEXTFILE)
+        except OSError: pass
+
+def output_size(path):
+    """Tamanho de uma saída em bytes; pastas (HLS/DASH) somam todos os arquivos dentro. None se não existir."""
+    path = Path(path)
+    if path.is_dir():
+        total = 0
+        for dirpath, _, names in os.walk(path):
+            for name in names:
+                try: total += os.stat(os.path.join(dirpath, name)).st_size
+                except OSError: pass
+        return total
+    try: return path.stat().st_size
+    except OSError: return None
+
+class JobMetrics:
+    """
+    Mede um job de conversão do início ao fim e exporta um registro legível por máquina.
+    Com jobs simultâneos, o CPU dos filhos é aproximado: RUSAGE_CHILDREN soma todos
+    os processos filhos encerrados no intervalo do job.
+    Jobs em preparo (run_staged) são registrados pelos caminhos da biblioteca: a origem
+    original e as saídas onde serão publicadas.
+    """
+
+    def __init__(self, kind, src, encoder):
+        self.kind, self.src, self.encoder = kind, staged_origin(src), encoder
+        self.started = time.time()
+        self.cpu_start = child_cpu_seconds()
+
+    def finish(self, outputs, exit_code, ok, stats=None):
+        wall = time.time() - self.started
+        cpu_end = child_cpu_seconds()
+        outputs = [Path(o) for o in outputs]  # medidas aqui, antes da publicação
+        duration = (probe_media(self.src) or MediaInfo({})).duration
+        frames = (stats or {}).get('frame')
+        record = {
+            'ts': round(time.time(), 3), 'host': platform.node(), 'kind': self.kind,
+            'src': os.path.abspath(str(self.src)), 'outputs': [os.path.abspath(str(staged_origin(o))) for o in outputs],
+            'encoder': self.encoder, 'exit_code': exit_code, 'ok': bool(ok),
+            'input_bytes': self.src.stat().st_size if self.src.exists() else None,
+            'output_bytes': sum(output_size(o) or 0 for o in outputs),
+            'duration': duration, 'wall_time': round(wall, 3),
+            'speed': round(duration / wall, 3) if duration and wall > 0 else None,
+            'avg_fps': round(frames / wall, 2) if frames and wall > 0 else None,
+            'child_cpu': round(cpu_end - self.cpu_start, 3) if cpu_end is not None else None,
+        }
+        export_job_metrics(record)
+        if ok and duration and wall > 0:
+            history = get_throughput_history()
+            if history: history.record(self.encoder, resolution_class(self.src), duration, wall)
+        return record
+
+def encoder_metrics_key(encoder_info):
+    """Nome do codificador nas métricas e no histórico de vazão (o preset do x264 muda muito a velocidade)."""
+    encoder = encoder_info['codec']
+    return encoder if encoder != 'libx264' else f"libx264:{encoder_info.get('preset', 'medium')}"
+
+# ─────────────── Histórico de vazão e ordem dos jobs ───────────────
+def resolution_class(file_path):
+    """Altura do primeiro vídeo arredondada para a classe mais próxima (2160, 1080, 720...); 0 para áudio."""
+    info = probe_media(file_path)
+    video = info.video_streams if info else []
+    height = int(video[0].get('height') or 0) if video else 0
+    if not height: return 0
+    return min((2160, 1440, 1080, 720, 480, 360, 240), key=lambda c: abs(c - height))
+
+class ThroughputHistory:
+    """
+    Cache SQLite da vazão de execuções anteriores (segundos de mídia por segundo de
+    relógio) por (codificador, classe de resolução). As somas decaem a cada job
+    (THROUGHPUT_DECAY), então troca de máquina ou de ffmpeg é absorvida em poucos jobs.
+    """
+
+    def __init__(self, db_path):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(db_path), timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""CREATE TABLE IF NOT EXISTS throughput (
+                encoder TEXT NOT NULL, height INTEGER NOT NULL, media_s REAL NOT NULL, wall_s REAL NOT NULL,
+                jobs INTEGER NOT NULL, PRIMARY KEY (encoder, height))""")
+
+    def record(self, encoder, height, media_s, wall_s):
+        with self._lock, self._conn:
+            self._conn.execute("""INSERT INTO throughput (encoder, height, media_s, wall_s, jobs) VALUES (?, ?, ?, ?, 1)
+                ON CONFLICT (encoder, height) DO UPDATE SET media_s = media_s * ? + excluded.media_s,
+                wall_s = wall_s * ? + excluded.wall_s, jobs = jobs + 1""",
+                               (encoder, height, media_s, wall_s, THROUGHPUT_DECAY, THROUGHPUT_DECAY))
+
+    def rate(self, encoder, height):
+        """
+        Segundos de mídia por segundo de relógio, ou None sem histórico do codificador.
+        Sem histórico na mesma resolução, usa a classe mais próxima escalada pela área da imagem.
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT height, media_s / wall_s FROM throughput WHERE encoder = ? AND wall_s > 0",
+                                      (encoder,)).fetchall()
+        if not rows: return None
+        known, rate = min(rows, key=lambda r: abs(r[0] - height))
+        if known and height and known != height: rate *= (known / height) ** 2
+        return rate
+
+_throughput_history = None
+
+def get_throughput_history():
+    """Abre (uma vez) o histórico de vazão; retorna None se o disco não permitir."""
+    global _throughput_history
+    with _probe_cache_lock:
+        if _throughput_history is None:
+            try: _throughput_history = ThroughputHistory(get_cache_dir() / THROUGHPUT_CACHE_FILE)
+            except (OSError, sqlite3.Error): _throughput_history = False
+        return _throughput_history or None
+
+def predict_job_seconds(src, encoder):
+    """Tempo de relógio previsto para converter `src` com `encoder`, ou None sem histórico."""
+    history = get_throughput_history()
+    info = probe_media(src)
+    if not (history and info and info.duration): return None
+    rate = history.rate(encoder, resolution_class(src))
+    return info.duration / rate if rate else None
+
+def job_cost(src, estimate=None):
+    """Custo relativo de um job: a previsão do histórico (segundos), ou duração × área da imagem."""
+    predicted = estimate(src) if estimate else None
+    if predicted is not None: return predicted
+    info = probe_media(src)
+    height = resolution_class(src) or 360  # áudio pesa como um vídeo pequeno da mesma duração
+    return ((info.duration if info else None) or 0) * (height / 360) ** 2
+
+def order_jobs(files, order='natural', estimate=None):
+    """
+    Ordena os arquivos do lote: 'natural' mantém a ordem recebida; 'longest' (mais
+    caros primeiro, o que encurta o lote com jobs em paralelo) e 'shortest' usam
+    job_cost. As duas últimas precisam da lista completa (a varredura é concluída antes).
+    A previsão do histórico só é usada se existir para todos os arquivos; senão o lote
+    inteiro é comparado pelo substituto duração × área, para não misturar unidades.
+    """
+    if not order or order == 'natural': return files
+    if order not in JOB_ORDERS: raise ValueError(f"ordem inválida '{order}' (opções: {', '.join(JOB_ORDERS)})")
+    files = list(files)
+    predicted = [estimate(f) for f in files] if estimate else []
+    if estimate and all(p is not None for p in predicted): costs = predicted
+    else: costs = [job_cost(f) for f in files]
+    order_by = sorted(range(len(files)), key=costs.__getitem__, reverse=(order == 'longest'))
+    return [files[i] for i in order_by]
+
+# ─────────────────── Agendador de jobs paralelos ───────────────────
+class _JobSkipped:
+    """Resultado de um job que decidiu não converter: falso em `if ok:`, para nunca contar como sucesso."""
+    def __bool__(self): return False
+    def __repr__(self): return 'JOB_SKIPPED'
+
+JOB_SKIPPED = _JobSkipped()  # compare com `is`; nada a apagar nem a publicar
+def default_core_budget():
+    """Número de núcleos lógicos disponíveis (mínimo 1)."""
+    return os.cpu_count() or 1
+
+def split_thread_budget(core_budget, jobs):
+    """Divide o orçamento de núcleos entre os jobs simultâneos (mínimo 1 thread por job)."""
+    return max(1, int(core_budget) // max(1, int(jobs)))
+
+def run_job_pool(items, job_fn, max_jobs, limit=None, executor=None):
+    """
+    Executa job_fn(item, slot) com até max_jobs jobs simultâneos; com `limit`
+    (callable), o teto é consultado a cada submissão e pode mudar durante o lote.
+    Com `executor` (um pool compartilhado entre lotes), os jobs rodam nele em vez
+    de num pool próprio.
+    `slot` é a posição (0..max_jobs-1) reservada para a barra tqdm do job.
+    Gera tuplas (item, resultado) na ordem em que os jobs terminam;
+    uma exceção no job é reportada e vira resultado False.
+    `items` é lido numa thread própria, só quando há vaga: uma fonte lenta
+    (varredura em andamento, pasta monitorada) não atrasa os jobs que terminam.
+    Se o consumidor para antes do fim (CTRL+C), nada mais é submetido e um gerador
+    em `items` é fechado na própria thread que o lê.
+    """
+    max_jobs = max(1, int(max_jobs))
+    slots = queue.Queue()
+    for slot in range(max_jobs):
+        slots.put(slot)
+    running, changed = [0], threading.Condition()
+    finished = queue.Queue()
+    end, closing = object(), threading.Event()
+
+    @carry_job_context
+    def _run(item):
+        slot = slots.get()
+        try:
+            return job_fn(item, slot)
+        finally:
+            slots.put(slot)
+            with changed: running[0] -= 1; changed.notify()
+
+    with (nullcontext(executor) if executor else ThreadPoolExecutor(max_workers=max_jobs)) as pool:
+        def _feed():
+            submitted = 0
+            try:
+                for item in items:
+                    with changed:  # submissão preguiçosa: nunca mais que max_jobs (ou limit()) jobs em voo
+                        while running[0] >= max(1, min(max_jobs, limit() if limit else max_jobs)) and not closing.is_set():
+                            changed.wait(1.0)  # limit() pode subir sem que nenhum job termine
+                        if closing.is_set(): break
+                        running[0] += 1
+                    pool.submit(_run, item).add_done_callback(lambda f, item=item: finished.put((item, f)))
+                    submitted += 1
+            except Exception as e:
+                finished.put((end, (submitted, e))); return
+            finally:
+                if hasattr(items, 'close'): items.close()  # roda o `finally` do gerador (ex.: fecha o watcher)
+            finished.put((end, (submitted, None)))
+
+        threading.Thread(target=carry_job_context(_feed), daemon=True).start()
+        total, seen, error = None, 0, None
+        try:
+            while total is None or seen < total:
+                item, future = finished.get()
+                if item is end: total, error = future; continue
+                seen += 1
+                try:
+                    result = future.result()
+                except Exception as e:
+                    tqdm.write(f"❌ Falha inesperada no job '{item}': {e}")
+                    result = False
+                yield item, result
+        finally:
+            closing.set()
+            with changed: changed.notify_all()
+        if error is not None: raise error
+
+# ─────────────── Governador de recursos (prioridade, carga, bateria) ───────────────
+IONICE_CLASSES = {'realtime': '1', 'best-effort': '2', 'idle': '3'}
+
+def set_encode_priority(nice=None, ionice=None):
+    """Define a prioridade de CPU (nice) e de disco (ionice) dos próximos ffmpeg de codificação."""
+    global ENCODE_NICE, ENCODE_IONICE
+    if nice is not None and not 0 <= int(nice) <= 19: raise ValueError("--nice deve estar entre 0 e 19")
+    if ionice and ionice.partition(':')[0] not in IONICE_CLASSES:
+        raise ValueError(f"--ionice inválido '{ionice}' (opções: idle, best-effort, best-effort:<0-7>)")
+    if nice is not None: ENCODE_NICE = int(nice)
+    if ionice: ENCODE_IONICE = ionice
+
+def priority_prefix():
+    """Prefixo `ionice` do comando, quando pedido e disponível (Linux/Termux)."""
+    if not ENCODE_IONICE or IS_WINDOWS: return []
+    ionice = shutil.which('ionice')
+    if not ionice: return []
+    cls, _, level = ENCODE_IONICE.partition(':')
+    return [ionice, '-c', IONICE_CLASSES[cls], *(['-n', level] if level and cls != 'idle' else [])]
+
+def priority_spawn_kwargs():
+    """No Windows, a prioridade vai na criação do processo (classe de prioridade)."""
+    if not (IS_WINDOWS and ENCODE_NICE): return {}
+    return {'creationflags': subprocess.IDLE_PRIORITY_CLASS if ENCODE_NICE >= 15 else subprocess.BELOW_NORMAL_PRIORITY_CLASS}
+
+def apply_encode_nice(pid):
+    """Aplica ENCODE_NICE a um processo recém-criado (Unix); sem permissão, segue como está."""
+    if ENCODE_NICE is None or IS_WINDOWS: return
+    try: os.setpriority(os.PRIO_PROCESS, pid, max(ENCODE_NICE, os.getpriority(os.PRIO_PROCESS, 0)))
+    except (OSError, AttributeError): pass
+
+def run_media_tool(cmd, timeout=TOOL_TIMEOUT, text=False):
+    """
+    Executa um ffmpeg/ffprobe auxiliar (probe, amostra, impressão, contagem de quadros)
+    com a prioridade das codificações (ionice, nice, classe no Windows) e um limite de
+    tempo. Retorna (returncode, stdout); (None, None) se o processo não pôde ser criado
+    ou estourou o tempo e foi encerrado.
+    """
+    try:
+        proc = subprocess.Popen([*priority_prefix(), *map(str, cmd)], stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                                stderr=subprocess.DEVNULL, **({'encoding': 'utf-8', 'errors': 'replace'} if text else {}),
+                                **priority_spawn_kwargs())
+    except OSError:
+        return None, None
+    apply_encode_nice(proc.pid)
+    try:
+        out, _ = proc.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        proc.kill(); proc.communicate()
+        tqdm.write(f"⚠️  {Path(str(cmd[0])).name} excedeu {timeout}s e foi encerrado.")
+        return None, None
+    return proc.returncode, out
+
+def _read_sys(path):
+    """Conteúdo de um arquivo do sysfs, ou None (inexistente ou bloqueado, comum no Android)."""
+    try: return Path(path).read_text().strip()
+    except OSError: return None
+
+def _read_number(path, scale=1.0):
+    try: return float(_read_sys(path)) * scale
+    except (TypeError, ValueError): return None
+
+def read_host_resources():
+    """
+    Leitura atual do host; cada campo é None quando o sistema não informa:
+    load (carga de 1 min por núcleo), free_mb (MemAvailable), battery (%),
+    charging (bool) e temp (°C da bateria, Android).
+    """
+    sample = {'load': None, 'free_mb': None, 'battery': None, 'charging': None, 'temp': None}
+    try: sample['load'] = os.getloadavg()[0] / default_core_budget()
+    except (OSError, AttributeError): pass  # Windows; Android recente nega /proc/loadavg
+    try:
+        with open('/proc/meminfo', encoding='ascii') as fh:
+            for line in fh:
+                if line.startswith('MemAvailable:'): sample['free_mb'] = int(line.split()[1]) / 1024; break
+    except (OSError, ValueError): pass
+    supplies = sorted(glob.glob('/sys/class/power_supply/*'))
+    battery = next((d for d in supplies if _read_sys(Path(d, 'type')) == 'Battery'), None)
+    if battery and _read_sys(Path(battery, 'capacity')) is not None:
+        sample['battery'] = _read_number(Path(battery, 'capacity'))
+        status = _read_sys(Path(battery, 'status'))
+        if status: sample['charging'] = status in ('Charging', 'Full')
+        if IS_ANDROID: sample['temp'] = _read_number(Path(battery, 'temp'), 0.1)  # décimos de °C
+    elif IS_ANDROID:
+        sample.update(read_termux_battery())
+    return sample
+
+_termux_battery = {'at': 0.0, 'data': {}}
+
+def read_termux_battery():
+    """Bateria pelo Termux:API (quando o sysfs é bloqueado), no máximo uma vez por minuto."""
+    if time.monotonic() - _termux_battery['at'] < 60: return _termux_battery['data']
+    _termux_battery['at'], data = time.monotonic(), {}
+    tool = shutil.which('termux-battery-status')
+    if tool:
+        try:
+            status = json.loads(subprocess.run([tool], capture_output=True, text=True, timeout=10).stdout or '{}')
+            data = {'battery': status.get('percentage'), 'temp': status.get('temperature'),
+                    'charging': status.get('plugged') not in (None, 'UNPLUGGED')}
+        except (OSError, ValueError, subprocess.TimeoutExpired): pass
+    _termux_battery['data'] = data
+    return data
+
+class ResourceGovernor:
+    """
+    Ajusta, durante o lote, quantos jobs rodam ao mesmo tempo e quantas threads
+    cada ffmpeg novo recebe. A cada GOVERNOR_INTERVAL s lê o host (read_host_resources):
+    sob pressão (carga, memória, bateria fora da tomada, temperatura) tira um job,
+    ou divide as threads quando só resta um; depois de GOVERNOR_RAISE_AFTER leituras
+    folgadas seguidas devolve um passo. Sobe devagar e desce rápido, para o lote
+    ficar no ritmo que o host sustenta em vez de oscilar.
+    """
+
+    def __init__(self, max_jobs, threads=None, max_load=None, min_free_mb=None, min_battery=None, max_temp=None,
+                 interval=GOVERNOR_INTERVAL, read=read_host_resources):
+        self.max_jobs, self.jobs = max(1, int(max_jobs)), max(1, int(max_jobs))
+        self.auto_threads = threads is None  # sem -threads, o ffmpeg decide enquanto não houver pressão
+        self.max_threads = self.current_threads = threads or split_thread_budget(default_core_budget(), self.max_jobs)
+        self.max_load = GOVERNOR_MAX_LOAD if max_load is None else max_load
+        self.min_free_mb = GOVERNOR_MIN_FREE_MB if min_free_mb is None else min_free_mb
+        self.min_battery = GOVERNOR_MIN_BATTERY if min_battery is None else min_battery
+        self.max_temp = GOVERNOR_MAX_TEMP if max_temp is None else max_temp
+        self.interval, self.read = interval, read
+        self._healthy, self._stop, self._thread = 0, threading.Event(), None
+
+    def limit(self):
+        """Jobs simultâneos permitidos agora (o `limit` de run_job_pool)."""
+        return self.jobs
+
+    def threads(self):
+        """Threads para o próximo ffmpeg, ou None (decisão do ffmpeg) fora de pressão."""
+        if self.auto_threads and self.current_threads == self.max_threads: return None
+        return self.current_threads
+
+    def pressure(self, sample):
+        """Motivo para reduzir o trabalho agora, ou None."""
+        if sample['load'] is not None and sample['load'] > self.max_load: return f"carga {sample['load']:.2f}/núcleo"
+        if sample['free_mb'] is not None and sample['free_mb'] < self.min_free_mb: return f"{sample['free_mb']:.0f} MB livres"
+        if sample['temp'] is not None and sample['temp'] > self.max_temp: return f"bateria a {sample['temp']:.0f}°C"
+        if sample['battery'] is not None and sample['charging'] is False and sample['battery'] < self.min_battery:
+            return f"bateria em {sample['battery']:.0f}% fora da tomada"
+        return None
+
+    def comfortable(self, sample):
+        """Folga para devolver trabalho: abaixo dos limites com margem (histerese)."""
+        if sample['load'] is not None and sample['load'] > self.max_load * 0.8: return False
+        if sample['free_mb'] is not None and sample['free_mb'] < self.min_free_mb * 2: return False
+        if sample['temp'] is not None and sample['temp'] > self.max_temp - 3: return False
+        return True
+
+    def step(self, sample=None):
+        """Uma decisão do governador; retorna o motivo quando o nível muda."""
+        sample = sample or self.read()
+        before = (self.jobs, self.current_threads)
+        reason = self.pressure(sample)
+        if reason:
+            self._healthy = 0
+            if self.jobs > 1: self.jobs -= 1
+            else: self.current_threads = max(1, self.current_threads // 2)
+        elif self.comfortable(sample):
+            self._healthy += 1
+            if self._healthy >= GOVERNOR_RAISE_AFTER:
+                self._healthy = 0
+                if self.current_threads < self.max_threads: self.current_threads = min(self.max_threads, self.current_threads * 2)
+                elif self.jobs < self.max_jobs: self.jobs += 1
+                reason = "folga"
+        else:
+            self._healthy = 0
+        if (self.jobs, self.current_threads) == before: return None
+        tqdm.write(f"🌡️  Recursos ({reason}): {self.jobs} job(s) × {self.threads() or 'auto'} thread(s).")
+        return reason
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try: self.step()
+            except Exception as e: tqdm.write(f"  ⚠️  Governador de recursos: leitura falhou ({e}).")
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=carry_job_context(self._loop), daemon=True); self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None: self._thread.join(); self._thread = None
+
+def governor_from_opts(opts, max_jobs, threads=None):
+    """
+    ResourceGovernor de um lote (opts: governor = auto/on/off, max_load, min_free_mb,
+    min_battery, max_temp), ou None. Em 'auto' (padrão), liga só no Android.
+    """
+    mode = opts.get('governor') or 'auto'
+    if mode == 'off' or (mode == 'auto' and not IS_ANDROID): return None
+    return ResourceGovernor(max_jobs, threads, opts.get('max_load'), opts.get('min_free_mb'),
+                            opts.get('min_battery'), opts.get('max_temp'))
+
+# ──────────────────── Diário do lote (retomada) ────────────────────
+class BatchJournal:
+    """
+    Diário append-only (JSONL) do lote: cada linha registra uma mudança de estado
+    (queued/running/done/failed) de um arquivo de origem. Ao reabrir, o último
+    registro de cada origem vale; saídas 'done' que ainda conferem são puladas.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self.entries = {}
+        lines = 0
+        try:
+            with open(self.path, encoding='utf-8') as fh:
+                for line in fh:
+                    try: rec = json.loads(line)
+                    except ValueError: continue  # linha truncada por queda no meio da escrita
+                    self.entries[rec['src']] = rec; lines += 1
+        except OSError:
+            pass
+        if lines > 4 * max(1, len(self.entries)): self._compact()
+
+    def _compact(self):
+        """Reescreve o diário só com o último estado de cada arquivo (troca atômica)."""
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        try:
+            with open(tmp, 'w', encoding='utf-8') as fh:
+                for rec in self.entries.values(): fh.write(json.dumps(rec, ensure_ascii=False) + "\n")
+            os.replace(tmp, self.path)
+        except OSError:
+            pass
+
+    @staticmethod
+    def _source_stamp(src):
+        try: st = os.stat(src); return st.st_size, st.st_mtime_ns
+        except OSError: return None, None
+
+    def record(self, src, state, outputs=()):
+        """
+        Anexa o estado de `src`; em 'done', guarda tamanho e mtime da origem e tamanho e
+        duração de cada saída (pastas HLS/DASH: soma dos arquivos).
+        """
+        rec = {'src': os.path.abspath(str(src)), 'state': state, 'ts': round(time.time(), 3), 'outputs': []}
+        if state == 'done': rec['src_size'], rec['src_mtime_ns'] = self._source_stamp(src)
+        for dst in outputs:
+            dst = Path(dst); info = probe_media(dst) if state == 'done' and dst.is_file() else None
+            rec['outputs'].append({'path': os.path.abspath(str(dst)), 'size': output_size(dst),
+                                   'duration': info.duration if info else None})
+        with self._lock:
+            self.entries[rec['src']] = rec
+            with open(self.path, 'a', encoding='utf-8') as fh:
+                fh.write(json.dumps(rec, ensure_ascii=False) + "\n"); fh.flush(); os.fsync(fh.fileno())
+
+    def is_done(self, src, outputs):
+        """
+        True se o diário marca `src` como concluído, a origem não mudou desde então
+        (tamanho e mtime_ns) e todas as saídas ainda conferem (tamanho e duração).
+        """
+        rec = self.entries.get(os.path.abspath(str(src)))
+        if not rec or rec.get('state') != 'done': return False
+        if (rec.get('src_size'), rec.get('src_mtime_ns')) != self._source_stamp(src): return False
+        recorded = {o['path']: o for o in rec.get('outputs', [])}
+        for dst in outputs:
+            o = recorded.get(os.path.abspath(str(dst)))
+            if not o or not Path(dst).exists() or output_size(dst) != o.get('size'): return False
+            if o.get('duration') is not None:
+                info = probe_media(dst)
+                if not info or info.duration is None or abs(info.duration - o['duration']) > 0.5: return False
+        return True
+
+# ─────────────── Execução de lotes e deleção adiada ───────────────
+DELETE_POLICIES = {
+    'auto': 'Deletar AUTOMATICAMENTE',
+    'ask': 'PERGUNTAR ao final do lote',
+    'verify': 'Deletar após VERIFICAR a saída (duração)',
+    'never': 'NUNCA deletar',
+}
+
+def output_matches_source(src: Path, outputs):
+    """True se todas as saídas existem e têm a duração da origem (±1 s)."""
+    src_info = probe_media(src)
+    if not (src_info and src_info.duration): return False
+    for dst in outputs:
+        if Path(dst).is_dir():  # escada HLS/DASH: confere a playlist principal
+            dst = next((m for m in (Path(dst) / HLS_MASTER, Path(dst) / DASH_MANIFEST) if m.exists()), dst)
+        info = probe_media(dst) if Path(dst).is_file() else None
+        if not (info and info.duration) or abs(info.duration - src_info.duration) > 1.0: return False
+    return True
+
+def remove_originals(files):
+    """Remove os originais; retorna (removidos, erros)."""
+    removed = errors = 0
+    for f in files:
+        try: f.unlink(); print(f"     -> Original '{f.name}' removido."); removed += 1
+        except Exception as e: print(f"     -> ERRO ao remover original '{f.name}': {e}"); errors += 1
+    return removed, errors
+
+def settle_deletions(candidates, policy, interactive):
+    """
+    Resolve, uma única vez no fim do lote (ou a cada job, num fluxo sem fim), o destino
+    dos originais convertidos (`candidates`: lista de (origem, saídas)). Retorna (removidos, erros).
+    """
+    if policy in ('auto', 'never') or not candidates: return 0, 0
+    if policy == 'verify':
+        keep = [src for src, outs in candidates if not output_matches_source(src, outs)]
+        for src in keep: print(f"     -> '{src.name}' mantido: a saída não confere com a origem.")
+        return remove_originals([src for src, _ in candidates if src not in keep])
+    # policy == 'ask'
+    print(f"\n>> {len(candidates)} original(is) convertido(s) com sucesso:")
+    for src, _ in candidates: print(f"  {src.name}")
+    if not interactive:
+        print(">> Modo não interativo: originais mantidos (use --delete auto ou verify para removê-los).")
+        return 0, 0
+    answer = input(">> Remover os originais? (s = todos / N = nenhum / i = um a um): ").strip().lower()
+    if answer == 's': return remove_originals([src for src, _ in candidates])
+    if answer == 'i':
+        chosen = [src for src, _ in candidates if input(f"    Remover o original '{src.name}'? (s/N): ").strip().lower() == 's']
+        return remove_originals(chosen)
+    print("     -> Originais NÃO removidos.")
+    return 0, 0
+
+def scan_from_opts(opts, exts):
+    """
+    Arquivos de origem de um lote sem menus, em opts['dir']. Sem --recursive/--include/--exclude,
+    é a listagem ordenada da pasta (como no menu); com eles, um gerador
+    que alimenta os jobs enquanto a varredura continua.
+    """
+    root = opts.get('dir') or '.'
+    if not (opts.get('recursive') or opts.get('include') or opts.get('exclude')):
+        return iter_files_with_extension(exts, root)
+    return scan_media_files(root, exts, recursive=bool(opts.get('recursive')), include=opts.get('include'),
+                            exclude=opts.get('exclude'), workers=int(opts.get('scan_workers') or 1))
+
+def device_of(path):
+    """st_dev do arquivo, ou da pasta onde ele será criado; None se não der para consultar."""
+    path = Path(path)
+    for candidate in (path, path.parent):
+        try: return os.stat(candidate).st_dev
+        except OSError: continue
+    return None
+
+class DeviceIOLimiter:
+    """Limita quantos jobs leem ou escrevem ao mesmo tempo em cada dispositivo (st_dev)."""
+
+    def __init__(self, per_device=None):
+        self.per_device = per_device
+        self._lock = threading.Lock()
+        self._semaphores = {}
+
+    @contextmanager
+    def hold(self, *paths):
+        """Ocupa uma vaga em cada dispositivo de `paths` (sempre na mesma ordem, sem deadlock)."""
+        if not self.per_device: yield; return
+        with self._lock:
+            sems = [self._semaphores.setdefault(dev, threading.BoundedSemaphore(self.per_device))
+                    for dev in sorted({device_of(p) for p in paths} - {None})]
+        for sem in sems: sem.acquire()
+        try: yield
+        finally:
+            for sem in reversed(sems): sem.release()
+
+def publish_file(staged, dst):
+    """
+    Coloca `staged` em `dst` de forma atômica: os.replace no mesmo sistema de arquivos;
+    entre dispositivos, cópia sequencial para um nome oculto ao lado de dst e os.replace.
+    Pastas (HLS/DASH) substituem por inteiro a versão anterior.
+    """
+    old = None
+    if staged.is_dir() and dst.is_dir():
+        old = dst.with_name(f".{dst.name}.renoma-old"); shutil.rmtree(old, ignore_errors=True); os.replace(dst, old)
+    try:
+        os.replace(staged, dst)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            if old: os.replace(old, dst)
+            raise
+        part = dst.with_name(f".{dst.name}.renoma-part")
+        try:
+            if staged.is_dir(): shutil.copytree(staged, part)
+            else: shutil.copyfile(staged, part)
+            os.replace(part, dst)
+        except BaseException:
+            if part.is_dir(): shutil.rmtree(part, ignore_errors=True)
+            else: part.unlink(missing_ok=True)
+            if old: os.replace(old, dst)
+            raise
+    if old: shutil.rmtree(old, ignore_errors=True)
+
+_staged_origins = {}
+_swept_stage_dirs, _swept_stage_lock = set(), threading.Lock()
+
+def process_alive(pid):
+    """True se o processo `pid` desta máquina ainda existe (na dúvida, True)."""
+    if IS_WINDOWS:
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle: return ctypes.GetLastError() != 87  # ERROR_INVALID_PARAMETER: pid inexistente
+        code = ctypes.c_ulong()
+        try: return not kernel32.GetExitCodeProcess(handle, ctypes.byref(code)) or code.value == 259  # STILL_ACTIVE
+        finally: kernel32.CloseHandle(handle)
+    try: os.kill(pid, 0)
+    except ProcessLookupError: return False
+    except OSError: pass
+    return True
+
+def sweep_stale_stages(folder):
+    """
+    Apaga as pastas de preparo deixadas em `folder` por execuções desta máquina que
+    morreram sem limpar (SIGKILL, queda de energia). Só olha cada pasta uma vez por
+    processo; pastas de outras máquinas (scratch compartilhado) ficam intactas.
+    """
+    folder = os.path.abspath(folder)
+    with _swept_stage_lock:
+        if folder in _swept_stage_dirs: return
+        _swept_stage_dirs.add(folder)
+    try: entries = [e for e in os.scandir(folder) if e.name.startswith(STAGE_PREFIX) and e.is_dir(follow_symlinks=False)]
+    except OSError: return
+    for entry in entries:
+        node, pid, _ = (entry.name[len(STAGE_PREFIX):].rsplit('-', 2) + ['', ''])[:3]
+        if node != platform.node() or not pid.isdigit() or int(pid) == os.getpid() or process_alive(int(pid)): continue
+        shutil.rmtree(entry.path, ignore_errors=True)
+        tqdm.write(f"  🧹 Pasta de preparo abandonada removida: '{entry.path}'")
+
+def staged_origin(path):
+    """
+    Caminho na biblioteca de um arquivo em preparo por run_staged (a origem original, ou
+    o destino onde uma saída será publicada), ou o próprio caminho.
+    """
+    return Path(_staged_origins.get(os.path.abspath(str(path)), path))
+
+def run_staged(src, outputs, convert, scratch_dir=None, limiter=None):
+    """
+    Executa convert(origem) numa pasta de preparo e só publica as saídas em `outputs`
+    se o job terminar bem: a biblioteca nunca vê arquivos parciais.
+    Com scratch_dir, a origem é copiada para lá numa leitura sequencial, a codificação
+    roda toda no disco rápido e as saídas voltam por publish_file. Sem ele, o preparo é
+    uma pasta oculta ao lado da origem, com um hardlink dela.
+    `limiter` só segura a vaga do dispositivo durante as cópias, ou durante toda a
+    codificação quando ela lê direto da biblioteca.
+    """
+    limiter = limiter or DeviceIOLimiter()
+    src = Path(src)
+    try:
+        sweep_stale_stages(scratch_dir or src.parent)
+        stage = Path(tempfile.mkdtemp(prefix=f"{STAGE_PREFIX}{platform.node()}-{os.getpid()}-", dir=scratch_dir or src.parent))
+    except OSError as e:
+        tqdm.write(f"  ⚠️  Sem pasta de preparo para '{src.name}' ({e}); gravando direto no destino.")
+        with limiter.hold(src, *outputs): return convert(src)
+    staged_src = stage / src.name
+    staged = {os.path.abspath(staged_src): os.path.abspath(src),
+              **{os.path.abspath(stage / Path(dst).name): os.path.abspath(dst) for dst in outputs}}
+    _staged_origins.update(staged)
+    try:
+        if scratch_dir:
+            with limiter.hold(src): shutil.copyfile(src, staged_src)
+            alias_probe(src, staged_src)
+            result = convert(staged_src)
+        else:
+            try: os.link(src, staged_src)
+            except OSError:  # FAT/exFAT, alguns compartilhamentos: sem hardlink, usa um atalho
+                try: os.symlink(os.path.abspath(src), staged_src)
+                except OSError:
+                    with limiter.hold(src, *outputs): return convert(src)
+            alias_probe(src, staged_src)
+            with limiter.hold(src): result = convert(staged_src)
+        if result is True:
+            with limiter.hold(*outputs):
+                for dst in outputs: publish_file(stage / Path(dst).name, Path(dst))
+        return result
+    except OSError as e:
+        tqdm.write(f"❌ Erro ao preparar/publicar '{src.name}': {e}"); return False
+    finally:
+        for path in staged: _staged_origins.pop(path, None)
+        shutil.rmtree(stage, ignore_errors=True)
+
+def run_conversion_batch(label, input_files, outputs_for, convert_fn, max_jobs=1, delete_policy='ask', interactive=True,
+                         scratch_dir=None, io_per_device=None, stage=True, estimate=None, governor=None,
+                         root='.', on_event=None, executor=None):
+    """
+    Laço comum dos conversores: diário de retomada, jobs simultâneos, barras,
+    deleção adiada (nenhum job espera por input()) e resumo final.
+    convert_fn(origem, position) executa um job; position é None no modo sequencial.
+    Cada job roda em preparo (run_staged), em scratch_dir se houver, com no máximo
+    io_per_device jobs por dispositivo ao mesmo tempo; com stage=False (jobs que rodam
+    em outra máquina), convert_fn recebe a origem diretamente.
+    Com `estimate`(origem) -> segundos previstos (histórico de vazão) e uma lista de
+    arquivos, mostra a estimativa do lote inteiro, corrigida a cada job concluído.
+    Com `governor` (ResourceGovernor), o número de jobs simultâneos acompanha o host.
+    O diário fica em `root`. on_event(tipo, origem, **dados) recebe 'file_started',
+    'progress' (estatísticas do ffmpeg) e 'file_done' (result) de cada arquivo; com
+    `executor`, os jobs rodam nesse pool compartilhado (API assíncrona).
+    Sem lista completa (varredura ou watch), 'verify' confere e apaga cada original
+    assim que o job termina. Com CTRL+C, a deleção adiada e o resumo ainda rodam
+    antes de a interrupção seguir adiante.
+    Retorna um dict com os contadores do lote.
+    """
+    limiter = DeviceIOLimiter(io_per_device)
+    converted_count, error_count, removed_count, failed_files, candidates = 0, 0, 0, [], []
+    skipped_count, unprofitable_count = 0, 0
+    journal = BatchJournal(Path(root) / JOURNAL_FILE)
+    # `input_files` pode ser um gerador (varredura em andamento): nada aqui exige a lista completa.
+    total = len(input_files) if isinstance(input_files, (list, tuple)) else None
+    if total is not None: max_jobs = min(max_jobs, total) or 1
+    predicted = {f: estimate(f) for f in input_files} if estimate and total else {}
+    eta = {'pred': 0.0, 'actual': 0.0}  # previsto e real dos jobs já concluídos, para corrigir o restante
+    estimating = any(v is not None for v in predicted.values())
+    def _batch_eta():
+        if not estimating: return None
+        remaining = sum(v for v in list(predicted.values()) if v)  # os jobs removem itens em outras threads
+        factor = eta['actual'] / eta['pred'] if eta['pred'] else 1.0
+        return remaining * factor / (governor.limit() if governor else max_jobs)
+    def _pending():
+        nonlocal skipped_count
+        for f in input_files:
+            if f.name == os.path.basename(__file__): continue
+            # Saídas já concluídas e que ainda conferem com o diário são puladas.
+            if journal.is_done(f, outputs_for(f)): skipped_count += 1; predicted.pop(f, None); continue
+            journal.record(f, 'queued')
+            yield f
+    # Com vários jobs, a barra do lote fica na linha 0 e cada job usa a linha slot+1.
+    if predicted:
+        known = [v for v in predicted.values() if v is not None]
+        if known:
+            print(f">> Estimativa do lote: ~{format_eta(_batch_eta())} ({len(known)} de {len(predicted)} arquivo(s) "
+                  f"com histórico de vazão, {max_jobs} job(s) simultâneo(s)).")
+        else: print(">> Sem histórico de vazão para este codificador: a estimativa do lote aparece nas próximas execuções.")
+    batch_bar = tqdm(total=total, desc="Lote", ncols=80, unit="arquivo", position=0) if max_jobs > 1 else None
+    started = [0]
+    def _job(input_file, slot):
+        started[0] += 1
+        if batch_bar is None:
+            remaining = _batch_eta()
+            print(f"\n--- [{started[0]}/{total or '?'}] Processando: '{input_file.name}' ---"
+                  + (f" (lote: ~{format_eta(remaining)} restantes)" if remaining else ""))
+        journal.record(input_file, 'running')
+        job_started = time.monotonic()
+        position = None if batch_bar is None else slot + 1
+        if on_event:
+            on_event('file_started', input_file)
+            _job_context.on_progress = lambda stats: on_event('progress', input_file, **stats)
+        try:
+            if stage: ok = run_staged(input_file, outputs_for(input_file), lambda f: convert_fn(f, position), scratch_dir, limiter)
+            else: ok = convert_fn(input_file, position)
+        finally:
+            if on_event: _job_context.on_progress = None
+        if ok is JOB_SKIPPED: journal.record(input_file, 'skipped')
+        else: journal.record(input_file, 'done' if ok else 'failed', outputs_for(input_file))
+        expected = predicted.pop(input_file, None)
+        if ok is True and expected: eta['pred'] += expected; eta['actual'] += time.monotonic() - job_started
+        return ok
+    if governor:
+        print(f">> Governador de recursos ativo: até {governor.max_jobs} job(s), reduzindo com carga > {governor.max_load}/núcleo, "
+              f"< {governor.min_free_mb} MB livres, bateria < {governor.min_battery}% ou > {governor.max_temp}°C.")
+        governor.start()
+    # Num fluxo sem fim (watch), adiar a verificação até o CTRL+C deixaria os originais para sempre.
+    settle_each = total is None and delete_policy == 'verify'
+    results, interrupted = run_job_pool(_pending(), _job, max_jobs, governor.limit if governor else None, executor), False
+    try:
+        for input_file, ok in results:
+            if on_event: on_event('file_done', input_file, result=ok)
+            if batch_bar is not None:
+                remaining = _batch_eta()
+                if remaining is not None: batch_bar.set_postfix_str(f"lote ~{format_eta(remaining)}", refresh=False)
+                batch_bar.update(1)
+            if ok is JOB_SKIPPED: unprofitable_count += 1
+            elif ok:
+                converted_count += 1
+                if delete_policy == 'auto':
+                    removed, errors = remove_originals([input_file]); removed_count += removed; error_count += errors
+                elif settle_each:
+                    removed, errors = settle_deletions([(input_file, outputs_for(input_file))], delete_policy, False)
+                    removed_count += removed; error_count += errors
+                else: candidates.append((input_file, outputs_for(input_file)))
+            else: error_count += 1; failed_files.append(input_file.name)
+            if batch_bar is None: print("-----------------------------------------------------")
+    except KeyboardInterrupt:
+        interrupted = True
+        tqdm.write("\n>> Interrompido: aguardando os jobs em andamento...")
+    finally:
+        results.close()  # espera os jobs em voo (o ffmpeg também recebeu o CTRL+C)
+        if governor: governor.stop()
+        if batch_bar is not None: batch_bar.close()
+    removed, errors = settle_deletions(candidates, delete_policy, interactive)
+    removed_count += removed; error_count += errors
+    print("\n======================================================")
+    print(f">> Processamento de {label} Concluído.")
+    print(f"- Arquivos convertidos: {converted_count}\n- Originais removidos: {removed_count}\n- Erros: {error_count}")
+    if skipped_count: print(f"- Já concluídos anteriormente, conferidos pelo diário '{journal.path.name}' (pulados): {skipped_count}")
+    if unprofitable_count: print(f"- Mantidos por economia prevista insuficiente: {unprofitable_count}")
+    if failed_files:
+        print(f"- Arquivos que falharam:"); [print(f"  • {f}") for f in failed_files]
+    print("======================================================")
+    if interrupted: raise KeyboardInterrupt
+    return {'converted': converted_count, 'removed': removed_count, 'errors': error_count,
+            'skipped': skipped_count, 'unprofitable': unprofitable_count, 'failed': failed_files}
+
 # ────────────────────── Renomear Arquivos ───────────────────────
+def plan_season_renames(arquivos, nome_serie, temporada_formatada, extensao=None):
+    """
+    Numera os arquivos (já ordenados) como 'Série SxxEyy.ext'; sem `extensao`,
+    cada arquivo mantém a sua. Retorna {nome_antigo: nome_novo} só com os que
+    realmente mudam de nome.
+    """
+    script_name = os.path.basename(__file__)
+    renames = {}
+    episode_counter = 1
+    for arquivo_antigo in arquivos:
+        if arquivo_antigo == script_name:
+            continue
+        ext = extensao or os.path.splitext(arquivo_antigo)[1][1:].lower()
+        novo_nome = f"{nome_serie} S{temporada_formatada}E{episode_counter:02d}.{ext}"
+        if arquivo_antigo != novo_nome:
+            renames[arquivo_antigo] = novo_nome
+        episode_counter += 1
+    return renames
+
+SEASON_DIR_RE = re.compile(r'^(?:season|temporada|temp|s)[\s._-]*0*(\d{1,3})\b', re.IGNORECASE)
+
+def season_from_dirname(name):
+    """Número da temporada de uma pasta ('Season 2', 'Temporada 02', 'S02'), ou None."""
+    m = SEASON_DIR_RE.match(name.strip())
+    return int(m.group(1)) if m and int(m.group(1)) > 0 else None
+
+def plan_library_renames(root='.', exts=RENAME_VIDEO_EXTS, sort='natural', series=None, workers=1):
+    """
+    Monta em memória o plano de uma biblioteca inteira: cada pasta de temporada
+    ('Série/Season 1', 'Série/Temporada 02', 'Série/S03') é numerada com o nome da
+    pasta-mãe (ou `series`). Retorna ({pasta: {antigo: novo}}, [pastas ignoradas]).
+    """
+    plan, skipped = {}, []
+    for path, rel, files in walk_media_dirs(root, exts, recursive=True, workers=workers):
+        names = [os.path.basename(f) for f in files if not os.path.basename(f).startswith(RENAME_TMP_PREFIX)]
+        if not names: continue
+        abspath = os.path.abspath(path)
+        season = season_from_dirname(os.path.basename(abspath))
+        if season is None: skipped.append(rel or '.'); continue
+        if sort == 'alpha': names.sort()
+        renames = plan_season_renames(names, series or os.path.basename(os.path.dirname(abspath)), f"{season:02d}")
+        if renames: plan[path] = renames
+    return plan, skipped
+
+def order_renames(renames, existing):
+    """
+    Ordena as renomeações de uma pasta ({antigo: novo}) para que nenhum passo sobrescreva
+    um arquivo, usando só o conjunto `existing` de nomes listados na pasta.
+    Nomes são comparados com casefold(): em sistemas de arquivos que ignoram maiúsculas
+    (macOS, Windows, /sdcard, SMB) 'show.mkv' e 'Show.mkv' são o mesmo arquivo; trocas
+    só de maiúsculas passam por um nome temporário.
+    Cadeias (a→b, b→c) rodam do fim para o começo; ciclos (a→b, b→a) passam por um
+    nome temporário. Destinos ocupados por arquivos que não saem do lugar bloqueiam a
+    renomeação e tudo o que depende dela.
+    Retorna ([grupos de passos (origem, destino)], {antigo: novo} bloqueados).
+    """
+    renames = {old: new for old, new in renames.items() if old != new}
+    present = {name.casefold() for name in existing}
+    leaving = {old.casefold() for old in renames}  # nomes que vão ser liberados
+    wants = {new.casefold(): old for old, new in renames.items()}  # nome -> quem quer ocupá-lo
+    blocked = {old for old, new in renames.items()
+               if old not in existing or (new.casefold() in present and new.casefold() not in leaving)}
+    for old in list(blocked):
+        cur = wants.get(old.casefold())
+        while cur is not None and cur not in blocked:
+            blocked.add(cur); cur = wants.get(cur.casefold())
+    groups, done, n = [], set(blocked), 0
+    for old, new in renames.items():
+        if old in done or new.casefold() in leaving: continue
+        steps, cur = [], old  # fim de uma cadeia: o destino está livre
+        while cur is not None and cur not in blocked:
+            steps.append((cur, renames[cur])); done.add(cur); cur = wants.get(cur.casefold())
+        groups.append(steps)
+    for old in renames:
+        if old in done: continue
+        while True:
+            tmp = f"{RENAME_TMP_PREFIX}{os.getpid()}-{n}{os.path.splitext(old)[1]}"; n += 1
+            if tmp.casefold() not in present: break
+        steps, cur = [(old, tmp)], wants[old.casefold()]
+        done.add(old)
+        while cur != old:
+            steps.append((cur, renames[cur])); done.add(cur); cur = wants[cur.casefold()]
+        steps.append((tmp, renames[old]))
+        groups.append(steps)
+    return groups, {old: renames[old] for old in blocked}
+
+class RenameJournal:
+    """
+    Diário de desfazer (JSONL) da última renomeação: uma linha por passo, com origem e
+    destino absolutos, gravada e sincronizada com o disco *antes* do os.rename que ela
+    descreve (write-ahead). Um passo cujo rename falhou ganha uma linha 'cancelled'.
+    Desfazer aplica os passos ao contrário, do último para o primeiro, numa única passada.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._fh = None
+
+    def __enter__(self):
+        self._fh = open(self.path, 'w', encoding='utf-8')
+        return self
+
+    def __exit__(self, *exc):
+        self._fh.flush(); os.fsync(self._fh.fileno()); self._fh.close()
+
+    def _write(self, rec):
+        with self._lock:
+            self._fh.write(json.dumps(rec, ensure_ascii=False) + "\n"); self._fh.flush(); os.fsync(self._fh.fileno())
+
+    def record(self, src, dst):
+        """Registra um passo antes de executá-lo: uma queda logo depois ainda pode ser desfeita."""
+        self._write({'src': src, 'dst': dst})
+
+    def cancel(self, src, dst):
+        """Marca um passo registrado cujo rename falhou (nada a desfazer)."""
+        self._write({'src': src, 'dst': dst, 'cancelled': True})
+
+def _apply_dir_renames(dirpath, renames, journal, bar):
+    """Renomeia uma pasta: uma listagem (os.scandir) e um os.rename por arquivo; retorna (feitos, erros)."""
+    try:
+        with os.scandir(dirpath) as it: existing = {e.name for e in it}
+    except OSError as e:
+        tqdm.write(f"  ERRO ao listar '{dirpath}': {e}"); bar.update(len(renames)); return 0, len(renames)
+    groups, blocked = order_renames(renames, existing)
+    for old, new in blocked.items():
+        motivo = f"'{old}' não existe mais" if old not in existing else f"'{new}' já existe"
+        tqdm.write(f"  ERRO em '{dirpath}': {motivo}")
+    done, errors = 0, len(blocked)
+    bar.update(len(blocked))
+    for steps in groups:
+        for i, (src, dst) in enumerate(steps):
+            src_path, dst_path = os.path.abspath(os.path.join(dirpath, src)), os.path.abspath(os.path.join(dirpath, dst))
+            journal.record(src_path, dst_path)
+            try:
+                os.rename(src_path, dst_path)
+            except OSError as e:
+                journal.cancel(src_path, dst_path)
+                tqdm.write(f"  ERRO ao tentar renomear '{src}' para '{dst}': {e}")
+                # O resto do grupo sobrescreveria arquivos que não saíram do lugar.
+                left = sum(1 for _, d in steps[i:] if not d.startswith(RENAME_TMP_PREFIX))
+                errors += left; bar.update(left)
+                if i: tqdm.write(f"  Renomeação parcial em '{dirpath}'; use 'desfazer' para voltar ao estado anterior.")
+                break
+            if not dst.startswith(RENAME_TMP_PREFIX): done += 1; bar.update(1)
+    return done, errors
+
+def apply_renames(plan, workers=1, undo_path=UNDO_FILE):
+    """
+    Executa um plano {pasta: {antigo: novo}} com até `workers` pastas ao mesmo tempo,
+    gravando cada passo no diário de desfazer; imprime o resumo e retorna o número de erros.
+    """
+    total = sum(len(r) for r in plan.values())
+    arquivos_renomeados = erros = 0
+    with RenameJournal(undo_path) as journal, \
+         tqdm(total=total, desc=">> Renomeando", ncols=80, unit="arquivo") as bar, \
+         ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = [pool.submit(carry_job_context(_apply_dir_renames), d, r, journal, bar) for d, r in plan.items()]
+        for future in futures:
+            done, errors = future.result()
+            arquivos_renomeados += done; erros += errors
+
+    print("-----------------------------------------------------")
+    print(">> Renomeação concluída.")
+    print(f"- Arquivos renomeados com sucesso: {arquivos_renomeados}")
+    if erros > 0:
+        print(f"- Erros encontrados: {erros}")
+    print("- Para desfazer: opção 'Desfazer a última renomeação' do menu, ou 'renoma.py rename --undo'.")
+    return erros
+
+def undo_renames(undo_path=UNDO_FILE):
+    """
+    Desfaz a última renomeação registrada em `undo_path`, do último passo para o primeiro.
+    Cada pasta é listada uma vez (nomes comparados com casefold(), como em
+    order_renames); um nome original que voltou a ser ocupado não é
+    sobrescrito. Passos cancelados, ou registrados mas interrompidos antes do rename
+    (origem no lugar, destino ausente), são ignorados. Passos que falham ficam no
+    diário para uma nova tentativa.
+    """
+    try:
+        lines = Path(undo_path).read_text(encoding='utf-8').splitlines()
+    except FileNotFoundError:
+        print(">> Nenhuma renomeação para desfazer."); return 0
+    steps = []
+    for line in lines:
+        try: steps.append(json.loads(line))
+        except ValueError: continue  # linha truncada por queda no meio da escrita
+    cancelled = {(rec['src'], rec['dst']) for rec in steps if rec.get('cancelled')}
+    steps = [rec for rec in steps if not rec.get('cancelled') and (rec['src'], rec['dst']) not in cancelled]
+    listings, failed, skipped = {}, [], 0
+    for rec in tqdm(list(reversed(steps)), desc=">> Desfazendo", ncols=80, unit="arquivo"):
+        src_dir, src_name = os.path.split(rec['src'])
+        dst_dir, dst_name = os.path.split(rec['dst'])
+        for d in (src_dir, dst_dir):
+            if d not in listings:
+                try:
+                    with os.scandir(d) as it: listings[d] = {e.name.casefold() for e in it}
+                except OSError: listings[d] = set()
+        src_key, dst_key = src_name.casefold(), dst_name.casefold()
+        same_file = src_dir == dst_dir and src_key == dst_key  # troca só de maiúsculas
+        if dst_key not in listings[dst_dir] and src_key in listings[src_dir]:
+            skipped += 1; continue  # registrado, mas a queda veio antes do rename
+        if src_key in listings[src_dir] and not same_file:
+            tqdm.write(f"  ERRO: '{rec['src']}' já existe; '{dst_name}' foi mantido"); failed.append(rec); continue
+        try:
+            os.rename(rec['dst'], rec['src'])
+        except OSError as e:
+            tqdm.write(f"  ERRO ao restaurar '{dst_name}': {e}"); failed.append(rec); continue
+        listings[dst_dir].discard(dst_key); listings[src_dir].add(src_key)
+    if failed:
+        with open(undo_path, 'w', encoding='utf-8') as fh:
+            for rec in reversed(failed): fh.write(json.dumps(rec, ensure_ascii=False) + "\n")
+    else:
+        Path(undo_path).unlink(missing_ok=True)
+    print("-----------------------------------------------------")
+    print(f">> Desfeito: {len(steps) - len(failed) - skipped} passos restaurados.")
+    if failed: print(f"- Erros encontrados: {len(failed)} (mantidos em '{undo_path}')")
+    return len(failed)
+
+def show_rename_plan(plan):
+    """Lista as renomeações propostas, pasta por pasta."""
+    for d, renames in plan.items():
+        if len(plan) > 1 or d != '.': print(f"[{d}]")
+        for arquivo_antigo, novo_nome in renames.items(): print(f"  '{arquivo_antigo}'  ==>  '{novo_nome}'")
+
 def run_rename_logic():
     """Função de renomear arquivos sequencialmente com barra de progresso e escolha de ordenação."""
     print()
@@ -155,6 +1662,16 @@ def run_rename_logic():
     print("=== Modo: Renomear Arquivos Sequencialmente ===")
     print("===========================================")
     print()
+    print(">> O que você deseja fazer?")
+    print("   1) Renomear uma temporada nesta pasta")
+    print("   2) Renomear uma biblioteca inteira (pastas 'Série/Season 1', 'Série/Temporada 02'...)")
+    print("   3) Desfazer a última renomeação")
+    modo = ''
+    while modo not in ['1', '2', '3']:
+        modo = input("   Digite a opção (1, 2 ou 3): ").strip()
+    print()
+    if modo == '3': execute_job(RenameJob(undo=True)); return
+    if modo == '2': run_library_rename_logic(); return
     
     while True:
         nome_serie = input(">> Digite o NOME da série (ex: The Mandalorian): ").strip()
@@ -223,29 +1740,15 @@ def run_rename_logic():
         print("\nOperação cancelada pelo usuário.")
         return
     
-    script_name = os.path.basename(__file__)
+    renames = plan_season_renames(arquivos, nome_serie, temporada_formatada, extensao)
+    for arquivo_antigo in arquivos:
+        if arquivo_antigo in renames:
+            print(f"  '{arquivo_antigo}'  ==>  '{renames[arquivo_antigo]}'")
+        elif arquivo_antigo != os.path.basename(__file__):
+            print(f"  '{arquivo_antigo}'  (já está no formato ou nome igual, será ignorado)")
+    arquivos_listados = len(renames)
     
-    renames = {}
-    arquivos_listados = 0
-    episode_counter = 1
-    
-    for arquivo_antigo in arquivos:
-        if arquivo_antigo == script_name:
-            continue
-        
-        episodio_formatado = f"{episode_counter:02d}"
-        novo_nome = f"{nome_serie} S{temporada_formatada}E{episodio_formatado}.{extensao}"
-        
-        if arquivo_antigo != novo_nome:
-            print(f"  '{arquivo_antigo}'  ==>  '{novo_nome}'")
-            renames[arquivo_antigo] = novo_nome
-            arquivos_listados += 1
-        else:
-            print(f"  '{arquivo_antigo}'  (já está no formato ou nome igual, será ignorado)")
-        
-        episode_counter += 1
-    
-    print("-----------------------------------------------------")
+    print("-----------------------------------------------------")
     
     if arquivos_listados == 0:
         print(f"Nenhum arquivo *.{extensao} encontrado para renomear ou todos já estão no formato correto.")
@@ -256,55 +1759,319 @@ def run_rename_logic():
     print()
     
     if confirmacao.lower() == 's':
-        arquivos_renomeados = 0
-        erros = 0
-        
-        for arquivo_antigo, novo_nome in tqdm(renames.items(), desc=">> Renomeando", ncols=80, unit="arquivo"):
-            try:
-                if not os.path.exists(novo_nome):
-                    os.rename(arquivo_antigo, novo_nome)
-                    arquivos_renomeados += 1
-                else:
-                    tqdm.write(f"  ERRO: Arquivo '{novo_nome}' já existe")
-                    erros += 1
-            except Exception as e:
-                tqdm.write(f"  ERRO ao tentar renomear '{arquivo_antigo}' para '{novo_nome}': {e}")
-                erros += 1
-        
-        print("-----------------------------------------------------")
-        print(">> Renomeação concluída.")
-        print(f"- Arquivos renomeados com sucesso: {arquivos_renomeados}")
-        if erros > 0:
-            print(f"- Erros encontrados: {erros}")
+        execute_job(RenameJob(plan={'.': renames}), interactive=True)
     else:
         print(">> Renomeação cancelada pelo usuário.")
 
+def run_library_rename_logic():
+    """Renomeia todas as pastas de temporada abaixo da pasta atual, após mostrar o plano."""
+    print(f">> Procurando pastas de temporada com arquivos {RENAME_VIDEO_EXTS.replace(',', ', ')}...")
+    plan, skipped = plan_library_renames('.', RENAME_VIDEO_EXTS, workers=SCAN_WORKERS)
+    show_rename_plan(plan)
+    for d in skipped: print(f"  (pasta '{d}' ignorada: nome sem número de temporada)")
+    total = sum(len(r) for r in plan.values())
+    print("-----------------------------------------------------")
+    if not total: print("Nenhum arquivo para renomear ou todos já estão no formato correto."); return
+    print(f">> Foram propostas {total} renomeações em {len(plan)} pastas.")
+    confirmacao = input(">> Você confirma as renomeações acima? (s/N): ").strip()
+    print()
+    if confirmacao.lower() == 's': execute_job(RenameJob(plan=plan, workers=SCAN_WORKERS), interactive=True)
+    else: print(">> Renomeação cancelada pelo usuário.")
+
+def run_rename_batch(opts, interactive=False):
+    """
+    Renomeação sem menus (modo headless): opts com dir, series, season, ext, sort, dry_run,
+    library (todas as pastas de temporada abaixo de dir), workers e undo; ou `plan`
+    ({pasta: {antigo: novo}}) já montado, aplicado sem nova listagem.
+    Com interactive=True, o menu já mostrou e confirmou o plano.
+    """
+    root = opts.get('dir') or '.'
+    undo_path = Path(root) / UNDO_FILE
+    if opts.get('undo'): return undo_renames(undo_path)
+    if opts.get('plan') is not None:
+        plan = opts['plan']
+    elif opts.get('library'):
+        plan, skipped = plan_library_renames(root, opts.get('ext') or RENAME_VIDEO_EXTS, opts.get('sort'),
+                                             opts.get('series'), int(opts.get('workers') or 1))
+        if not interactive:
+            for d in skipped: print(f"  (pasta '{d}' ignorada: nome sem número de temporada)")
+    else:
+        if not opts.get('series') or not re.match(r'^[1-9][0-9]*$', str(opts.get('season') or '')) or not opts.get('ext'):
+            raise ValueError("renomear exige --series, --season (inteiro positivo) e --ext (ou --library)")
+        extensao = opts['ext'].lower().lstrip('.')
+        file_list = list_files_with_extension(extensao, root)
+        arquivos = sorted(file_list) if opts.get('sort') == 'alpha' else sorted(file_list, key=natural_sort_key)
+        plan = {root: plan_season_renames(arquivos, opts['series'], f"{int(opts['season']):02d}", extensao)}
+    plan = {d: r for d, r in plan.items() if r}
+    if not interactive: show_rename_plan(plan)
+    total = sum(len(r) for r in plan.values())
+    if not total: print("Nenhum arquivo para renomear."); return 0
+    if opts.get('dry_run'): print(f">> Simulação: {total} renomeações propostas, nada foi alterado."); return 0
+    return apply_renames(plan, workers=int(opts.get('workers') or 1), undo_path=undo_path)
+
 # ─────────────────── Lógica de Conversão de VÍDEO ───────────────────
+HW_ENCODERS = {
+    'mediacodec': {'name': 'Android Hardware (h264_mediacodec)', 'codec': 'h264_mediacodec'},
+    'qsv': {'name': 'Intel Quick Sync (h264_qsv)', 'codec': 'h264_qsv'},
+    'nvenc': {'name': 'NVIDIA NVENC (h264_nvenc)', 'codec': 'h264_nvenc'},
+    'amf': {'name': 'AMD AMF (h264_amf)', 'codec': 'h264_amf'},
+    'vaapi': {'name': 'Linux VA-API (h264_vaapi)', 'codec': 'h264_vaapi'},
+}
+
 def get_available_encoders():
-    preset_cpu = "veryfast" if IS_ANDROID else "medium"
+    """
+    Codificadores oferecidos no menu. Sem calibração, usa heurísticas (nome da GPU,
+    dispositivo VA-API). Com calibração válida para este ffmpeg, esconde os que
+    falharam no teste e os ordena como rank_calibration (o primeiro é o padrão).
+    """
+    preset_cpu = default_cpu_preset()
     encoders = { 'cpu': {'name': f'CPU (libx264 - preset {preset_cpu})', 'codec': 'libx264', 'preset': preset_cpu} }
     if IS_ANDROID:
-        encoders['mediacodec'] = {'name': 'Android Hardware (h264_mediacodec)', 'codec': 'h264_mediacodec'}
+        encoders['mediacodec'] = dict(HW_ENCODERS['mediacodec'])
     if IS_WINDOWS:
         try:
             result = subprocess.check_output("wmic path win32_videocontroller get name", shell=True, text=True, stderr=subprocess.DEVNULL).lower()
-            if 'intel' in result: encoders['qsv'] = {'name': 'Intel Quick Sync (h264_qsv)', 'codec': 'h264_qsv'}
-            if 'nvidia' in result: encoders['nvenc'] = {'name': 'NVIDIA NVENC (h264_nvenc)', 'codec': 'h264_nvenc'}
-            if 'amd' in result or 'radeon' in result: encoders['amf'] = {'name': 'AMD AMF (h264_amf)', 'codec': 'h264_amf'}
+            if 'intel' in result: encoders['qsv'] = dict(HW_ENCODERS['qsv'])
+            if 'nvidia' in result: encoders['nvenc'] = dict(HW_ENCODERS['nvenc'])
+            if 'amd' in result or 'radeon' in result: encoders['amf'] = dict(HW_ENCODERS['amf'])
         except Exception: pass
     elif IS_LINUX and not IS_ANDROID:
-        if Path(VAAPI_DEVICE).exists(): encoders['vaapi'] = {'name': 'Linux VA-API (h264_vaapi)', 'codec': 'h264_vaapi'}
-    return encoders
+        if Path(VAAPI_DEVICE).exists(): encoders['vaapi'] = dict(HW_ENCODERS['vaapi'])
+    calibration = load_calibration()
+    if not calibration:
+        return encoders
+    # A calibração testou tudo que o build do ffmpeg tem: vale mais que a heurística.
+    measured = {}
+    for key, res in rank_calibration(calibration):
+        info = dict(res['info'], fps=res['fps'])
+        info['name'] = f"{info['name']} — {res['fps']:.0f} fps, {res['size'] / 1024:.0f} KiB no teste"
+        measured[key] = info
+    if not measured: return encoders
+    ranked = dict(measured)
+    # 'cpu' continua valendo (é o que a documentação e os jobs salvos usam): aponta para o preset padrão.
+    ranked.setdefault('cpu', measured.get(f"cpu:{preset_cpu}", encoders['cpu']))
+    return ranked
 
-def convert_one_video(src: Path, out_ext: str, encoder_info: dict, quality_preset: int) -> bool:
-    dst = src.with_suffix(f".{out_ext}")
+# ─────────────── Escada de resoluções (uma decodificação) ───────────────
+def parse_ladder(spec):
+    """Converte '1080,720,480' na lista de alturas (maior primeiro), validando contra LADDER_RUNGS."""
+    try: heights = sorted({int(h.strip().lower().rstrip('p')) for h in str(spec).split(',') if h.strip()}, reverse=True)
+    except ValueError: heights = []
+    if not heights or any(h not in LADDER_RUNGS for h in heights):
+        raise ValueError(f"escada inválida '{spec}' (degraus: {', '.join(map(str, LADDER_RUNGS))})")
+    return heights
+
+def ladder_rungs_for(src: Path, rungs):
+    """Degraus que não ampliam a origem (ao menos o menor, na resolução original)."""
+    info = probe_media(src)
+    height = int((info.video_streams[0].get('height') or 0) if info and info.video_streams else 0)
+    return [h for h in rungs if h <= height] or rungs[-1:]
+
+def ladder_outputs_for(src: Path, rungs, out_ext, fmt='files'):
+    """Um arquivo 'nome.720p.ext' por degrau, ou uma pasta 'nome_hls'/'nome_dash' com todos."""
+    if fmt == 'files': return [src.with_name(f"{src.stem}.{h}p.{out_ext}") for h in rungs]
+    return [src.with_name(f"{src.stem}_{fmt}")]
+
+def _stream_params(params, index):
+    """Aplica opções de codificador a um único stream de vídeo de saída (-crf -> -crf:v:N)."""
+    out = []
+    for token in params:
+        if not token.startswith('-') or token == '-threads': out.append(token)
+        elif token.endswith(':v'): out.append(f"{token}:{index}")
+        else: out.append(f"{token}:v:{index}")
+    return out
+
+def convert_one_video_ladder(src: Path, out_ext: str, encoder_info: dict, quality_preset: int, rungs,
+                             fmt='files', threads=None, position=None) -> bool:
+    """
+    Gera vários degraus de resolução (ex.: 1080p, 720p e 480p) numa única execução do
+    ffmpeg: a origem é lida e decodificada uma vez, e um filtro split/scale alimenta um
+    codificador por degrau. fmt='files' grava um arquivo por degrau; 'hls' e 'dash'
+    gravam uma pasta com playlist principal e segmentos de keyframes alinhados.
+    """
+    info = probe_media(src)
+    if not (info and info.video_streams):
+        tqdm.write(f"❌ '{src.name}' não tem stream de vídeo."); return False
+    rungs = ladder_rungs_for(src, rungs)
+    dsts = ladder_outputs_for(src, rungs, out_ext, fmt)
     encoder = encoder_info['codec']
-    quality_map = {
-        'libx264': {1: 19, 2: 23, 3: 28}, 'h264_qsv': {1: 20, 2: 26, 3: 32},
-        'h264_nvenc': {1: 20, 2: 26, 3: 32}, 'h264_vaapi': {1: 20, 2: 26, 3: 32},
-        'h264_amf': {1: 20, 2: 26, 3: 32}, 'h264_mediacodec': {1: '4M', 2: '2M', 3: '1M'}
-    }
-    quality_value = quality_map.get(encoder, {}).get(quality_preset, 23)
+    # VAAPI: o upload para a GPU vai no fim de cada ramo do filtro, não num -vf global.
+    hw_args, upload = (["-vaapi_device", VAAPI_DEVICE], ",format=nv12,hwupload") if encoder == 'h264_vaapi' else ([], "")
+    def _rung_params(h):
+        params = build_video_codec_params(encoder_info, quality_preset, threads, rung=h)
+        for flag in ("-vaapi_device", "-vf"):
+            if flag in params: i = params.index(flag); del params[i:i + 2]
+        return params
+    graph = (f"[0:v:0]split={len(rungs)}" + "".join(f"[s{i}]" for i in range(len(rungs))) + ";" +
+             ";".join(f"[s{i}]scale=-2:{h}{upload}[v{i}]" for i, h in enumerate(rungs)))
+    cmd = [FFMPEG, "-nostdin", "-y", *hw_args, "-i", str(src), "-filter_complex", graph]
+    has_audio = bool(info.audio_streams)
+    if fmt == 'files':
+        audio_params = choose_audio_params(src, out_ext)
+        for i, (h, dst) in enumerate(zip(rungs, dsts)):
+            cmd += ["-map", f"[v{i}]", *(["-map", "0:a:0"] if audio_params else []), *_rung_params(h), *audio_params, str(dst)]
+    else:
+        out_dir = dsts[0]; shutil.rmtree(out_dir, ignore_errors=True); out_dir.mkdir()
+        keyframes = f"expr:gte(t,n_forced*{LADDER_SEGMENT_SECONDS})"
+        for i, h in enumerate(rungs):
+            cmd += ["-map", f"[v{i}]", *_stream_params(_rung_params(h), i), f"-force_key_frames:v:{i}", keyframes]
+        audio_rungs = rungs if fmt == 'hls' else rungs[:1]  # DASH compartilha uma única trilha de áudio
+        for i, h in enumerate(audio_rungs if has_audio else []):
+            cmd += ["-map", "0:a:0", f"-c:a:{i}", "aac", f"-b:a:{i}", LADDER_RUNGS[h]['audio'], f"-ac:a:{i}", "2"]
+        if fmt == 'hls':
+            for h in rungs: (out_dir / f"{h}p").mkdir()
+            stream_map = " ".join(f"v:{i}" + (f",a:{i}" if has_audio else "") + f",name:{h}p" for i, h in enumerate(rungs))
+            cmd += ["-f", "hls", "-hls_time", str(LADDER_SEGMENT_SECONDS), "-hls_playlist_type", "vod",
+                    "-hls_segment_filename", str(out_dir / "%v" / "seg_%05d.ts"), "-master_pl_name", HLS_MASTER,
+                    "-var_stream_map", stream_map, str(out_dir / "%v" / "index.m3u8")]
+        else:
+            sets = "id=0,streams=v" + (" id=1,streams=a" if has_audio else "")
+            cmd += ["-f", "dash", "-seg_duration", str(LADDER_SEGMENT_SECONDS), "-use_template", "1",
+                    "-use_timeline", "1", "-adaptation_sets", sets, str(out_dir / DASH_MANIFEST)]
+    cmd += ["-progress", "pipe:1"]
+
+    metrics = JobMetrics('video', src, f"{encoder_metrics_key(encoder_info)}:ladder-{fmt}")
+    returncode, stats = run_ffmpeg_with_progress(cmd, get_duration(str(src)), progress_desc(src), position)
+    if fmt == 'files': ok = returncode == 0 and all(d.exists() and d.stat().st_size > 1024 for d in dsts)
+    else: ok = returncode == 0 and (dsts[0] / (HLS_MASTER if fmt == 'hls' else DASH_MANIFEST)).exists()
+    if not ok:
+        for d in dsts:
+            if d.is_dir(): shutil.rmtree(d, ignore_errors=True)
+            else: d.unlink(missing_ok=True)
+    metrics.finish(dsts, returncode, ok, stats)
+    rotulo = ", ".join(f"{h}p" for h in rungs)
+    if ok: tqdm.write(f"✅ Escada de vídeo concluída: '{src.name}' -> {rotulo} ({fmt})"); return True
+    tqdm.write(f"❌ Erro na escada de vídeo '{src.name}' (código: {returncode})."); return False
+
+# ─────────────── Calibração dos codificadores (benchmark) ───────────────
+def ffmpeg_fingerprint():
+    """Identifica o binário do ffmpeg (caminho, tamanho, mtime e linha de versão) para validar o cache."""
+    try:
+        st = os.stat(FFMPEG)
+        version = subprocess.check_output([FFMPEG, '-hide_banner', '-version'], text=True, stderr=subprocess.DEVNULL).splitlines()[0]
+    except (OSError, subprocess.SubprocessError, IndexError):
+        return None
+    return f"{os.path.abspath(FFMPEG)}|{st.st_size}|{st.st_mtime_ns}|{version}"
+
+def list_ffmpeg_encoders():
+    """Nomes dos codificadores compilados neste ffmpeg (`ffmpeg -encoders`)."""
+    try:
+        out = subprocess.check_output([FFMPEG, '-hide_banner', '-encoders'], text=True, stderr=subprocess.DEVNULL)
+    except (OSError, subprocess.SubprocessError):
+        return set()
+    return {m.group(1) for m in re.finditer(r'^\s*[VAS][\w.]{5}\s+(\S+)', out, re.M)}
+
+def calibration_candidates():
+    """Presets do libx264 e todos os codificadores de hardware presentes no build do ffmpeg."""
+    built = list_ffmpeg_encoders()
+    candidates = {}
+    if 'libx264' in built:
+        for preset in CALIBRATION_X264_PRESETS:
+            candidates[f"cpu:{preset}"] = {'name': f'CPU (libx264 - preset {preset})', 'codec': 'libx264', 'preset': preset}
+    for key, info in HW_ENCODERS.items():
+        if info['codec'] in built: candidates[key] = dict(info)
+    return candidates
+
+def trial_encode(encoder_info: dict, quality_preset=2):
+    """Codifica um clipe sintético (testsrc2 720p30) e mede fps e tamanho da saída."""
+    frames = CALIBRATION_SECONDS * 30
+    with tempfile.TemporaryDirectory(prefix="renoma-cal-") as tmp:
+        out = Path(tmp) / "trial.mp4"
+        cmd = [FFMPEG, "-nostdin", "-y", "-v", "error", "-f", "lavfi",
+               "-i", f"testsrc2=size=1280x720:rate=30:duration={CALIBRATION_SECONDS}",
+               *build_video_codec_params(encoder_info, quality_preset), "-an", "-progress", "pipe:1", str(out)]
+        start = time.time()
+        returncode, _ = run_ffmpeg_with_progress(cmd, CALIBRATION_SECONDS)
+        elapsed = time.time() - start
+        size = out.stat().st_size if out.exists() else 0
+    ok = returncode == 0 and size > 1024
+    return {'ok': ok, 'fps': frames / elapsed if ok and elapsed > 0 else 0.0, 'size': size, 'info': encoder_info}
+
+def calibrate_encoders():
+    """Testa cada candidato, grava o resultado no cache (por binário do ffmpeg) e o retorna."""
+    results = {}
+    for key, info in tqdm(calibration_candidates().items(), desc="Calibrando", ncols=80, unit="cod"):
+        results[key] = res = trial_encode(info)
+        tqdm.write(f"  {'✅' if res['ok'] else '❌'} {info['name']}: " + (f"{res['fps']:.0f} fps, {res['size'] / 1024:.0f} KiB" if res['ok'] else "falhou"))
+    path = get_cache_dir() / CALIBRATION_FILE
+    try:
+        path.write_text(json.dumps({'ffmpeg': ffmpeg_fingerprint(), 'results': results}, indent=2), encoding='utf-8')
+    except OSError as e:
+        print(f"  ⚠️  Não foi possível salvar a calibração: {e}")
+    return results
+
+def default_cpu_preset():
+    """Preset do libx264 usado sem calibração (e pela chave 'cpu')."""
+    return "veryfast" if IS_ANDROID else "medium"
+
+def rank_calibration(results):
+    """
+    Pares (chave, resultado) dos codificadores que passaram no teste, do mais rápido para o
+    mais lento. Quem gerou arquivo mais de CALIBRATION_SIZE_MARGIN vezes maior que o preset
+    padrão da CPU vai para o fim da lista: ser rápido não compensa arquivos bem maiores.
+    """
+    ok = [(key, res) for key, res in results.items() if res.get('ok')]
+    reference = results.get(f"cpu:{default_cpu_preset()}") or {}
+    limit = reference['size'] * CALIBRATION_SIZE_MARGIN if reference.get('ok') else None
+    return sorted(ok, key=lambda kv: (limit is not None and kv[1]['size'] > limit, -kv[1]['fps']))
+
+def load_calibration():
+    """Resultados da calibração, se existirem e forem deste mesmo binário/versão do ffmpeg."""
+    try:
+        data = json.loads((get_cache_dir() / CALIBRATION_FILE).read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return None
+    if data.get('ffmpeg') != ffmpeg_fingerprint(): return None
+    return data.get('results') or None
+
+def run_calibration_logic():
+    """Fluxo do menu: calibra os codificadores de vídeo e mostra o ranking."""
+    print("\n==========================================================")
+    print("=== Modo: Calibrar Codificadores de VÍDEO ===")
+    print("==========================================================")
+    if not os.path.isfile(FFMPEG): print("ERRO: FFmpeg não encontrado."); return
+    print(f">> Cada codificador fará um teste de {CALIBRATION_SECONDS}s com um vídeo sintético 720p.")
+    results = calibrate_encoders()
+    ranking = [r for _, r in rank_calibration(results)]
+    print("-----------------------------------------------------")
+    if not ranking: print(">> Nenhum codificador funcionou neste ffmpeg."); return
+    print(f">> Ranking (mais rápido primeiro; arquivos mais de {(CALIBRATION_SIZE_MARGIN - 1) * 100:.0f}% maiores que o preset padrão vão para o fim):")
+    for i, r in enumerate(ranking): print(f"   {i+1}) {r['info']['name']}: {r['fps']:.0f} fps, {r['size'] / 1024:.0f} KiB")
+    broken = [r['info']['name'] for r in results.values() if not r['ok']]
+    if broken: print(f">> Escondidos do menu (falharam): {', '.join(broken)}")
+
+def can_remux_video(src: Path, out_ext: str):
+    """True se o primeiro stream de vídeo pode ser copiado sem re-encodar para o contêiner de saída."""
+    info = probe_media(src)
+    if not (info and info.video_streams):
+        return False
+    codec = (info.video_streams[0].get('codec_name') or '').lower()
+    return codec in REMUX_VIDEO_CODECS.get(out_ext.lower(), set())
+
+VIDEO_QUALITY_MAP = {
+    'libx264': {1: 19, 2: 23, 3: 28}, 'h264_qsv': {1: 20, 2: 26, 3: 32},
+    'h264_nvenc': {1: 20, 2: 26, 3: 32}, 'h264_vaapi': {1: 20, 2: 26, 3: 32},
+    'h264_amf': {1: 20, 2: 26, 3: 32}, 'h264_mediacodec': {1: '4M', 2: '2M', 3: '1M'}
+}
+
+# Degraus da escada de resoluções: teto de bitrate do vídeo por preset de qualidade (1-3)
+# e bitrate do áudio AAC nas saídas HLS/DASH.
+LADDER_RUNGS = {
+    1080: {'maxrate': {1: '8M', 2: '5M', 3: '3500k'}, 'audio': '192k'},
+    720: {'maxrate': {1: '5M', 2: '3M', 3: '2M'}, 'audio': '128k'},
+    480: {'maxrate': {1: '2500k', 2: '1500k', 3: '1M'}, 'audio': '96k'},
+    360: {'maxrate': {1: '1200k', 2: '800k', 3: '600k'}, 'audio': '64k'},
+}
+
+def build_video_codec_params(encoder_info: dict, quality_preset: int, threads=None, rung=None):
+    """
+    Parâmetros de vídeo (-c:v ...) do codificador escolhido para o preset de qualidade (1-3).
+    Com `rung` (altura de um degrau da escada), o bitrate fica limitado ao teto do degrau.
+    """
+    encoder = encoder_info['codec']
+    quality_value = VIDEO_QUALITY_MAP.get(encoder, {}).get(quality_preset, 23)
+    maxrate = LADDER_RUNGS[rung]['maxrate'][quality_preset] if rung else None
+    if maxrate and encoder == 'h264_mediacodec': quality_value = maxrate
     vcodec_params = []
     if encoder == 'libx264': vcodec_params.extend(["-c:v", "libx264", "-crf", str(quality_value), "-preset", encoder_info.get('preset', 'medium')])
     elif encoder == 'h264_qsv': vcodec_params.extend(["-c:v", "h264_qsv", "-global_quality", str(quality_value), "-preset", "medium"])
@@ -312,36 +2079,314 @@ def convert_one_video(src: Path, out_ext: str, encoder_info: dict, quality_prese
     elif encoder == 'h264_amf': vcodec_params.extend(["-c:v", "h264_amf", "-qp_i", str(quality_value), "-qp_p", str(quality_value), "-quality", "balanced"])
     elif encoder == 'h264_vaapi': vcodec_params.extend(["-vaapi_device", VAAPI_DEVICE, "-c:v", "h264_vaapi", "-vf", "format=nv12,hwupload", "-qp", str(quality_value)])
     elif encoder == 'h264_mediacodec': vcodec_params.extend(["-c:v", "h264_mediacodec", "-b:v", str(quality_value)])
+    if maxrate and encoder != 'h264_mediacodec': vcodec_params.extend(["-maxrate", maxrate, "-bufsize", maxrate])
+    if threads: vcodec_params.extend(["-threads", str(threads)])
+    return vcodec_params
+
+def audio_bitrate_estimate(src: Path, out_ext: str):
+    """Bits/s previstos para o áudio da saída, pelo mesmo critério de choose_audio_params (0 se desconhecido)."""
+    params = choose_audio_params(src, out_ext)
+    if not params: return 0
+    if params[1] != 'copy': return int(params[params.index('-b:a') + 1].rstrip('k')) * 1000
+    stream = probe_media(src).audio_streams[0]
+    tags = stream.get('tags') or {}
+    for value in (stream.get('bit_rate'), tags.get('BPS'), tags.get('BPS-eng')):
+        try: return int(value)
+        except (TypeError, ValueError): continue
+    return 0
+
+def predict_video_encode(src: Path, out_ext: str, encoder_info: dict, quality_preset: int, threads=None,
+                         samples=SAMPLE_COUNT, seconds=SAMPLE_SECONDS):
+    """
+    Codifica `samples` trechos curtos espalhados pelo vídeo, com o mesmo codificador e
+    qualidade, e extrapola tamanho e tempo da conversão completa.
+    Retorna {'predicted_bytes', 'source_bytes', 'savings', 'encode_seconds'}, ou None se o
+    vídeo for curto demais para amostrar ou uma amostra falhar.
+    """
+    duration = get_duration(str(src))
+    if not duration or duration < samples * seconds * 2: return None
+    vcodec_params = build_video_codec_params(encoder_info, quality_preset, threads)
+    sample_bytes, sample_wall = 0, 0.0
+    # As amostras vão para arquivos temporários (não para a memória), ao lado da origem em preparo.
+    try: tmpdir = Path(tempfile.mkdtemp(prefix=".renoma-sample-", dir=src.parent))
+    except OSError: tmpdir = Path(tempfile.mkdtemp(prefix="renoma-sample-"))
+    try:
+        for i in range(samples):
+            start = duration * (i + 1) / (samples + 1) - seconds / 2
+            out = tmpdir / f"amostra{i}.mkv"
+            cmd = [FFMPEG, "-nostdin", "-y", "-v", "error", "-ss", f"{start:.3f}", "-t", str(seconds), "-i", str(src),
+                   "-map", "0:v:0", *vcodec_params, "-an", "-sn", "-progress", "pipe:1", str(out)]
+            # Mesmo supervisor das conversões (watchdog, prioridade); o progresso das amostras não é o do job.
+            returncode, stats = run_ffmpeg_with_progress(cmd, seconds, on_progress=lambda stats: None)
+            sample_wall += stats.get('elapsed') or 0.0
+            if returncode != 0 or not out.exists() or not out.stat().st_size: return None
+            sample_bytes += out.stat().st_size
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+    sampled = samples * seconds
+    predicted = sample_bytes / sampled * duration + audio_bitrate_estimate(src, out_ext) / 8 * duration
+    source_bytes = src.stat().st_size
+    return {'predicted_bytes': int(predicted), 'source_bytes': source_bytes,
+            'savings': 1 - predicted / source_bytes if source_bytes else 0.0,
+            'encode_seconds': sample_wall / sampled * duration}
+
+def convert_one_video(src: Path, out_ext: str, encoder_info: dict, quality_preset: int,
+                      threads=None, position=None, remux='auto', segmented=False,
+                      min_savings=None, on_unprofitable='skip'):
+    """
+    Converte um único vídeo. `threads` limita as threads do ffmpeg (-threads) e
+    `position` fixa a linha da barra tqdm quando há vários jobs simultâneos.
+    Com remux='auto', só troca o contêiner (-c:v copy) quando o vídeo já é compatível.
+    Com segmented=True, vídeos longos são codificados em segmentos paralelos.
+    Com min_savings (fração, ex.: 0.15), uma pré-codificação de amostras prevê o tamanho
+    final; abaixo dessa economia o arquivo é pulado (JOB_SKIPPED) ou, com
+    on_unprofitable='copy', só tem o contêiner trocado quando possível.
+    Retorna True/False, ou JOB_SKIPPED.
+    """
+    dst = src.with_suffix(f".{out_ext}")
+    if remux == 'auto' and can_remux_video(src, out_ext):
+        encoder_info = {'name': 'Remux (cópia do vídeo)', 'codec': 'copy'}
+    if min_savings is not None and encoder_info['codec'] != 'copy':
+        prediction = predict_video_encode(src, out_ext, encoder_info, quality_preset, threads)
+        if prediction:
+            resumo = (f"previstos {prediction['predicted_bytes'] / 2**20:.0f} MiB de {prediction['source_bytes'] / 2**20:.0f} MiB "
+                      f"(economia de {prediction['savings']:.0%}, ~{format_eta(prediction['encode_seconds'])})")
+            if prediction['savings'] < min_savings:
+                if on_unprofitable == 'copy' and can_remux_video(src, out_ext):
+                    tqdm.write(f"📉 '{src.name}': {resumo}, abaixo do mínimo de {min_savings:.0%}.")
+                    encoder_info = {'name': 'Remux (cópia do vídeo)', 'codec': 'copy'}
+                else:
+                    tqdm.write(f"⏭️  '{src.name}': {resumo}, abaixo do mínimo de {min_savings:.0%}; mantido como está.")
+                    return JOB_SKIPPED
+            else:
+                tqdm.write(f"📈 '{src.name}': {resumo}.")
+    encoder = encoder_info['codec']
+    metrics = JobMetrics('video', src, encoder_metrics_key(encoder_info))
+    if segmented and encoder != 'copy' and get_duration(str(src)) >= SEGMENT_MIN_DURATION:
+        # Em segmentos a vazão é outra: o histórico separa as duas para não misturar previsões.
+        metrics.encoder += ':segmented'
+        ok = convert_one_video_segmented(src, out_ext, encoder_info, quality_preset, threads=threads, position=position)
+        metrics.finish([dst], 0 if ok else 1, ok, {'frame': count_video_frames(dst) if ok else None})
+        return ok
+    if encoder == 'copy':
+        vcodec_params = ["-c:v", "copy"]
+        # HEVC em MP4 precisa da tag hvc1 para tocar em players da Apple.
+        if out_ext.lower() == 'mp4' and (probe_media(src).video_streams[0].get('codec_name') == 'hevc'): vcodec_params.extend(["-tag:v", "hvc1"])
+        tqdm.write(f"⚡ '{src.name}': vídeo já compatível com .{out_ext}, apenas trocando o contêiner.")
+    else:
+        vcodec_params = build_video_codec_params(encoder_info, quality_preset, threads)
     
     # Decisão de ÁUDIO automática (compatibilidade de contêiner)
     audio_params = choose_audio_params(src, out_ext)
 
-    cmd = [ FFMPEG, "-nostdin", "-y", "-i", str(src),
+    # AVI não guarda PTS; ao copiar o vídeo, o ffmpeg precisa gerá-los.
+    input_flags = ["-fflags", "+genpts"] if encoder == 'copy' and src.suffix.lower() == '.avi' else []
+    cmd = [ FFMPEG, "-nostdin", "-y", *input_flags, "-i", str(src),
             "-map", "0:v:0?", "-map", "0:a:0?",
             *vcodec_params,
             *audio_params,
             "-progress", "pipe:1",
             str(dst) ]
     
-    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, stdin=subprocess.DEVNULL, text=True, bufsize=1, encoding='utf-8', errors='replace')
-    
-    dur = get_duration(str(src)); last_update = time.time()
-    desc_text = f"Convertendo {src.name[:40]}..." if len(src.name) > 40 else f"Convertendo {src.name}"
-    bar = tqdm(total=100, desc=desc_text, ncols=80, unit="%")
-    
-    try:
-        for line in proc.stdout:
-            if "out_time_ms=" in line:
-                try:
-                    t = int(line.strip().split("=")[1]) / 1_000_000; pct = min(int(t * 100 / dur), 100)
-                    bar.n = pct; bar.refresh(); last_update = time.time()
-                except (ValueError, IndexError): continue
-            if time.time() - last_update > WATCHDOG_TIMEOUT:
-                bar.write(f"⚠️  Sem progresso por {WATCHDOG_TIMEOUT}s. Abortando..."); proc.kill(); break
-        bar.n = 100; bar.refresh(); proc.wait()
-    finally: bar.close()
-    if proc.returncode == 0 and dst.exists() and dst.stat().st_size > 1024: print("✅ Conversão de vídeo concluída!"); return True
-    print(f"❌ Erro na conversão de vídeo (código: {proc.returncode})."); dst.unlink(missing_ok=True); return False
+    returncode, stats = run_ffmpeg_with_progress(cmd, get_duration(str(src)), progress_desc(src), position)
+    ok = returncode == 0 and dst.exists() and dst.stat().st_size > 1024
+    if not ok: dst.unlink(missing_ok=True)
+    metrics.finish([dst], returncode, ok, stats)
+    if ok: tqdm.write(f"✅ Conversão de vídeo concluída: '{src.name}'"); return True
+    tqdm.write(f"❌ Erro na conversão de vídeo '{src.name}' (código: {returncode})."); return False
+
+def count_video_frames(file_path):
+    """Conta os pacotes do primeiro stream de vídeo (demux completo, sem decodificar); None se falhar."""
+    returncode, out = run_media_tool([FFPROBE, '-v', 'error', '-select_streams', 'v:0', '-count_packets',
+                                      '-show_entries', 'stream=nb_read_packets', '-of', 'csv=p=0', str(file_path)], text=True)
+    try: return int(out.strip().split(',')[0]) if returncode == 0 else None
+    except ValueError: return None
+
+def verify_segmented_output(src: Path, dst: Path):
+    """Confere se a saída tem a mesma duração (±1 s) e o mesmo número de quadros da origem."""
+    src_info, dst_info = probe_media(src), probe_media(dst)
+    if not (src_info and dst_info and src_info.duration and dst_info.duration):
+        return False, "não foi possível ler a duração"
+    if abs(src_info.duration - dst_info.duration) > 1.0:
+        return False, f"duração {dst_info.duration:.2f}s ≠ {src_info.duration:.2f}s"
+    src_frames, dst_frames = count_video_frames(src), count_video_frames(dst)
+    if src_frames is None or dst_frames is None or src_frames != dst_frames:
+        return False, f"quadros {dst_frames} ≠ {src_frames}"
+    return True, ""
+
+_passthrough_args = None
+
+def passthrough_timestamps_args():
+    """
+    Opção que mantém os timestamps de cada quadro como vieram: '-fps_mode passthrough' no
+    ffmpeg 5.1 ou mais novo, '-vsync passthrough' nos anteriores (decidido uma vez, pelo -h).
+    """
+    global _passthrough_args
+    if _passthrough_args is None:
+        try: help_text = subprocess.check_output([FFMPEG, '-hide_banner', '-h', 'long'], text=True, stderr=subprocess.DEVNULL)
+        except (OSError, subprocess.SubprocessError): help_text = ""
+        _passthrough_args = ["-fps_mode" if re.search(r'^-fps_mode\b', help_text, re.M) else "-vsync", "passthrough"]
+    return _passthrough_args
+
+def convert_one_video_segmented(src: Path, out_ext: str, encoder_info: dict, quality_preset: int,
+                                threads=None, position=None) -> bool:
+    """
+    Modo dividir-codificar-juntar para vídeos longos:
+      1. corta só o vídeo nos keyframes (cópia, -f segment);
+      2. codifica os segmentos em paralelo dentro do orçamento de núcleos do job;
+      3. junta com o concat demuxer e remuxa o áudio da origem (tratado à parte, sem cortes);
+      4. confere duração e número de quadros contra a origem.
+    """
+    dst = src.with_suffix(f".{out_ext}")
+    core_share = threads or default_core_budget()
+    workers = max(2, core_share // SEGMENT_THREADS)
+    seg_threads = max(1, core_share // workers)
+    seg_time = max(30.0, get_duration(str(src)) / (workers * 2))  # 2 segmentos por worker equilibram a fila
+    input_flags = ["-fflags", "+genpts"] if src.suffix.lower() == '.avi' else []
+    ok = False
+    with tempfile.TemporaryDirectory(prefix=".renoma-seg-", dir=str(src.parent)) as tmp:
+        tmp = Path(tmp)
+        split_cmd = [FFMPEG, "-nostdin", "-y", "-v", "error", *input_flags, "-i", str(src),
+                     "-map", "0:v:0", "-c", "copy", "-f", "segment", "-segment_time", f"{seg_time:.3f}",
+                     "-reset_timestamps", "1", "-progress", "pipe:1", str(tmp / "src_%05d.mkv")]
+        if run_ffmpeg_with_progress(split_cmd)[0] != 0:
+            tqdm.write(f"❌ Falha ao dividir '{src.name}' em segmentos."); return False
+        chunks = sorted(tmp.glob("src_*.mkv"))
+        tqdm.write(f"✂️  '{src.name}': {len(chunks)} segmentos, {workers} em paralelo com {seg_threads} thread(s) cada.")
+        vcodec_params = build_video_codec_params(encoder_info, quality_preset, seg_threads)
+
+        def _encode_chunk(chunk, slot):
+            out = tmp / chunk.name.replace("src_", "enc_")
+            cmd = [FFMPEG, "-nostdin", "-y", "-v", "error", "-i", str(chunk), "-map", "0:v:0",
+                   *vcodec_params, *passthrough_timestamps_args(), "-an", "-progress", "pipe:1", str(out)]
+            return run_ffmpeg_with_progress(cmd)[0] == 0
+
+        bar = tqdm(total=len(chunks), desc=progress_desc(src, "Segmentos"), ncols=80, unit="seg", position=position, leave=position is None)
+        try:
+            failed = 0
+            for _, chunk_ok in run_job_pool(chunks, _encode_chunk, workers):
+                failed += not chunk_ok; bar.update(1)
+        finally: bar.close()
+        if failed:
+            tqdm.write(f"❌ {failed} segmento(s) de '{src.name}' falharam."); return False
+
+        concat_list = tmp / "concat.txt"
+        concat_list.write_text("".join(f"file '{c.name.replace('src_', 'enc_')}'\n" for c in chunks), encoding='utf-8')
+        join_cmd = [FFMPEG, "-nostdin", "-y", "-v", "error", "-f", "concat", "-safe", "0", "-i", str(concat_list),
+                    *input_flags, "-i", str(src), "-map", "0:v:0", "-map", "1:a:0?",
+                    "-c:v", "copy", *choose_audio_params(src, out_ext), "-progress", "pipe:1", str(dst)]
+        rc = run_ffmpeg_with_progress(join_cmd)[0]
+        if rc == 0 and dst.exists():
+            ok, reason = verify_segmented_output(src, dst)
+            if not ok: tqdm.write(f"❌ Verificação de '{dst.name}' falhou: {reason}.")
+    if ok: tqdm.write(f"✅ Conversão de vídeo concluída (segmentada): '{src.name}'"); return True
+    tqdm.write(f"❌ Erro na conversão segmentada de '{src.name}'."); dst.unlink(missing_ok=True); return False
+
+def ask_parallelism(ask_budget=True):
+    """Pergunta quantas conversões simultâneas e o orçamento de núcleos; retorna (jobs, núcleos)."""
+    cores = default_core_budget()
+    print(f"\n>> Quantas conversões SIMULTÂNEAS? (Enter = {MAX_PARALLEL_JOBS})")
+    jobs_choice = input(f"   Número de jobs (1-{cores}): ").strip()
+    max_jobs = int(jobs_choice) if jobs_choice.isdigit() and int(jobs_choice) > 0 else MAX_PARALLEL_JOBS
+    core_budget = cores
+    if max_jobs > 1 and ask_budget:
+        budget_choice = input(f"   Orçamento de núcleos a dividir entre os jobs (Enter = {cores}): ").strip()
+        if budget_choice.isdigit() and int(budget_choice) > 0: core_budget = int(budget_choice)
+    return max_jobs, core_budget
+
+def ask_delete_policy():
+    """Pergunta o que fazer com os originais convertidos; retorna a chave de DELETE_POLICIES."""
+    print("\n>> Após uma conversão bem-sucedida, como lidar com o arquivo original?")
+    keys = list(DELETE_POLICIES)
+    for i, key in enumerate(keys): print(f"   {i+1}) {DELETE_POLICIES[key]}" + (" [Padrão]" if key == 'ask' else ""))
+    choice = input(f"   Digite a opção de deleção (1-{len(keys)}): ").strip()
+    return keys[int(choice) - 1] if choice.isdigit() and 1 <= int(choice) <= len(keys) else 'ask'
+
+def ask_job_order():
+    """Pergunta a ordem dos arquivos no lote; retorna a chave de JOB_ORDERS."""
+    print("\n>> Em que ordem processar os arquivos?")
+    keys = list(JOB_ORDERS)
+    for i, key in enumerate(keys): print(f"   {i+1}) {JOB_ORDERS[key]}" + (" [Padrão]" if key == 'natural' else ""))
+    choice = input(f"   Digite a opção (1-{len(keys)}): ").strip()
+    return keys[int(choice) - 1] if choice.isdigit() and 1 <= int(choice) <= len(keys) else 'natural'
+
+def resolve_encoder(key=None):
+    """
+    Converte a chave de um codificador (ex.: 'cpu', 'nvenc', 'cpu:veryfast') no dict do codificador.
+    Sem chave, usa o mais rápido calibrado (ou a CPU).
+    """
+    available = get_available_encoders()
+    if not key: return next(iter(available.values()))
+    if key in available: return available[key]
+    if key.startswith('cpu:'):
+        return {'name': f'CPU (libx264 - preset {key[4:]})', 'codec': 'libx264', 'preset': key[4:]}
+    if key in HW_ENCODERS: return dict(HW_ENCODERS[key])
+    raise ValueError(f"codificador desconhecido '{key}' (disponíveis: {', '.join(available)})")
+
+def build_video_job(opts):
+    """
+    Valida as opções de um lote de vídeo e monta as funções do job: 'outputs_for'(origem)
+    e 'convert'(origem, position). `opts` traz input_ext, output_ext, encoder, quality,
+    remux, segmented, min_savings (em %), on_unprofitable, ladder, ladder_format, jobs e
+    cores (as mesmas chaves da linha de comando).
+    """
+    input_exts, output_ext = parse_extensions(opts.get('input_ext') or ''), (opts.get('output_ext') or '').lower().lstrip('.')
+    if not input_exts or output_ext not in ('mp4', 'mkv'): raise ValueError("vídeo exige --input-ext e --output-ext (mp4 ou mkv)")
+    ladder, ladder_format = (parse_ladder(opts['ladder']) if opts.get('ladder') else None), opts.get('ladder_format') or 'files'
+    # Vale também na escada: um 'nome.720p.mp4' com extensão de entrada viraria origem na próxima
+    # varredura (ou na hora, no watch) e geraria 'nome.720p.480p.mp4' sem fim.
+    if output_ext in input_exts: raise ValueError("o formato de entrada e saída não podem ser iguais")
+    encoder_info = opts.get('encoder_info') or resolve_encoder(opts.get('encoder'))
+    quality_preset = int(opts.get('quality') or 2)
+    remux, segmented = opts.get('remux') or 'auto', bool(opts.get('segmented'))
+    min_savings = None if opts.get('min_savings') is None else float(opts['min_savings']) / 100
+    on_unprofitable = opts.get('on_unprofitable') or 'skip'
+    max_jobs, core_budget = int(opts.get('jobs') or MAX_PARALLEL_JOBS), int(opts.get('cores') or default_core_budget())
+    threads = split_thread_budget(core_budget, max_jobs) if (max_jobs > 1 or core_budget != default_core_budget()) else None
+    governor = governor_from_opts(opts, max_jobs, threads)
+    _threads = governor.threads if governor else (lambda: threads)  # consultado a cada job novo
+    def _metrics_key(f):  # o nome com que o job aparece no histórico de vazão
+        if ladder: return f"{encoder_metrics_key(encoder_info)}:ladder-{ladder_format}"
+        if remux == 'auto' and can_remux_video(f, output_ext): return 'copy'
+        key = encoder_metrics_key(encoder_info)
+        if segmented and key != 'copy' and get_duration(str(f)) >= SEGMENT_MIN_DURATION: key += ':segmented'
+        return key
+    if ladder:
+        outputs_for = lambda f: ladder_outputs_for(f, ladder_rungs_for(f, ladder), output_ext, ladder_format)
+        convert = lambda f, position: convert_one_video_ladder(f, output_ext, encoder_info, quality_preset, ladder,
+                                                               ladder_format, threads=_threads(), position=position)
+    else:
+        outputs_for = lambda f: [f.with_suffix(f".{output_ext}")]
+        convert = lambda f, position: convert_one_video(f, output_ext, encoder_info, quality_preset, threads=_threads(),
+                                                        position=position, remux=remux, segmented=segmented,
+                                                        min_savings=min_savings, on_unprofitable=on_unprofitable)
+    return {'label': "VÍDEO", 'input_exts': input_exts, 'outputs_for': outputs_for, 'convert': convert,
+            'estimate': lambda f: predict_job_seconds(f, _metrics_key(f)), 'jobs': max_jobs, 'threads': threads,
+            'governor': governor}
+
+def run_video_batch(opts, input_files=None, interactive=False, **batch_kw):
+    """
+    Executa um lote de conversão de vídeo sem menus: as opções de build_video_job,
+    mais delete, scratch_dir, io_per_device e as de varredura de scan_from_opts.
+    """
+    job = build_video_job(opts)
+    if not os.path.isfile(FFMPEG) or not os.path.isfile(FFPROBE): raise RuntimeError("FFmpeg ou FFprobe não encontrado")
+    if job['jobs'] > 1: print(f"\n>> {job['jobs']} conversões simultâneas, {job['threads']} thread(s) do ffmpeg por job.")
+    return run_job_batch(job, opts, input_files, interactive, **batch_kw)
+
+def run_job_batch(job, opts, input_files=None, interactive=False, convert=None, max_jobs=None, stage=True,
+                  on_event=None, executor=None):
+    """
+    Roda o lote de um job montado por build_video_job/build_audio_job (ou de `convert` remoto),
+    na ordem pedida em opts['order'] (JOB_ORDERS), com o diário em opts['dir'].
+    """
+    if input_files is None: input_files = scan_from_opts(opts, job['input_exts'])
+    input_files = order_jobs(input_files, opts.get('order'), job.get('estimate'))
+    return run_conversion_batch(
+        job['label'], input_files, job['outputs_for'], convert or job['convert'], max_jobs or job['jobs'],
+        opts.get('delete') or 'ask', interactive, opts.get('scratch_dir') or SCRATCH_DIR,
+        opts.get('io_per_device') or IO_PER_DEVICE, stage, job.get('estimate'), job.get('governor'),
+        opts.get('dir') or '.', on_event, executor)
 
 def run_video_convert_logic():
     platform_name = "Android" if IS_ANDROID else ("Windows" if IS_WINDOWS else "Linux")
@@ -349,13 +2394,17 @@ def run_video_convert_logic():
     print(f"=== Modo: Converter Arquivos de VÍDEO ({platform_name}) ===")
     print("==========================================================")
     available_encoders = get_available_encoders()
+    calibrated = any('fps' in info for info in available_encoders.values())
     if len(available_encoders) > 1:
         print(">> Escolha o Codificador de Vídeo (Placa de Vídeo/CPU):")
-        options = sorted(available_encoders.keys(), key=lambda x: (x != 'mediacodec', x != 'cpu'))
-        for i, key in enumerate(options): print(f"   {i+1}) {available_encoders[key]['name']}")
+        if calibrated: options = list(available_encoders.keys())  # já ordenados pelo mais rápido medido
+        else: options = sorted(available_encoders.keys(), key=lambda x: (x != 'mediacodec', x != 'cpu'))
+        for i, key in enumerate(options): print(f"   {i+1}) {available_encoders[key]['name']}" + (" [Padrão: mais rápido]" if calibrated and i == 0 else ""))
+        if not calibrated: print("   (Dica: use 'Calibrar codificadores' no menu principal para medir e ordenar.)")
         while True:
             try:
-                choice = int(input(f"   Digite a opção (1-{len(options)}): ").strip())
+                raw_choice = input(f"   Digite a opção (1-{len(options)}): ").strip()
+                choice = 1 if calibrated and not raw_choice else int(raw_choice)
                 if 1 <= choice <= len(options):
                     chosen_encoder_key = options[choice - 1]; encoder_info = available_encoders[chosen_encoder_key]
                     print(f"   -> Usando: {encoder_info['name']}"); break
@@ -382,10 +2431,24 @@ def run_video_convert_logic():
     quality_preset = 2; quality_choice = input("   Digite a opção de Qualidade (1, 2 ou 3): ").strip()
     if quality_choice in ["1", "2", "3"]: quality_preset = int(quality_choice)
     else: print("   Opção inválida, usando qualidade Média (2).")
-    print("\n>> Após uma conversão bem-sucedida, como lidar com o arquivo original?")
-    print("   1) Deletar AUTOMATICAMENTE\n   2) PERGUNTAR antes de deletar [Padrão]")
-    delete_mode = "2"; delete_choice = input("   Digite a opção de deleção (1 ou 2): ").strip()
-    if delete_choice == "1": delete_mode = "1"
+    print("\n>> Quando o vídeo já for H.264/HEVC, apenas trocar o contêiner (remux, sem perda)?")
+    print("   1) Sim, AUTOMÁTICO [Padrão]\n   2) Não, sempre re-encodar")
+    remux = 'never' if input("   Digite a opção (1 ou 2): ").strip() == "2" else 'auto'
+    print(f"\n>> Dividir vídeos longos (≥ {SEGMENT_MIN_DURATION // 60} min) em segmentos codificados em paralelo?")
+    segmented = input("   Útil quando o lote tem poucos arquivos longos (s/N): ").strip().lower() == 's'
+    print("\n>> Prever o tamanho final com amostras e só converter quando valer a pena?")
+    min_savings, on_unprofitable = None, 'skip'
+    while True:
+        raw = input("   Economia mínima em % (ex.: 15; Enter = converter tudo): ").strip().rstrip('%')
+        if not raw: break
+        try: min_savings = float(raw); break
+        except ValueError: print("   ERRO: Digite um número.")
+    if min_savings is not None:
+        print("   Abaixo do mínimo: 1) Manter o original [Padrão]  2) Só trocar o contêiner, quando possível")
+        if input("   Digite a opção (1 ou 2): ").strip() == "2": on_unprofitable = 'copy'
+    delete_policy = ask_delete_policy()
+    max_jobs, core_budget = ask_parallelism()
+    order = ask_job_order()
     if not os.path.isfile(FFMPEG) or not os.path.isfile(FFPROBE): print("ERRO: FFmpeg ou FFprobe não encontrado."); return
 
     # Coleta case-insensitive + ordenação natural
@@ -397,66 +2460,166 @@ def run_video_convert_logic():
     print("-----------------------------------------------------")
     confirm_batch = input(f">> Confirma a conversão de {len(input_files)} arquivos? (s/N): ").strip()
     if confirm_batch.lower() != 's': print("Conversão cancelada."); return
-    converted_count, error_count, removed_count, failed_files = 0, 0, 0, []
-    for i, input_file in enumerate(input_files):
-        if input_file.name == os.path.basename(__file__): continue
-        print(f"\n--- [{i+1}/{len(input_files)}] Processando: '{input_file.name}' ---")
-        if convert_one_video(input_file, output_ext, encoder_info, quality_preset):
-            converted_count += 1
-            should_remove = False
-            if delete_mode == "1": should_remove = True
-            else:
-                confirm_rm = input(f"    Remover o original '{input_file.name}'? (s/N): ").strip()
-                if confirm_rm.lower() == 's': should_remove = True
-            if should_remove:
-                try: input_file.unlink(); print(f"     -> Original '{input_file.name}' removido."); removed_count += 1
-                except Exception as e: print(f"     -> ERRO ao remover original: {e}"); error_count += 1
-            else: print("     -> Original NÃO removido.")
-        else: error_count += 1; failed_files.append(input_file.name)
-        print("-----------------------------------------------------")
-    print("\n======================================================")
-    print(f">> Processamento de VÍDEO Concluído.")
-    print(f"- Arquivos convertidos: {converted_count}\n- Originais removidos: {removed_count}\n- Erros: {error_count}")
-    if failed_files:
-        print(f"- Arquivos que falharam:"); [print(f"  • {f}") for f in failed_files]
-    print("======================================================")
+    execute_job(VideoJob(files=[str(f) for f in input_files], input_ext=input_ext, output_ext=output_ext,
+                         encoder_info=encoder_info, quality=quality_preset, remux=remux, segmented=segmented,
+                         min_savings=min_savings, on_unprofitable=on_unprofitable, jobs=max_jobs, cores=core_budget,
+                         delete=delete_policy, order=order), interactive=True)
 
 # ─────────────────── Lógica de Conversão de ÁUDIO ───────────────────
-def convert_one_audio(src: Path, preset_info: dict) -> bool:
-    """Converte um único arquivo de áudio usando o preset selecionado."""
-    dst = src.with_suffix(f".{preset_info['ext']}")
-    if src.resolve() == dst.resolve():
-        print(f"⚠️  O arquivo de origem e destino são os mesmos ('{src.name}'). Pulando para evitar sobrescrever.")
-        return False
+AUDIO_PRESETS = {
+    '1': {'name': 'Lossless (FLAC)', 'codec': 'flac', 'ext': 'flac', 'params': ['-compression_level', '8']},
+    '2': {'name': 'Alta Qualidade (MP3, 320kbps CBR)', 'codec': 'libmp3lame', 'ext': 'mp3', 'params': ['-b:a', '320k']},
+    '3': {'name': 'Alta Qualidade (AAC/M4A, ~256kbps VBR)', 'codec': 'aac', 'ext': 'm4a', 'params': ['-q:a', '5']},
+    '4': {'name': 'Qualidade Média (MP3, 192kbps CBR)', 'codec': 'libmp3lame', 'ext': 'mp3', 'params': ['-b:a', '192k']},
+    '5': {'name': 'Qualidade Média (AAC/M4A, ~160kbps VBR)', 'codec': 'aac', 'ext': 'm4a', 'params': ['-q:a', '4']}
+}
 
-    cmd = [
-        FFMPEG, "-nostdin", "-y", "-i", str(src),
-        "-map", "0:a:0?", "-map_metadata", "0",
-        "-c:a", preset_info['codec'],
-        *preset_info['params'],
-        "-progress", "pipe:1",
-        str(dst)
-    ]
-    
-    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, stdin=subprocess.DEVNULL, text=True, bufsize=1, encoding='utf-8', errors='replace')
-    
-    dur = get_duration(str(src)); last_update = time.time()
-    desc_text = f"Convertendo {src.name[:40]}..." if len(src.name) > 40 else f"Convertendo {src.name}"
-    bar = tqdm(total=100, desc=desc_text, ncols=80, unit="%")
+class AudioFingerprintIndex:
+    """
+    Cache SQLite de impressões digitais do áudio decodificado (muxer `hash` do ffmpeg),
+    válidas enquanto (caminho, tamanho, mtime_ns) não mudar, e das saídas já geradas
+    para cada (impressão, preset). As duas tabelas guardam no máximo
+    FINGERPRINT_CACHE_MAX entradas; as usadas há mais tempo são descartadas.
+    """
+
+    def __init__(self, db_path):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(db_path), timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""CREATE TABLE IF NOT EXISTS fingerprints (
+                path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL,
+                hash TEXT NOT NULL, last_used REAL NOT NULL)""")
+            self._conn.execute("""CREATE TABLE IF NOT EXISTS outputs (
+                hash TEXT NOT NULL, preset TEXT NOT NULL, path TEXT NOT NULL, size INTEGER NOT NULL,
+                last_used REAL NOT NULL, PRIMARY KEY (hash, preset))""")
 
+    def _evict(self, table):
+        (count,) = self._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()
+        if count > FINGERPRINT_CACHE_MAX:
+            self._conn.execute(f"DELETE FROM {table} WHERE rowid IN (SELECT rowid FROM {table} ORDER BY last_used LIMIT ?)",
+                               (count - FINGERPRINT_CACHE_MAX,))
+
+    def fingerprint(self, path, cache_as=None):
+        """
+        SHA-256 do primeiro stream de áudio decodificado de `path`; None se não houver áudio.
+        Com `cache_as` (o original na biblioteca de uma cópia em preparo), decodifica `path`
+        mas guarda a impressão sob o original, que é o que persiste entre execuções.
+        """
+        try:
+            path = os.path.abspath(str(path)); key = os.path.abspath(str(cache_as or path))
+            st = os.stat(key)
+            if os.stat(path).st_size != st.st_size: key, st = path, os.stat(path)  # cópia divergente: não confia no original
+        except OSError:
+            return None
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT hash FROM fingerprints WHERE path = ? AND size = ? AND mtime_ns = ?",
+                                     (key, st.st_size, st.st_mtime_ns)).fetchone()
+            if row: self._conn.execute("UPDATE fingerprints SET last_used = ? WHERE path = ?", (time.time(), key))
+        if row: return row[0]
+        returncode, out = run_media_tool([FFMPEG, "-nostdin", "-v", "error", "-i", path, "-map", "0:a:0",
+                                          "-f", "hash", "-hash", "sha256", "-"], text=True)
+        digest = out.strip().partition('=')[2] if returncode == 0 else ''
+        if not digest: return None
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO fingerprints VALUES (?, ?, ?, ?, ?)",
+                               (key, st.st_size, st.st_mtime_ns, digest, time.time()))
+            self._evict('fingerprints')
+        return digest
+
+    @staticmethod
+    def preset_signature(preset):
+        return json.dumps([preset['codec'], preset['ext'], preset['params']])
+
+    def lookup(self, digest, preset):
+        """Saída já gerada para esse áudio com esse preset, se ainda existir com o mesmo tamanho."""
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT path, size FROM outputs WHERE hash = ? AND preset = ?",
+                                     (digest, self.preset_signature(preset))).fetchone()
+            if row: self._conn.execute("UPDATE outputs SET last_used = ? WHERE hash = ? AND preset = ?",
+                                       (time.time(), digest, self.preset_signature(preset)))
+        if not row: return None
+        try: return Path(row[0]) if os.stat(row[0]).st_size == row[1] else None
+        except OSError: return None
+
+    def register(self, digest, preset, path, size):
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO outputs VALUES (?, ?, ?, ?, ?)",
+                               (digest, self.preset_signature(preset), os.path.abspath(str(path)), size, time.time()))
+            self._evict('outputs')
+
+_fingerprint_index = None
+
+def get_fingerprint_index():
+    """Abre (uma vez) o índice de impressões de áudio; retorna None se o disco não permitir."""
+    global _fingerprint_index
+    with _probe_cache_lock:
+        if _fingerprint_index is None:
+            try: _fingerprint_index = AudioFingerprintIndex(get_cache_dir() / FINGERPRINT_CACHE_FILE)
+            except (OSError, sqlite3.Error): _fingerprint_index = False
+        return _fingerprint_index or None
+
+def link_or_copy(existing, dst):
+    """Hardlink de `existing` em `dst` (sem ocupar espaço); entre discos ou sem suporte, cópia."""
     try:
-        for line in proc.stdout:
-            if "out_time_ms=" in line:
+        os.link(existing, dst)
+    except OSError:
+        shutil.copyfile(existing, dst)
+
+def audio_outputs_for(src: Path, presets):
+    """Caminhos de saída de `src` para cada preset (um por extensão)."""
+    return [src.with_suffix(f".{p['ext']}") for p in presets]
+
+def convert_one_audio(src: Path, preset_info, position=None, dedup=False) -> bool:
+    """
+    Converte um único arquivo de áudio usando o preset selecionado.
+    `preset_info` pode ser uma lista de presets: a origem é lida e decodificada
+    uma única vez e o ffmpeg grava todas as saídas na mesma execução.
+    Com dedup=True, um áudio idêntico (mesma impressão do áudio decodificado) já
+    convertido com o mesmo preset é reaproveitado por hardlink/cópia, sem codificar.
+    """
+    presets = preset_info if isinstance(preset_info, (list, tuple)) else [preset_info]
+    dsts = audio_outputs_for(src, presets)
+    if any(src.resolve() == dst.resolve() for dst in dsts):
+        print(f"⚠️  O arquivo de origem e destino são os mesmos ('{src.name}'). Pulando para evitar sobrescrever.")
+        return False
+
+    index = get_fingerprint_index() if dedup else None
+    origin = staged_origin(src)
+    digest = index.fingerprint(src, cache_as=origin) if index else None
+    if digest:
+        pending = []
+        for preset, dst in zip(presets, dsts):
+            existing = index.lookup(digest, preset)
+            if existing and existing != Path(os.path.abspath(origin.with_suffix(f".{preset['ext']}"))):
                 try:
-                    t = int(line.strip().split("=")[1]) / 1_000_000; pct = min(int(t * 100 / dur), 100)
-                    bar.n = pct; bar.refresh(); last_update = time.time()
-                except (ValueError, IndexError): continue
-            if time.time() - last_update > WATCHDOG_TIMEOUT:
-                bar.write(f"⚠️  Sem progresso por {WATCHDOG_TIMEOUT}s. Abortando..."); proc.kill(); break
-        bar.n = 100; bar.refresh(); proc.wait()
-    finally: bar.close()
-    if proc.returncode == 0 and dst.exists() and dst.stat().st_size > 100: print("✅ Conversão de áudio concluída!"); return True
-    print(f"❌ Erro na conversão de áudio (código: {proc.returncode})."); dst.unlink(missing_ok=True); return False
+                    link_or_copy(existing, dst)
+                    tqdm.write(f"♻️  '{src.name}': áudio idêntico a '{existing.name}', .{preset['ext']} reaproveitado."); continue
+                except OSError:
+                    pass
+            pending.append(preset)
+        if not pending: return True
+        presets, dsts = pending, audio_outputs_for(src, pending)
+
+    cmd = [FFMPEG, "-nostdin", "-y", "-i", str(src)]
+    for preset, dst in zip(presets, dsts):
+        cmd += ["-map", "0:a:0?", "-map_metadata", "0",
+                "-c:a", preset['codec'], *preset['params'], str(dst)]
+    # Opções globais podem vir depois das saídas; o -progress vale para a execução toda.
+    cmd += ["-progress", "pipe:1"]
+    
+    metrics = JobMetrics('audio', src, "+".join(p['codec'] for p in presets))
+    returncode, stats = run_ffmpeg_with_progress(cmd, get_duration(str(src)), progress_desc(src), position)
+    ok = returncode == 0 and all(dst.exists() and dst.stat().st_size > 100 for dst in dsts)
+    if not ok:
+        for dst in dsts: dst.unlink(missing_ok=True)
+    metrics.finish(dsts, returncode, ok, stats)
+    if ok and digest:
+        # Registra o caminho final (na biblioteca), não o da pasta de preparo.
+        for preset, dst in zip(presets, dsts):
+            index.register(digest, preset, origin.with_suffix(f".{preset['ext']}"), dst.stat().st_size)
+    if ok: tqdm.write(f"✅ Conversão de áudio concluída: '{src.name}' -> {', '.join('.' + p['ext'] for p in presets)}"); return True
+    tqdm.write(f"❌ Erro na conversão de áudio '{src.name}' (código: {returncode})."); return False
 
 def run_audio_convert_logic():
     """Função principal para o fluxo de conversão de áudio."""
@@ -464,31 +2627,25 @@ def run_audio_convert_logic():
     print("=== Modo: Converter Arquivos de ÁUDIO ===")
     print("==========================================================")
     
-    audio_presets = {
-        '1': {'name': 'Lossless (FLAC)', 'codec': 'flac', 'ext': 'flac', 'params': ['-compression_level', '8']},
-        '2': {'name': 'Alta Qualidade (MP3, 320kbps CBR)', 'codec': 'libmp3lame', 'ext': 'mp3', 'params': ['-b:a', '320k']},
-        '3': {'name': 'Alta Qualidade (AAC/M4A, ~256kbps VBR)', 'codec': 'aac', 'ext': 'm4a', 'params': ['-q:a', '5']},
-        '4': {'name': 'Qualidade Média (MP3, 192kbps CBR)', 'codec': 'libmp3lame', 'ext': 'mp3', 'params': ['-b:a', '192k']},
-        '5': {'name': 'Qualidade Média (AAC/M4A, ~160kbps VBR)', 'codec': 'aac', 'ext': 'm4a', 'params': ['-q:a', '4']}
-    }
-    
     print(">> Escolha o formato de ENTRADA (origem):")
     input_ext = input("   Digite a extensão dos arquivos de origem (ex: flac, wav, m4a): ").strip().lower().replace('.', '')
     if not input_ext: print("ERRO: Extensão de entrada não pode ser vazia."); return
         
     print("\n>> Escolha a QUALIDADE e o FORMATO de SAÍDA:")
-    for key, value in audio_presets.items(): print(f"   {key}) {value['name']}")
+    for key, value in AUDIO_PRESETS.items(): print(f"   {key}) {value['name']}")
+    print("   (Vários formatos de uma vez: separe por vírgula, ex: 1,2,3 — a origem é lida uma única vez.)")
     
-    preset_choice = ""
-    while preset_choice not in audio_presets:
-        preset_choice = input(f"   Digite a opção (1-{len(audio_presets)}): ").strip()
-    chosen_preset = audio_presets[preset_choice]
-    print(f"   -> Formato de saída será: .{chosen_preset['ext']}")
+    while True:
+        preset_spec = input(f"   Digite a(s) opção(ões) (1-{len(AUDIO_PRESETS)}): ").strip()
+        try: chosen_presets = parse_audio_presets(preset_spec, input_ext); break
+        except ValueError as e: print(f"   ERRO: {e}.")
+    print(f"   -> Formato(s) de saída: {', '.join('.' + p['ext'] for p in chosen_presets)}")
     
-    print("\n>> Após uma conversão bem-sucedida, como lidar com o arquivo original?")
-    print("   1) Deletar AUTOMATICAMENTE\n   2) PERGUNTAR antes de deletar [Padrão]")
-    delete_mode = "2"; delete_choice = input("   Digite a opção de deleção (1 ou 2): ").strip()
-    if delete_choice == "1": delete_mode = "1"
+    print("\n>> Reaproveitar conversões de áudios idênticos (mesma faixa com outro nome ou contêiner)?")
+    dedup = input("   Cada origem é decodificada uma vez para gerar a impressão (s/N): ").strip().lower() == 's'
+    delete_policy = ask_delete_policy()
+    max_jobs, _ = ask_parallelism(ask_budget=False)
+    order = ask_job_order()
 
     if not os.path.isfile(FFMPEG) or not os.path.isfile(FFPROBE): print("ERRO: FFmpeg ou FFprobe não encontrado."); return
 
@@ -499,37 +2656,863 @@ def run_audio_convert_logic():
     print(f"\nArquivos *.{input_ext} encontrados ({len(input_files)}):")
     for file in input_files: print(f"  {file.name}")
     print("-----------------------------------------------------")
-    confirm_batch = input(f">> Confirma a conversão de {len(input_files)} arquivos para '{chosen_preset['name']}'? (s/N): ").strip()
+    confirm_batch = input(f">> Confirma a conversão de {len(input_files)} arquivos para '{' + '.join(p['name'] for p in chosen_presets)}'? (s/N): ").strip()
     if confirm_batch.lower() != 's': print("Conversão cancelada."); return
+    execute_job(AudioJob(files=[str(f) for f in input_files], input_ext=input_ext, presets=preset_spec, dedup=dedup,
+                         jobs=max_jobs, delete=delete_policy, order=order), interactive=True)
 
-    converted_count, error_count, removed_count, failed_files = 0, 0, 0, []
-    for i, input_file in enumerate(input_files):
-        if input_file.name == os.path.basename(__file__): continue
-        print(f"\n--- [{i+1}/{len(input_files)}] Processando: '{input_file.name}' ---")
-        if convert_one_audio(input_file, chosen_preset):
-            converted_count += 1
-            should_remove = False
-            if delete_mode == "1": should_remove = True
-            else:
-                confirm_rm = input(f"    Remover o original '{input_file.name}'? (s/N): ").strip()
-                if confirm_rm.lower() == 's': should_remove = True
-            if should_remove:
-                try: input_file.unlink(); print(f"     -> Original '{input_file.name}' removido."); removed_count += 1
-                except Exception as e: print(f"     -> ERRO ao remover original: {e}"); error_count += 1
-            else: print("     -> Original NÃO removido.")
-        else: error_count += 1; failed_files.append(input_file.name)
-        print("-----------------------------------------------------")
-    print("\n======================================================")
-    print(f">> Processamento de ÁUDIO Concluído.")
-    print(f"- Arquivos convertidos: {converted_count}\n- Originais removidos: {removed_count}\n- Erros: {error_count}")
-    if failed_files:
-        print(f"- Arquivos que falharam:"); [print(f"  • {f}") for f in failed_files]
-    print("======================================================")
+def parse_audio_presets(spec, input_exts):
+    """Converte '1,2,3' na lista de presets, validando extensões repetidas ou iguais à da origem."""
+    keys = [k.strip() for k in str(spec or '').split(',') if k.strip()]
+    if not keys or any(k not in AUDIO_PRESETS for k in keys):
+        raise ValueError(f"presets inválidos '{spec}' (opções: {', '.join(AUDIO_PRESETS)})")
+    presets = [AUDIO_PRESETS[k] for k in dict.fromkeys(keys)]
+    exts = [p['ext'] for p in presets]
+    if len(set(exts)) != len(exts): raise ValueError("escolha no máximo um preset por extensão de saída")
+    clash = parse_extensions(input_exts) & set(exts)
+    if clash: raise ValueError(f"a saída .{clash.pop()} sobrescreveria a origem")
+    return presets
+
+def build_audio_job(opts):
+    """Valida as opções de um lote de áudio (input_ext, presets, dedup, jobs) e monta as funções do job."""
+    input_exts = parse_extensions(opts.get('input_ext') or '')
+    if not input_exts: raise ValueError("áudio exige --input-ext")
+    presets = parse_audio_presets(opts.get('presets'), input_exts)
+    dedup, metrics_key = bool(opts.get('dedup')), "+".join(p['codec'] for p in presets)
+    max_jobs = int(opts.get('jobs') or MAX_PARALLEL_JOBS)
+    return {'label': "ÁUDIO", 'input_exts': input_exts, 'outputs_for': lambda f: audio_outputs_for(f, presets),
+            'convert': lambda f, position: convert_one_audio(f, presets, position, dedup=dedup),
+            'estimate': lambda f: predict_job_seconds(f, metrics_key), 'jobs': max_jobs,
+            'governor': governor_from_opts(opts, max_jobs)}
+
+def run_audio_batch(opts, input_files=None, interactive=False, **batch_kw):
+    """Executa um lote de conversão de áudio sem menus (opções de build_audio_job, mais delete, scratch_dir e io_per_device)."""
+    job = build_audio_job(opts)
+    if not os.path.isfile(FFMPEG) or not os.path.isfile(FFPROBE): raise RuntimeError("FFmpeg ou FFprobe não encontrado")
+    return run_job_batch(job, opts, input_files, interactive, **batch_kw)
+
+# ─────────────────── Monitoramento de pastas (watch) ───────────────────
+class PollingWatcher:
+    """
+    Monitoramento sem inotify: a cada volta, um stat por pasta conhecida; só as
+    pastas cujo mtime mudou (arquivo criado, removido ou movido) são relidas.
+    """
+
+    def __init__(self, recursive=False):
+        self.recursive = recursive
+        self.dirs = {}  # pasta -> mtime_ns da última leitura
+
+    def watch_tree(self, path):
+        """Passa a monitorar `path` (e subpastas, se recursivo); retorna os arquivos que já estão lá."""
+        files = []
+        try:
+            self.dirs[path] = os.stat(path).st_mtime_ns
+            with os.scandir(path) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        if (self.recursive and not entry.name.startswith('.') and entry.path not in self.dirs
+                                and not is_ladder_package(entry.path)):
+                            files += self.watch_tree(entry.path)
+                    elif entry.is_file(): files.append(entry.path)
+        except OSError as e:
+            tqdm.write(f"  ⚠️  Não foi possível listar '{path}': {e}")
+        return files
+
+    def poll(self, timeout):
+        """Espera `timeout` s e retorna os arquivos das pastas que mudaram."""
+        time.sleep(timeout)
+        changed = []
+        for path, mtime in list(self.dirs.items()):
+            try:
+                if os.stat(path).st_mtime_ns == mtime: continue
+            except OSError:
+                del self.dirs[path]; continue
+            changed += self.watch_tree(path)
+        return changed
+
+    def close(self):
+        pass
+
+class InotifyWatcher(PollingWatcher):
+    """
+    Monitoramento por inotify (Linux/Android), via ctypes: o kernel avisa cada
+    arquivo criado, escrito ou movido para a pasta, sem nenhuma releitura.
+    """
+    IN_MODIFY, IN_CLOSE_WRITE, IN_MOVED_TO, IN_CREATE = 0x2, 0x8, 0x80, 0x100
+    IN_Q_OVERFLOW, IN_ISDIR = 0x4000, 0x40000000
+    MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+    EVENT = struct.Struct('iIII')  # wd, mask, cookie, len (seguido do nome)
+
+    def __init__(self, recursive=False):
+        super().__init__(recursive)
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self._add_watch = libc.inotify_add_watch  # AttributeError sem inotify (Windows/macOS)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0: raise OSError(ctypes.get_errno(), "inotify_init1 falhou")
+        self.wds = {}  # descritor do inotify -> pasta
+
+    def watch_tree(self, path):
+        if path not in self.dirs:
+            wd = self._add_watch(self.fd, os.fsencode(path), self.MASK)
+            if wd < 0: tqdm.write(f"  ⚠️  inotify não pôde monitorar '{path}': {os.strerror(ctypes.get_errno())}")
+            else: self.wds[wd] = path
+        return super().watch_tree(path)
+
+    def poll(self, timeout):
+        """Espera até `timeout` s por eventos e retorna os arquivos afetados."""
+        if not select.select([self.fd], [], [], timeout)[0]: return []
+        changed = []
+        while True:
+            try: data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError: break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = self.EVENT.unpack_from(data, offset)
+                name = os.fsdecode(data[offset + self.EVENT.size:offset + self.EVENT.size + length].rstrip(b'\0'))
+                offset += self.EVENT.size + length
+                if mask & self.IN_Q_OVERFLOW:  # fila do kernel estourou: relê tudo
+                    for path in list(self.dirs): changed += super().watch_tree(path)
+                    continue
+                if wd not in self.wds or not name: continue
+                path = os.path.join(self.wds[wd], name)
+                if not mask & self.IN_ISDIR: changed.append(path)
+                elif self.recursive and not name.startswith('.') and not is_ladder_package(path):
+                    changed += self.watch_tree(path)  # pasta nova ou movida (as HLS/DASH da escada são saídas)
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+def make_watcher(recursive=False, polling=False):
+    """inotify quando disponível; senão, polling por mtime das pastas."""
+    if not polling and not IS_WINDOWS:
+        try: return InotifyWatcher(recursive)
+        except (OSError, AttributeError, TypeError): pass
+    return PollingWatcher(recursive)
+
+def watch_ready_files(dirs, exts, recursive=False, include=None, exclude=None,
+                      settle=WATCH_SETTLE_SECONDS, poll_interval=WATCH_POLL_INTERVAL, polling=False, stop=None):
+    """
+    Gera (Path) cada arquivo novo das pastas monitoradas assim que ele fica `settle`
+    segundos sem mudar de tamanho nem de mtime (download ou cópia concluídos).
+    Os arquivos já presentes ao iniciar também entram. Termina quando `stop`
+    (threading.Event) é sinalizado, em até `poll_interval` s, fechando o watcher.
+    """
+    exts, include, exclude = parse_extensions(exts), list(include or []), list(exclude or [])
+    watcher = make_watcher(recursive, polling)
+    kind = "inotify" if isinstance(watcher, InotifyWatcher) else f"polling a cada {poll_interval}s"
+    pending, released = {}, {}  # caminho -> (assinatura, desde quando), caminho -> assinatura liberada
+
+    def _consider(paths):
+        for path in paths:
+            name = os.path.basename(path)
+            if os.path.splitext(name)[1][1:].lower() not in exts or name.startswith('.'): continue
+            if (include and not _matches(path, name, include)) or (exclude and _matches(path, name, exclude)): continue
+            pending.setdefault(path, None)
+    try:
+        for d in dirs: _consider(watcher.watch_tree(os.path.abspath(d)))
+        tqdm.write(f">> Monitorando {len(dirs)} pasta(s) ({kind}); CTRL+C para encerrar.")
+        while not (stop and stop.is_set()):
+            now = time.monotonic()
+            for path, state in list(pending.items()):
+                try: st = os.stat(path)
+                except OSError: del pending[path]; continue
+                sig = (st.st_size, st.st_mtime_ns)
+                if state is None or state[0] != sig: pending[path] = (sig, now); continue
+                if now - state[1] < settle or not st.st_size: continue
+                del pending[path]
+                if released.get(path) == sig: continue  # evento repetido de um arquivo já liberado
+                if stop and stop.is_set(): return
+                released[path] = sig
+                yield Path(path)
+            # Com arquivos aguardando estabilidade, acorda a cada segundo para conferi-los.
+            _consider(watcher.poll(min(1.0, poll_interval) if pending else poll_interval))
+    finally:
+        watcher.close()
+
+def run_watch(opts):
+    """
+    Modo watch: converte (vídeo ou áudio, com as opções do modo sem menus) cada
+    arquivo novo que fica estável nas pastas monitoradas, com até --jobs simultâneos.
+    """
+    dirs = [os.path.abspath(d) for d in (opts.get('dirs') or ['.'])]
+    missing = [d for d in dirs if not os.path.isdir(d)]
+    if missing: print(f"ERRO: pasta não encontrada: {', '.join(missing)}."); return 2
+    mode = opts['watch_mode']
+    exts = parse_extensions(opts.get('input_ext') or '')
+    if opts.get('delete') == 'ask': print("ERRO: o watch não aceita --delete ask (use auto, verify ou never)."); return 2
+    poll_interval = float(opts.get('poll_interval') or WATCH_POLL_INTERVAL)
+    stop, active = threading.Event(), threading.Lock()
+    def _stream():  # lido na thread do agendador; `active` fica preso até o watcher ser fechado
+        with active:
+            yield from watch_ready_files(dirs, exts, opts.get('recursive'), opts.get('include'), opts.get('exclude'),
+                                         float(opts.get('settle') or WATCH_SETTLE_SECONDS), poll_interval,
+                                         opts.get('polling'), stop)
+    try:
+        set_encode_priority(opts.get('nice'), opts.get('ionice'))
+        # O diário do lote fica na primeira pasta monitorada.
+        result = HEADLESS_RUNNERS[mode](dict(opts, dir=dirs[0]), input_files=_stream())
+    except (ValueError, RuntimeError, OSError) as e:
+        print(f"ERRO: {e}."); return 2
+    except KeyboardInterrupt:
+        print("\n>> Monitoramento encerrado."); return 0
+    finally:
+        stop.set()
+        if active.acquire(timeout=poll_interval + 1): active.release()
+    return 1 if result['errors'] else 0
+
+# ─────────────── Coordenador e workers distribuídos ───────────────
+def parse_address(spec):
+    """'unix:/caminho.sock' ou 'host:porta' -> (família do socket, endereço)."""
+    if spec.startswith('unix:'):
+        if not hasattr(socket, 'AF_UNIX'): raise ValueError("sockets Unix não existem neste sistema")
+        return socket.AF_UNIX, spec[len('unix:'):]
+    host, _, port = spec.rpartition(':')
+    if not port.isdigit(): raise ValueError(f"endereço inválido '{spec}' (use host:porta ou unix:/caminho.sock)")
+    return socket.AF_INET, (host or '127.0.0.1', int(port))
+
+class JsonLineConnection:
+    """Mensagens JSON, uma por linha, sobre um socket; envios de várias threads não se misturam."""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self._reader = sock.makefile('r', encoding='utf-8')
+        self._lock = threading.Lock()
+
+    def send(self, msg):
+        data = (json.dumps(msg, ensure_ascii=False) + "\n").encode('utf-8')
+        with self._lock: self.sock.sendall(data)
+
+    def recv(self):
+        """Próxima mensagem, ou None se a conexão fechou."""
+        line = self._reader.readline()
+        return json.loads(line) if line else None
+
+    def close(self):
+        try: self.sock.close()
+        except OSError: pass
+
+class RemoteJob:
+    """Um arquivo do lote enquanto está na fila do coordenador ou com um worker."""
+
+    def __init__(self, job_id, src):
+        self.id, self.src = job_id, Path(src)
+        self.done = threading.Event()
+        self.result = False
+        self.worker, self.last_seen, self.attempts, self.progress = None, 0.0, 0, {}
+
+class JobQueueServer:
+    """
+    Fila de jobs do coordenador. Cada vaga de worker abre uma conexão, pede jobs
+    ('next'), manda progresso e heartbeats enquanto converte e devolve o resultado.
+    Um job cujo worker caiu (conexão fechada, ou HEARTBEAT_TIMEOUT sem notícias)
+    volta para a fila, até DISTRIBUTED_MAX_ATTEMPTS tentativas. Ao fechar, cada
+    worker conectado recebe 'bye' na hora.
+    """
+
+    def __init__(self, address, spec, token=None):
+        self.family, self.address = parse_address(address)
+        self.spec, self.token = spec, token  # spec: {'mode', 'opts'}, enviado com cada job
+        self.closed = False
+        self._lock = threading.Lock()
+        self._queue, self._running, self._ids = collections.deque(), {}, itertools.count(1)
+        self._conns = set()
+        if self.family == socket.AF_UNIX:
+            if os.path.exists(self.address): os.unlink(self.address)  # socket de uma execução anterior
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.bind(self.address); self.sock.listen()
+        else:
+            self.sock = socket.create_server(self.address)
+        threading.Thread(target=self._accept, daemon=True).start()
+        threading.Thread(target=self._reap, daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try: sock, _ = self.sock.accept()
+            except OSError: return
+            threading.Thread(target=self._serve, args=(JsonLineConnection(sock),), daemon=True).start()
+
+    def _serve(self, conn):
+        worker, current = None, set()
+        try:
+            hello = conn.recv()
+            if not hello or hello.get('type') != 'hello' or (self.token and hello.get('token') != self.token):
+                conn.send({'type': 'bye', 'reason': "token inválido"}); return
+            worker = hello.get('worker') or '?'
+            with self._lock: self._conns.add(conn)
+            tqdm.write(f"🔌 Worker conectado: {worker}")
+            while True:
+                msg = conn.recv()
+                if msg is None: break
+                kind = msg.get('type')
+                if kind == 'next':
+                    job = self._take(worker)
+                    if job:
+                        current.add(job.id)
+                        info = probe_media(job.src)
+                        conn.send({'type': 'job', 'job': job.id, 'src': str(job.src), 'probe': info.data if info else None, **self.spec})
+                    elif self.closed: conn.send({'type': 'bye'}); break
+                    else: conn.send({'type': 'wait', 'seconds': 1})
+                elif kind in ('progress', 'heartbeat'): self._touch(msg.get('job'), worker, msg)
+                elif kind == 'result':
+                    ok = JOB_SKIPPED if msg.get('ok') == 'skipped' else msg.get('ok') is True
+                    self._finish(msg.get('job'), worker, ok); current.discard(msg.get('job'))
+        except (OSError, ValueError):
+            pass
+        finally:
+            with self._lock: self._conns.discard(conn)
+            conn.close()
+            for job_id in current: self._requeue(job_id, worker, "conexão perdida")
+            if worker: tqdm.write(f"🔌 Worker desconectado: {worker}")
+
+    def _take(self, worker):
+        with self._lock:
+            if not self._queue: return None
+            job = self._queue.popleft()
+            job.worker, job.last_seen, job.progress = worker, time.monotonic(), {}
+            job.attempts += 1
+            self._running[job.id] = job
+            return job
+
+    def _touch(self, job_id, worker, msg):
+        with self._lock:
+            job = self._running.get(job_id)
+            if job and job.worker == worker:
+                job.last_seen = time.monotonic()
+                if msg.get('type') == 'progress': job.progress = msg
+
+    def _finish(self, job_id, worker, ok):
+        with self._lock:
+            job = self._running.get(job_id)
+            if not job or job.worker != worker: return  # resultado atrasado de um job já redistribuído
+            del self._running[job_id]
+        job.result = ok; job.done.set()
+
+    def _requeue(self, job_id, worker, reason):
+        with self._lock:
+            job = self._running.get(job_id)
+            if not job or job.worker != worker: return
+            del self._running[job_id]
+            job.worker = None
+            if job.attempts < DISTRIBUTED_MAX_ATTEMPTS: self._queue.appendleft(job)
+        if job.attempts >= DISTRIBUTED_MAX_ATTEMPTS:
+            tqdm.write(f"❌ '{job.src.name}': {job.attempts} tentativas sem resultado ({reason})."); job.done.set()
+        else:
+            tqdm.write(f"↩️  '{job.src.name}' voltou para a fila ({reason}, worker {worker}).")
+
+    def _reap(self):
+        while not self.closed:
+            time.sleep(1)
+            now = time.monotonic()
+            with self._lock: stale = [j for j in self._running.values() if now - j.last_seen > HEARTBEAT_TIMEOUT]
+            for job in stale: self._requeue(job.id, job.worker, f"{HEARTBEAT_TIMEOUT}s sem heartbeat")
+
+    def convert(self, src, position=None):
+        """convert_fn do lote: enfileira `src`, mostra o progresso remoto e espera o resultado."""
+        job = RemoteJob(next(self._ids), os.path.abspath(str(src)))
+        with self._lock: self._queue.append(job)
+        bar, worker = None, None
+        try:
+            while not job.done.wait(0.5):
+                if job.worker is None: continue
+                if bar is None or worker != job.worker:
+                    if bar is not None: bar.close()
+                    worker = job.worker
+                    bar = tqdm(total=100, desc=f"{worker}: {job.src.name[:30]}", ncols=100, unit="%",
+                               position=position, leave=False)
+                progress = job.progress
+                if progress.get('percent') is not None: bar.n = int(progress['percent'])
+                if progress.get('speed'): bar.set_postfix_str(f"{progress['speed']:.2f}x ETA {format_eta(progress.get('eta'))}", refresh=False)
+                bar.refresh()
+        finally:
+            if bar is not None: bar.close()
+        if job.result is True: tqdm.write(f"✅ '{job.src.name}' concluído por {worker or job.worker}.")
+        return job.result
+
+    def close(self):
+        """Depois do lote: manda 'bye' a cada worker conectado e fecha o socket."""
+        self.closed = True
+        with self._lock: conns = list(self._conns)
+        for conn in conns:
+            try:
+                conn.send({'type': 'bye'})
+                conn.sock.shutdown(socket.SHUT_WR)  # o worker ainda pode mandar um último 'next' sem erro
+            except OSError:
+                pass
+        try: self.sock.close()
+        except OSError: pass
+        if self.family == socket.AF_UNIX:
+            try: os.unlink(self.address)
+            except OSError: pass
+
+# Opções que só valem para a máquina do coordenador e não seguem com os jobs.
+COORDINATOR_LOCAL_OPTS = {'mode', 'coord_mode', 'dir', 'listen', 'token', 'max_inflight', 'recursive', 'include', 'order',
+                          'exclude', 'scan_workers', 'delete', 'scratch_dir', 'io_per_device', 'encoder_info'}
+
+def run_coordinator(opts):
+    """
+    Coordenador: varre e analisa o lote como o modo sem menus e serve cada arquivo
+    como um job para os workers. Diário, deleção dos originais e resumo ficam aqui.
+    """
+    mode = opts['coord_mode']
+    job = JOB_BUILDERS[mode](dict(opts, governor='off'))  # valida as opções e fornece os caminhos de saída
+    spec = {'mode': mode, 'opts': {k: v for k, v in opts.items() if k not in COORDINATOR_LOCAL_OPTS}}
+    server = JobQueueServer(opts.get('listen') or DEFAULT_LISTEN, spec, opts.get('token'))
+    print(f">> Coordenador em {opts.get('listen') or DEFAULT_LISTEN}: aguardando workers "
+          f"(renoma.py worker --connect {opts.get('listen') or DEFAULT_LISTEN}).")
+    try:
+        return run_job_batch(job, opts, convert=server.convert, max_jobs=int(opts.get('max_inflight') or 16), stage=False)
+    finally:
+        server.close()
+
+def apply_path_map(path, path_map):
+    """Troca o prefixo de `path` conforme 'ORIGEM=DESTINO' (o mesmo storage montado em outro caminho)."""
+    for rule in path_map or []:
+        old, _, new = rule.partition('=')
+        if old and path.startswith(old): return new + path[len(old):]
+    return path
+
+def run_worker(opts):
+    """
+    Worker: abre uma conexão por vaga (--jobs) com o coordenador e executa os jobs
+    recebidos com os conversores locais (preparo, scratch e limite por disco desta
+    máquina), mandando progresso e heartbeats. Retorna o número de jobs com erro.
+    """
+    family, address = parse_address(opts.get('connect') or DEFAULT_LISTEN)
+    slots = max(1, int(opts.get('jobs') or 1))
+    name = f"{platform.node()}-{os.getpid()}"
+    limiter = DeviceIOLimiter(opts.get('io_per_device') or IO_PER_DEVICE)
+    builders, lock, failures = {}, threading.Lock(), [0]
+
+    def _build(mode, job_opts):
+        # Codificador e orçamento de threads são decididos por esta máquina, não pelo coordenador.
+        job_opts = dict(job_opts, jobs=slots, cores=None, governor='off')
+        if opts.get('encoder'): job_opts['encoder'] = opts['encoder']
+        key = json.dumps([mode, job_opts], sort_keys=True)
+        with lock:
+            if key not in builders: builders[key] = JOB_BUILDERS[mode](job_opts)
+            return builders[key]
+
+    def _slot(index):
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.connect(address)
+        conn = JsonLineConnection(sock)
+        conn.send({'type': 'hello', 'worker': f"{name}/{index + 1}", 'token': opts.get('token')})
+        try:
+            while True:
+                conn.send({'type': 'next'})
+                msg = conn.recv()
+                if msg is None or msg.get('type') == 'bye':
+                    if msg and msg.get('reason'): tqdm.write(f"ERRO: o coordenador recusou a conexão ({msg['reason']}).")
+                    return
+                if msg.get('type') == 'wait':
+                    # Espera ouvindo o socket: um 'bye' do coordenador encerra a vaga na hora.
+                    if select.select([sock], [], [], msg.get('seconds', 1))[0]:
+                        msg = conn.recv()
+                        if msg is None or msg.get('type') == 'bye': return
+                    continue
+                job_id, src = msg['job'], Path(apply_path_map(msg['src'], opts.get('path_map')))
+                if msg.get('probe'): seed_probe(src, msg['probe'])
+                stop = threading.Event()
+                def _beat():
+                    while not stop.wait(HEARTBEAT_INTERVAL):
+                        try: conn.send({'type': 'heartbeat', 'job': job_id})
+                        except OSError: return
+                threading.Thread(target=_beat, daemon=True).start()
+                def _report(stats):
+                    try: conn.send({'type': 'progress', 'job': job_id, 'percent': stats.get('percent'),
+                                    'speed': stats.get('speed'), 'eta': stats.get('eta')})
+                    except OSError: pass  # a queda do coordenador aparece no próximo 'next'
+                _job_context.on_progress = _report
+                try:
+                    job = _build(msg['mode'], msg['opts'])
+                    position = index if slots > 1 else None
+                    result = run_staged(src, job['outputs_for'](src), lambda f: job['convert'](f, position),
+                                        opts.get('scratch_dir') or SCRATCH_DIR, limiter)
+                except Exception as e:
+                    tqdm.write(f"❌ Falha inesperada no job '{src.name}': {e}"); result = False
+                finally:
+                    stop.set(); _job_context.on_progress = None
+                if result is not True and result is not JOB_SKIPPED:
+                    with lock: failures[0] += 1
+                conn.send({'type': 'result', 'job': job_id, 'ok': 'skipped' if result is JOB_SKIPPED else result is True})
+        finally:
+            conn.close()
+
+    print(f">> Worker {name}: {slots} vaga(s), conectando a {opts.get('connect') or DEFAULT_LISTEN}...")
+    errors = []
+    def _run_slot(index):
+        try: _slot(index)
+        except OSError as e: errors.append(e)
+    threads = [threading.Thread(target=_run_slot, args=(i,)) for i in range(slots)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    if errors: print(f"ERRO: conexão com o coordenador: {errors[0]}."); return max(1, failures[0])
+    print(f">> Worker {name} encerrado (jobs com erro: {failures[0]}).")
+    return failures[0]
+
+# ─────────────── API assíncrona (uso como biblioteca) ───────────────
+@dataclass
+class BatchJob:
+    """Opções comuns aos lotes de conversão: pasta, varredura, ordem, deleção, preparo e recursos."""
+    dir: str = '.'
+    files: Optional[List[str]] = None   # arquivos explícitos; sem eles, varre `dir`
+    jobs: Optional[int] = None          # teto de jobs deste lote (None = tamanho do pool)
+    delete: str = 'never'
+    order: str = 'natural'
+    recursive: bool = False
+    include: Optional[List[str]] = None
+    exclude: Optional[List[str]] = None
+    scan_workers: int = 1
+    scratch_dir: Optional[str] = SCRATCH_DIR
+    io_per_device: Optional[int] = None
+    governor: str = 'auto'
+    max_load: Optional[float] = None
+    min_free_mb: Optional[float] = None
+    min_battery: Optional[float] = None
+    max_temp: Optional[float] = None
+
+@dataclass
+class VideoJob(BatchJob):
+    """Lote de vídeo (as opções de `renoma.py video`); `encoder_info` substitui `encoder` quando já resolvido."""
+    mode: ClassVar[str] = 'video'
+    input_ext: str = ''
+    output_ext: str = ''
+    encoder: Optional[str] = None
+    encoder_info: Optional[dict] = None
+    quality: int = 2
+    remux: str = 'auto'
+    segmented: bool = False
+    ladder: Optional[str] = None
+    ladder_format: str = 'files'
+    min_savings: Optional[float] = None
+    on_unprofitable: str = 'skip'
+    cores: Optional[int] = None
+
+@dataclass
+class AudioJob(BatchJob):
+    """Lote de áudio (as opções de `renoma.py audio`)."""
+    mode: ClassVar[str] = 'audio'
+    input_ext: str = ''
+    presets: str = '2'
+    dedup: bool = False
+
+@dataclass
+class RenameJob:
+    """
+    Renomeação de uma temporada, de uma biblioteca (library=True) ou desfazer (undo=True).
+    Com `plan` ({pasta: {antigo: novo}}, já mostrado e confirmado), ele é aplicado como
+    está, sem planejar de novo.
+    """
+    mode: ClassVar[str] = 'rename'
+    dir: str = '.'
+    series: Optional[str] = None
+    season: Optional[int] = None
+    ext: Optional[str] = None
+    library: bool = False
+    workers: int = 1
+    undo: bool = False
+    sort: str = 'natural'
+    dry_run: bool = False
+    plan: Optional[dict] = None
+
+JOB_TYPES = {cls.mode: cls for cls in (VideoJob, AudioJob, RenameJob)}
+
+def job_from_opts(opts):
+    """Job tipado a partir de um dict de opções (as chaves da linha de comando, com 'mode')."""
+    cls = JOB_TYPES.get(opts.get('mode'))
+    if cls is None: raise ValueError(f"modo de job inválido '{opts.get('mode')}' (opções: {', '.join(JOB_TYPES)})")
+    return cls(**{f.name: opts[f.name] for f in fields(cls) if f.name in opts})
+
+def execute_job(job, interactive=False, on_event=None, executor=None):
+    """
+    Executa um job tipado de forma síncrona: o mesmo caminho do menu, do modo sem
+    menus e de MediaService. Retorna o dict de contadores do lote (conversões) ou
+    o número de erros (renomeação). on_event e executor seguem para run_conversion_batch.
+    """
+    opts = dict(asdict(job), mode=job.mode)
+    if not os.path.isdir(job.dir): raise ValueError(f"pasta não encontrada: {job.dir}")
+    if isinstance(job, RenameJob): return run_rename_batch(opts, interactive)
+    files = [Path(f) for f in job.files] if job.files is not None else None
+    runner = run_video_batch if isinstance(job, VideoJob) else run_audio_batch
+    return runner(opts, files, interactive, on_event=on_event, executor=executor)
+
+@dataclass
+class JobEvent:
+    """
+    Evento de um job enviado a MediaService: 'started', 'file_started', 'progress'
+    (percent, speed, eta), 'file_done' (result por arquivo), 'done' (result do lote)
+    ou 'failed' (error).
+    """
+    job_id: int
+    kind: str
+    file: Optional[str] = None
+    percent: Optional[float] = None
+    speed: Optional[float] = None
+    eta: Optional[float] = None
+    result: object = None
+    error: Optional[str] = None
+
+class JobHandle:
+    """Um job em andamento: `await handle` (ou handle.result()) e `async for e in handle.events()`."""
+
+    def __init__(self, job_id, job, loop, events=None):
+        self.id, self.job = job_id, job
+        self._loop, self._events, self._future = loop, events or asyncio.Queue(), None
+
+    def _emit(self, kind, file=None, **data):
+        event = JobEvent(self.id, kind, None if file is None else str(staged_origin(file)),
+                         **{k: data[k] for k in ('percent', 'speed', 'eta', 'result', 'error') if k in data})
+        try: self._loop.call_soon_threadsafe(self._events.put_nowait, event)
+        except RuntimeError: pass  # o loop já foi fechado; ninguém mais escuta
+
+    async def events(self):
+        """Eventos deste job até 'done' ou 'failed' (só para jobs sem fila compartilhada)."""
+        while True:
+            event = await self._events.get()
+            yield event
+            if event.kind in ('done', 'failed'): return
+
+    async def result(self):
+        return await self._future
+
+    def __await__(self):
+        return self.result().__await__()
+
+class MediaService:
+    """
+    API assíncrona para usar o renoma como biblioteca num processo de longa duração.
+    Todos os jobs enviados dividem um pool de `workers` conversões simultâneas
+    (cada lote ainda respeita o próprio `jobs`); até `max_batches` lotes são
+    coordenados ao mesmo tempo, os demais esperam na fila. nice/ionice valem para
+    todos os ffmpeg do processo. Com quiet=True (padrão), os lotes não escrevem no
+    console (planos, barras, resumos): tudo chega pelos eventos. As outras threads do
+    processo continuam escrevendo normalmente.
+
+        async with MediaService(workers=4) as service:
+            result = await service.run(VideoJob(dir="/media/in", input_ext="mkv", output_ext="mp4"))
+            async for event in service.stream([AudioJob(dir=d, input_ext="flac") for d in pastas]):
+                ...
+    """
+
+    def __init__(self, workers=None, max_batches=32, nice=None, ionice=None, quiet=True):
+        self.workers, self.quiet = max(1, int(workers or max(1, default_core_budget() // 4))), quiet
+        if quiet: install_console_gate()
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="renoma-job")
+        self._batches = ThreadPoolExecutor(max_workers=max(1, int(max_batches)), thread_name_prefix="renoma-batch")
+        self._ids = itertools.count(1)
+        set_encode_priority(nice, ionice)
+
+    async def submit(self, job, interactive=False, events=None):
+        """Enfileira um job tipado e retorna seu JobHandle; `events` é uma fila compartilhada opcional."""
+        loop = asyncio.get_running_loop()
+        handle = JobHandle(next(self._ids), job, loop, events)
+        if getattr(job, 'jobs', 0) is None: job = dataclass_replace(job, jobs=self.workers)
+        handle._future = loop.run_in_executor(self._batches, self._execute, job, handle, interactive)
+        return handle
+
+    def _execute(self, job, handle, interactive):
+        handle._emit('started')
+        _job_context.quiet = self.quiet  # herdado pelas threads do pool (carry_job_context)
+        try:
+            result = execute_job(job, interactive, on_event=handle._emit, executor=self._pool)
+        except Exception as e:
+            handle._emit('failed', error=str(e)); raise
+        finally:
+            _job_context.quiet = False
+        handle._emit('done', result=result)
+        return result
+
+    async def run(self, job, interactive=False):
+        """Executa um job e retorna o resultado (o dict de contadores, ou os erros da renomeação)."""
+        return await (await self.submit(job, interactive))
+
+    async def stream(self, jobs):
+        """Envia vários jobs e gera os eventos de todos, na ordem em que acontecem, até o último terminar."""
+        merged = asyncio.Queue()
+        handles = [await self.submit(job, events=merged) for job in jobs]
+        pending = len(handles)
+        while pending:
+            event = await merged.get()
+            if event.kind in ('done', 'failed'): pending -= 1
+            yield event
+        # As falhas já saíram como eventos 'failed'; isto só marca as exceções como lidas.
+        await asyncio.gather(*(h._future for h in handles), return_exceptions=True)
+
+    async def close(self):
+        """Espera os jobs em andamento, libera os pools e devolve o console do processo."""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._batches.shutdown)
+        await loop.run_in_executor(None, self._pool.shutdown)
+        if self.quiet: self.quiet = False; release_console_gate()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+# ─────────────────── Modo sem menus (headless) ───────────────────
+def build_arg_parser():
+    """Linha de comando com as mesmas escolhas que os menus coletam."""
+    parser = argparse.ArgumentParser(
+        prog="renoma.py", description="Ferramenta de mídia. Sem argumentos, abre o menu interativo.")
+    sub = parser.add_subparsers(dest='mode')
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--dir', default='.', help="pasta dos arquivos (padrão: pasta atual)")
+    scan = argparse.ArgumentParser(add_help=False)
+    scan.add_argument('--recursive', action='store_true', help="incluir subpastas (a conversão começa durante a varredura)")
+    scan.add_argument('--include', action='append', help="glob de arquivos a incluir (pode repetir)")
+    scan.add_argument('--exclude', action='append', help="glob de arquivos/pastas a excluir (pode repetir)")
+    scan.add_argument('--scan-workers', type=int, default=1, help=f"pastas listadas em paralelo (ex.: {SCAN_WORKERS} em NFS/SMB)")
+
+    # Ordem dos jobs: só para lotes com a lista completa (não vale no watch).
+    ordering = argparse.ArgumentParser(add_help=False)
+    ordering.add_argument('--order', choices=list(JOB_ORDERS), default='natural',
+                          help="natural, longest (mais longos primeiro) ou shortest (mais curtos primeiro)")
+
+    priority = argparse.ArgumentParser(add_help=False)
+    priority.add_argument('--nice', type=int, default=ENCODE_NICE, help="prioridade de CPU dos ffmpeg (0-19; maior = mais gentil)")
+    priority.add_argument('--ionice', default=ENCODE_IONICE, help="prioridade de disco: idle, best-effort ou best-effort:<0-7>")
+    resources = argparse.ArgumentParser(add_help=False, parents=[priority])
+    resources.add_argument('--governor', choices=['auto', 'on', 'off'], default='auto',
+                           help="ajustar jobs/threads à carga, memória, bateria e temperatura (auto = só no Android)")
+    resources.add_argument('--max-load', type=float, help=f"carga por núcleo tolerada (padrão: {GOVERNOR_MAX_LOAD})")
+    resources.add_argument('--min-free-mb', type=float, help=f"memória disponível mínima em MB (padrão: {GOVERNOR_MIN_FREE_MB})")
+    resources.add_argument('--min-battery', type=float, help=f"bateria mínima fora da tomada em %% (padrão: {GOVERNOR_MIN_BATTERY})")
+    resources.add_argument('--max-temp', type=float, help=f"temperatura máxima da bateria em °C (padrão: {GOVERNOR_MAX_TEMP})")
+
+    staging = argparse.ArgumentParser(add_help=False)
+    staging.add_argument('--scratch-dir', default=SCRATCH_DIR,
+                         help="disco rápido onde cada job é preparado antes de publicar as saídas (ou RENOMA_SCRATCH_DIR)")
+    staging.add_argument('--io-per-device', type=int, help="jobs simultâneos lendo/escrevendo no mesmo disco")
+
+    video_opts = argparse.ArgumentParser(add_help=False, parents=[staging])
+    video_opts.add_argument('--input-ext', help="extensão(ões) de origem, ex.: mkv ou mkv,avi,rmvb")
+    video_opts.add_argument('--output-ext', choices=['mp4', 'mkv'], help="extensão de saída")
+    video_opts.add_argument('--encoder', help="codificador: cpu, cpu:<preset>, nvenc, qsv, amf, vaapi, mediacodec (padrão: o mais rápido calibrado)")
+    video_opts.add_argument('--quality', type=int, choices=[1, 2, 3], default=2, help="1 = alta, 2 = média, 3 = baixa")
+    video_opts.add_argument('--remux', choices=['auto', 'never'], default='auto', help="trocar só o contêiner quando possível")
+    video_opts.add_argument('--segmented', action='store_true', help="codificar vídeos longos em segmentos paralelos")
+    video_opts.add_argument('--ladder', help=f"degraus de resolução numa só decodificação, ex.: 1080,720,480 (opções: {', '.join(map(str, LADDER_RUNGS))})")
+    video_opts.add_argument('--ladder-format', choices=['files', 'hls', 'dash'], default='files',
+                            help="escada como um arquivo por degrau, ou pasta HLS/DASH")
+    video_opts.add_argument('--min-savings', type=float, help="economia mínima prevista (em %%) por amostras; abaixo dela não re-encoda")
+    video_opts.add_argument('--on-unprofitable', choices=['skip', 'copy'], default='skip',
+                            help="abaixo de --min-savings: manter o original ou só trocar o contêiner")
+    video_opts.add_argument('--jobs', type=int, default=MAX_PARALLEL_JOBS, help="conversões simultâneas")
+    video_opts.add_argument('--cores', type=int, help="orçamento de núcleos dividido entre os jobs")
+
+    audio_opts = argparse.ArgumentParser(add_help=False, parents=[staging])
+    audio_opts.add_argument('--input-ext', help="extensão(ões) de origem, ex.: flac ou flac,wav")
+    audio_opts.add_argument('--presets', default='2', help="presets separados por vírgula: " +
+                            "; ".join(f"{k} = {v['name']}" for k, v in AUDIO_PRESETS.items()))
+    audio_opts.add_argument('--dedup', action='store_true',
+                            help="reaproveitar a saída de um áudio idêntico já convertido (impressão do áudio decodificado)")
+    audio_opts.add_argument('--jobs', type=int, default=MAX_PARALLEL_JOBS, help="conversões simultâneas")
+
+    deletion = argparse.ArgumentParser(add_help=False)
+    deletion.add_argument('--delete', choices=list(DELETE_POLICIES), default='never', help="destino dos originais convertidos")
+    # O watch não termina sozinho: 'ask' só perguntaria no CTRL+C, então não é aceito.
+    watch_deletion = argparse.ArgumentParser(add_help=False)
+    watch_deletion.add_argument('--delete', choices=[p for p in DELETE_POLICIES if p != 'ask'], default='never',
+                                help="destino dos originais convertidos (verify confere e apaga cada um ao terminar)")
+
+    sub.add_parser('video', parents=[common, scan, ordering, resources, video_opts, deletion], help="converter vídeos em lote")
+    sub.add_parser('audio', parents=[common, scan, ordering, resources, audio_opts, deletion], help="converter áudios em lote")
+
+    watch = sub.add_parser('watch', help="monitorar pastas e converter cada arquivo novo assim que ele fica completo")
+    watch_sub = watch.add_subparsers(dest='watch_mode', required=True)
+    watch_opts = argparse.ArgumentParser(add_help=False)
+    watch_opts.add_argument('--dir', dest='dirs', action='append', help="pasta monitorada (pode repetir; padrão: pasta atual)")
+    watch_opts.add_argument('--settle', type=float, default=WATCH_SETTLE_SECONDS,
+                            help="segundos sem mudança de tamanho/mtime antes de converter")
+    watch_opts.add_argument('--poll-interval', type=float, default=WATCH_POLL_INTERVAL, help="intervalo do modo polling")
+    watch_opts.add_argument('--polling', action='store_true', help="usar polling mesmo com inotify disponível")
+    watch_sub.add_parser('video', parents=[watch_opts, scan, resources, video_opts, watch_deletion], help="converter vídeos novos")
+    watch_sub.add_parser('audio', parents=[watch_opts, scan, resources, audio_opts, watch_deletion], help="converter áudios novos")
+
+    coordinator = sub.add_parser('coordinator', help="servir um lote para workers (nesta ou em outras máquinas)")
+    coordinator_sub = coordinator.add_subparsers(dest='coord_mode', required=True)
+    net = argparse.ArgumentParser(add_help=False)
+    net.add_argument('--token', default=os.environ.get('RENOMA_TOKEN'), help="segredo compartilhado com os workers (ou RENOMA_TOKEN)")
+    coordinator_opts = argparse.ArgumentParser(add_help=False, parents=[net])
+    coordinator_opts.add_argument('--listen', default=DEFAULT_LISTEN, help="host:porta ou unix:/caminho.sock")
+    coordinator_opts.add_argument('--max-inflight', type=int, default=16, help="jobs entregues aos workers ao mesmo tempo")
+    coordinator_sub.add_parser('video', parents=[common, scan, ordering, video_opts, deletion, coordinator_opts], help="lote de vídeo")
+    coordinator_sub.add_parser('audio', parents=[common, scan, ordering, audio_opts, deletion, coordinator_opts], help="lote de áudio")
+
+    worker = sub.add_parser('worker', parents=[staging, net, priority], help="executar jobs de um coordenador")
+    worker.add_argument('--connect', default=DEFAULT_LISTEN, help="endereço do coordenador (host:porta ou unix:/caminho.sock)")
+    worker.add_argument('--jobs', type=int, default=1, help="jobs simultâneos neste worker")
+    worker.add_argument('--encoder', help="codificador desta máquina (padrão: o do coordenador, ou o mais rápido calibrado)")
+    worker.add_argument('--path-map', action='append', help="ORIGEM=DESTINO: o storage compartilhado montado em outro caminho")
+
+    rename = sub.add_parser('rename', parents=[common], help="renomear episódios de uma temporada ou biblioteca")
+    rename.add_argument('--series', help="nome da série (no modo biblioteca, substitui o nome da pasta-mãe)")
+    rename.add_argument('--season', help="número da temporada")
+    rename.add_argument('--ext', help=f"extensão dos arquivos (no modo biblioteca, lista; padrão: {RENAME_VIDEO_EXTS})")
+    rename.add_argument('--library', action='store_true', help="renomear todas as pastas de temporada abaixo de --dir")
+    rename.add_argument('--workers', type=int, default=1, help="pastas renomeadas em paralelo")
+    rename.add_argument('--undo', action='store_true', help="desfazer a última renomeação feita em --dir")
+    rename.add_argument('--sort', choices=['natural', 'alpha'], default='natural', help="ordem dos arquivos")
+    rename.add_argument('--dry-run', action='store_true', help="só mostrar as renomeações")
+
+    job = sub.add_parser('job', help="executar um ou mais jobs descritos em um arquivo JSON")
+    job.add_argument('job_file', help="JSON com {\"mode\": \"video\", ...} ou uma lista desses objetos")
+    return parser
+
+HEADLESS_RUNNERS = {'video': run_video_batch, 'audio': run_audio_batch, 'rename': run_rename_batch,
+                    'coordinator': run_coordinator, 'worker': run_worker}
+JOB_BUILDERS = {'video': build_video_job, 'audio': build_audio_job}
+
+def run_job(opts):
+    """Executa um job sem menus (dict com 'mode' e as opções); retorna o código de saída."""
+    if not os.path.isdir(opts.get('dir') or '.'): print(f"ERRO: pasta não encontrada: {opts['dir']}."); return 2
+    try:
+        set_encode_priority(opts.get('nice'), opts.get('ionice'))
+        if opts['mode'] in JOB_TYPES: result = execute_job(job_from_opts(opts))
+        else: result = HEADLESS_RUNNERS[opts['mode']](opts)
+    except (ValueError, RuntimeError, OSError) as e:
+        print(f"ERRO: {e}."); return 2
+    if isinstance(result, dict): return 1 if result['errors'] else 0
+    return 1 if result else 0
+
+def run_headless(argv):
+    """Ponto de entrada não interativo: nenhum passo espera por input()."""
+    parser = build_arg_parser()
+    args = parser.parse_args(argv)
+    if args.mode is None: parser.print_help(); return 2
+    if args.mode == 'watch': return run_watch(vars(args))
+    if args.mode != 'job': return run_job(vars(args))
+    job_path = Path(args.job_file)
+    try:
+        jobs = json.loads(job_path.read_text(encoding='utf-8'))
+    except (OSError, ValueError) as e:
+        print(f"ERRO: não foi possível ler '{job_path}': {e}."); return 2
+    returncode = 0
+    for job in (jobs if isinstance(jobs, list) else [jobs]):
+        job = {k.replace('-', '_'): v for k, v in job.items()}
+        if job.get('mode') not in HEADLESS_RUNNERS:
+            print(f"ERRO: job sem 'mode' válido ({', '.join(HEADLESS_RUNNERS)})."); returncode = 2; continue
+        defaults = [job['mode']]
+        if job['mode'] == 'coordinator':
+            if job.get('coord_mode') not in JOB_BUILDERS:
+                print(f"ERRO: job 'coordinator' exige 'coord_mode' ({', '.join(JOB_BUILDERS)})."); returncode = 2; continue
+            defaults.append(job['coord_mode'])
+        try: opts = vars(parser.parse_args(defaults))
+        except SystemExit: returncode = 2; continue  # o argparse já explicou o erro; segue para o próximo job
+        opts.update(job)
+        # Pastas relativas no JSON são relativas ao próprio arquivo de job.
+        opts['dir'] = str(job_path.parent / opts.get('dir', '.'))
+        returncode = max(returncode, run_job(opts))
+    return returncode
 
 # ───────────────────────────── Main ────────────────────────────────
 def main():
     """Lógica principal do script multiplataforma"""
     global SCRIPT_DIR
+    if len(sys.argv) > 1: sys.exit(run_headless(sys.argv[1:]))
     try:
         if getattr(sys, 'frozen', False): SCRIPT_DIR = os.path.dirname(sys.executable)
         else: SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -551,6 +3534,7 @@ def main():
             print("  1) Renomear arquivos de séries")
             print("  2) Converter arquivos de VÍDEO")
             print("  3) Converter arquivos de ÁUDIO")
+            print("  4) Calibrar codificadores de VÍDEO")
             print("  *) Sair")
             print()
             
@@ -559,6 +3543,7 @@ def main():
             if acao == "1": run_rename_logic()
             elif acao == "2": run_video_convert_logic()
             elif acao == "3": run_audio_convert_logic()
+            elif acao == "4": run_calibration_logic()
             else: print("Saindo."); break
             
             print()
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+"""Fixtures comuns: renoma importado com cache isolado e mídias sintéticas (ffmpeg lavfi)."""
+
+import os
+import sys
+import shutil
+import subprocess
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# Caches (probes, vazão, métricas) isolados do usuário, antes de importar o renoma.
+os.environ['RENOMA_CACHE_DIR'] = tempfile.mkdtemp(prefix="renoma-test-cache-")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import renoma  # noqa: E402
+
+@pytest.fixture
+def ffmpeg():
+    """Pula o teste sem ffmpeg/ffprobe no PATH."""
+    if not (shutil.which(renoma.FFMPEG) and shutil.which(renoma.FFPROBE)): pytest.skip("ffmpeg/ffprobe não encontrados")
+    return renoma.FFMPEG
+
+@pytest.fixture
+def make_media(ffmpeg):
+    """make_media(caminho, segundos, video=True): gera um clipe sintético com tom de 440 Hz."""
+    def _make(path, seconds=2, video=True):
+        path = Path(path); path.parent.mkdir(parents=True, exist_ok=True)
+        cmd = [ffmpeg, "-nostdin", "-y", "-v", "error"]
+        if video: cmd += ["-f", "lavfi", "-i", f"testsrc2=size=320x180:rate=25:duration={seconds}"]
+        cmd += ["-f", "lavfi", "-i", f"sine=frequency=440:duration={seconds}", "-shortest", str(path)]
+        subprocess.run(cmd, check=True)
+        return path
+    return _make
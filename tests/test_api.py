@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""MediaService de ponta a ponta: vários lotes num pool compartilhado, eventos e modo silencioso."""
+
+import asyncio
+import sys
+
+import renoma
+
+def test_stream_runs_batches_and_reports_events(make_media, tmp_path, capfd):
+    videos, audios, missing = tmp_path / "videos", tmp_path / "audios", tmp_path / "nao-existe"
+    for name in ("a.avi", "b.avi"): make_media(videos / name)
+    make_media(audios / "c.wav", video=False)
+    jobs = [renoma.VideoJob(dir=str(videos), input_ext="avi", output_ext="mp4", encoder="cpu:ultrafast", jobs=2),
+            renoma.AudioJob(dir=str(audios), input_ext="wav", presets="1", delete="verify"),
+            renoma.AudioJob(dir=str(missing), input_ext="wav")]
+
+    async def _run():
+        async with renoma.MediaService(workers=2) as service:
+            return [event async for event in service.stream(jobs)]
+    events = asyncio.run(_run())
+
+    by_job = {}
+    for event in events: by_job.setdefault(event.job_id, []).append(event)
+    video, audio, failed = (by_job[i] for i in sorted(by_job))
+    assert video[-1].kind == 'done' and video[-1].result['converted'] == 2 and not video[-1].result['errors']
+    assert {e.file for e in video if e.kind == 'file_done' and e.result is True} == {str(videos / "a.avi"), str(videos / "b.avi")}
+    assert any(e.kind == 'progress' for e in video)
+    assert audio[-1].kind == 'done' and audio[-1].result['removed'] == 1
+    assert failed[-1].kind == 'failed' and 'nao-existe' in failed[-1].error
+    assert (videos / "a.mp4").exists() and (videos / "b.mp4").exists()
+    assert (audios / "c.flac").exists() and not (audios / "c.wav").exists()
+    # quiet=True (padrão): nada dos lotes chega ao console.
+    out, err = capfd.readouterr()
+    assert out == "" and err == ""
+
+def test_quiet_service_restores_the_console_on_close():
+    stdout, stderr = sys.stdout, sys.stderr
+
+    async def _run():
+        async with renoma.MediaService(workers=1) as first, renoma.MediaService(workers=1) as second:
+            assert isinstance(sys.stdout, renoma._ConsoleGate) and isinstance(sys.stderr, renoma._ConsoleGate)
+            await second.close()
+            assert first.quiet and isinstance(sys.stdout, renoma._ConsoleGate)  # `first` ainda está aberto
+    asyncio.run(_run())
+    assert sys.stdout is stdout and sys.stderr is stderr
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""Coordenador e dois workers locais (socket Unix), como processos separados."""
+
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+RENOMA = str(Path(__file__).resolve().parent.parent / "renoma.py")
+
+@pytest.mark.skipif(not hasattr(socket, 'AF_UNIX'), reason="sem sockets Unix")
+def test_coordinator_with_two_workers(make_media, tmp_path):
+    media = tmp_path / "media"
+    names = [f"faixa{i}" for i in range(4)]
+    for name in names: make_media(media / f"{name}.wav", video=False)
+    sock = tmp_path / "coord.sock"
+    listen = f"unix:{sock}"
+
+    coordinator = subprocess.Popen([sys.executable, RENOMA, "coordinator", "audio", "--dir", str(media), "--input-ext", "wav",
+                                    "--presets", "1", "--listen", listen, "--token", "segredo"],
+                                   stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    workers = []
+    try:
+        deadline = time.monotonic() + 30
+        while not sock.exists():
+            assert coordinator.poll() is None and time.monotonic() < deadline, "o coordenador não abriu o socket"
+            time.sleep(0.1)
+        workers = [subprocess.Popen([sys.executable, RENOMA, "worker", "--connect", listen, "--token", "segredo"],
+                                    stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True) for _ in range(2)]
+        out, _ = coordinator.communicate(timeout=120)
+        assert coordinator.returncode == 0, out
+        # O 'bye' do coordenador encerra os workers na hora, sem esperar um novo pedido.
+        for worker in workers:
+            worker_out, _ = worker.communicate(timeout=10)
+            assert worker.returncode == 0, worker_out
+    finally:
+        for proc in [coordinator, *workers]:
+            if proc.poll() is None: proc.kill(); proc.wait()
+
+    assert "Arquivos convertidos: 4" in out and out.count("Worker conectado") == 2
+    for name in names: assert (media / f"{name}.flac").stat().st_size > 0
+    assert not sock.exists()
+    assert not [p for p in os.listdir(media) if p.startswith(".renoma-stage-")]
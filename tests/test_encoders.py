@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""Escolha do codificador a partir da calibração (sem ffmpeg: resultados de teste injetados)."""
+
+import renoma
+
+def _cpu(preset, fps, size):
+    info = {'name': f'CPU (libx264 - preset {preset})', 'codec': 'libx264', 'preset': preset}
+    return {'ok': True, 'fps': fps, 'size': size, 'info': info}
+
+def _calibrated(monkeypatch, results):
+    monkeypatch.setattr(renoma, 'load_calibration', lambda: results)
+    monkeypatch.setattr(renoma, 'IS_ANDROID', False)
+
+def test_plain_cpu_key_survives_calibration(monkeypatch):
+    _calibrated(monkeypatch, {'cpu:medium': _cpu('medium', 60, 500_000), 'cpu:veryfast': _cpu('veryfast', 150, 560_000)})
+    assert renoma.resolve_encoder('cpu')['preset'] == 'medium'
+    assert renoma.resolve_encoder('cpu:veryfast')['preset'] == 'veryfast'
+
+def test_plain_cpu_key_without_the_default_preset(monkeypatch):
+    _calibrated(monkeypatch, {'cpu:veryfast': _cpu('veryfast', 150, 560_000)})
+    assert renoma.resolve_encoder('cpu')['preset'] == 'medium'
+
+def test_calibration_default_does_not_trade_size_for_speed(monkeypatch):
+    _calibrated(monkeypatch, {'cpu:medium': _cpu('medium', 60, 500_000), 'cpu:fast': _cpu('fast', 80, 540_000),
+                              'cpu:ultrafast': _cpu('ultrafast', 400, 1_500_000)})
+    assert list(renoma.get_available_encoders()) == ['cpu:fast', 'cpu:medium', 'cpu:ultrafast', 'cpu']
+    assert renoma.resolve_encoder()['preset'] == 'fast'
+
+def test_calibration_without_reference_ranks_by_speed(monkeypatch):
+    _calibrated(monkeypatch, {'cpu:ultrafast': _cpu('ultrafast', 400, 1_500_000), 'cpu:fast': _cpu('fast', 80, 540_000)})
+    assert renoma.resolve_encoder()['preset'] == 'ultrafast'
+
+def test_segment_timestamps_flag_follows_the_ffmpeg_version(monkeypatch):
+    for help_text, flag in (("-vsync <>           set video sync method globally\n", "-vsync"),
+                            ("-fps_mode[:<stream_spec>]  set framerate mode\n", "-fps_mode")):
+        monkeypatch.setattr(renoma, '_passthrough_args', None)
+        monkeypatch.setattr(renoma.subprocess, 'check_output', lambda *a, **k: help_text)
+        assert renoma.passthrough_timestamps_args() == [flag, "passthrough"]
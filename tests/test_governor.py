@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""Decisões do governador de recursos (sem ler o host: amostras de teste)."""
+
+import renoma
+
+def sample(load=0.2, free_mb=8000, battery=None, charging=None, temp=None):
+    return {'load': load, 'free_mb': free_mb, 'battery': battery, 'charging': charging, 'temp': temp}
+
+def _governor(**kw):
+    return renoma.ResourceGovernor(3, threads=8, max_load=1.0, min_free_mb=500, min_battery=30, max_temp=42, **kw)
+
+def test_pressure_drops_jobs_then_threads():
+    gov = _governor()
+    levels = [(gov.step(sample(load=2.0)) is not None, gov.limit(), gov.threads()) for _ in range(5)]
+    assert levels == [(True, 2, 8), (True, 1, 8), (True, 1, 4), (True, 1, 2), (True, 1, 1)]
+    assert gov.step(sample(free_mb=100)) is None and (gov.limit(), gov.threads()) == (1, 1)  # já no piso
+
+def test_recovery_is_slow_and_gives_threads_back_first():
+    gov = _governor()
+    for _ in range(3): gov.step(sample(temp=45))
+    assert (gov.limit(), gov.threads()) == (1, 4)
+    reasons = [gov.step(sample()) for _ in range(3 * renoma.GOVERNOR_RAISE_AFTER)]
+    assert reasons.count("folga") == 3 and reasons[renoma.GOVERNOR_RAISE_AFTER - 1] == "folga"
+    assert (gov.limit(), gov.threads()) == (3, 8)
+
+def test_readings_between_the_limits_restart_the_recovery():
+    gov = _governor()
+    gov.step(sample(load=2.0))
+    for _ in range(renoma.GOVERNOR_RAISE_AFTER - 1): gov.step(sample())
+    assert gov.step(sample(load=0.9)) is None  # abaixo do limite, mas sem a margem de 20%
+    for _ in range(renoma.GOVERNOR_RAISE_AFTER - 1): assert gov.step(sample()) is None
+    assert gov.step(sample()) == "folga" and gov.limit() == 3
+
+def test_battery_only_counts_off_the_charger():
+    gov = _governor()
+    assert gov.step(sample(battery=10, charging=True)) is None
+    assert gov.step(sample(battery=10, charging=None)) is None  # estado do carregador desconhecido
+    assert "fora da tomada" in gov.step(sample(battery=10, charging=False))
+
+def test_auto_threads_until_pressure_and_host_reads(monkeypatch):
+    monkeypatch.setattr(renoma, 'default_core_budget', lambda: 8)
+    readings = iter([sample(), sample(load=5.0)])
+    gov = renoma.ResourceGovernor(1, max_load=1.0, read=lambda: next(readings))
+    assert gov.step() is None and gov.threads() is None  # o ffmpeg decide enquanto não há pressão
+    assert gov.step() is not None and gov.threads() == 4
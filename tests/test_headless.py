@@ -0,0 +1,17 @@
+# -*- coding: utf-8 -*-
+"""Arquivos de job do modo não interativo (sem ffmpeg: run_job é substituído)."""
+
+import json
+
+import renoma
+
+def test_job_file_runs_coordinator_and_worker_entries(tmp_path, monkeypatch):
+    ran = []
+    monkeypatch.setattr(renoma, 'run_job', lambda opts: ran.append(opts) or 0)
+    jobs = [{"mode": "coordinator"},
+            {"mode": "coordinator", "coord-mode": "video", "input-ext": "mkv", "output-ext": "mp4"},
+            {"mode": "worker", "connect": "unix:/tmp/renoma.sock"}]
+    (tmp_path / "lote.json").write_text(json.dumps(jobs))
+    assert renoma.run_headless(['job', str(tmp_path / "lote.json")]) == 2
+    assert [(o['mode'], o.get('coord_mode')) for o in ran] == [('coordinator', 'video'), ('worker', None)]
+    assert ran[0]['listen'] == renoma.DEFAULT_LISTEN and ran[1]['jobs'] == 1
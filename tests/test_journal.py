@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""Diário de retomada do lote (sem ffmpeg: probe_media devolve durações de teste)."""
+
+import os
+from types import SimpleNamespace
+
+import pytest
+
+import renoma
+
+@pytest.fixture
+def durations(monkeypatch):
+    """Duração que o 'ffprobe' vê em cada arquivo; ausente = sem stream legível."""
+    seen = {}
+    monkeypatch.setattr(renoma, 'probe_media', lambda path: SimpleNamespace(duration=seen[str(path)]) if str(path) in seen else None)
+    return seen
+
+@pytest.fixture
+def finished(tmp_path, durations):
+    """Um job concluído e registrado: (diário, origem, saída)."""
+    src, dst = tmp_path / "ep01.mkv", tmp_path / "ep01.mp4"
+    src.write_bytes(b"o" * 4096); dst.write_bytes(b"s" * 2048)
+    durations[str(dst)] = 1420.0
+    journal = renoma.BatchJournal(tmp_path / renoma.JOURNAL_FILE)
+    journal.record(src, 'running'); journal.record(src, 'done', [dst])
+    return journal, src, dst
+
+def test_done_job_is_skipped_after_reopening(finished):
+    journal, src, dst = finished
+    assert journal.is_done(src, [dst])
+    with open(journal.path, 'a', encoding='utf-8') as fh: fh.write('{"src": "trunc')  # queda no meio da escrita
+    assert renoma.BatchJournal(journal.path).is_done(src, [dst])
+
+def test_unfinished_job_is_not_done(tmp_path, finished):
+    journal, src, dst = finished
+    other = tmp_path / "ep02.mkv"; other.write_bytes(b"o")
+    journal.record(other, 'running')
+    assert not renoma.BatchJournal(journal.path).is_done(other, [tmp_path / "ep02.mp4"])
+    assert not journal.is_done(src, [dst, tmp_path / "ep01.srt"])  # saída que o diário não conhece
+
+def test_rewritten_source_is_redone(finished):
+    journal, src, dst = finished
+    st = os.stat(src)
+    os.utime(src, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))  # mesmo tamanho, mtime novo
+    assert not journal.is_done(src, [dst])
+
+def test_missing_or_truncated_output_is_redone(finished):
+    journal, src, dst = finished
+    dst.write_bytes(b"s" * 1024)
+    assert not journal.is_done(src, [dst])
+    dst.unlink()
+    assert not journal.is_done(src, [dst])
+
+def test_output_with_other_duration_is_redone(finished, durations):
+    journal, src, dst = finished
+    durations[str(dst)] = 1420.4
+    assert journal.is_done(src, [dst])  # dentro da tolerância de 0,5 s
+    durations[str(dst)] = 900.0
+    assert not journal.is_done(src, [dst])
+    del durations[str(dst)]
+    assert not journal.is_done(src, [dst])
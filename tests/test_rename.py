@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""Ordem das renomeações, diário de desfazer e queda no meio do lote (sem ffmpeg)."""
+
+import json
+
+import pytest
+
+import renoma
+
+def _folder(tmp_path, names):
+    """Pasta com um arquivo por nome; o conteúdo é o próprio nome, para saber quem foi parar onde."""
+    folder = tmp_path / "temporada"
+    folder.mkdir()
+    for name in names: (folder / name).write_text(name)
+    return folder
+
+def _contents(folder):
+    return {p.name: p.read_text() for p in folder.iterdir() if not p.name.startswith('.')}
+
+def _apply(tmp_path, folder, renames):
+    undo = tmp_path / renoma.UNDO_FILE
+    errors = renoma.apply_renames({str(folder): renames}, undo_path=undo)
+    return errors, undo
+
+def test_chain_runs_from_the_free_end():
+    groups, blocked = renoma.order_renames({'a': 'b', 'b': 'c'}, {'a', 'b'})
+    assert groups == [[('b', 'c'), ('a', 'b')]] and not blocked
+
+def test_swap_and_three_cycle_go_through_a_temporary_name():
+    (swap,), _ = renoma.order_renames({'a': 'b', 'b': 'a'}, {'a', 'b'})
+    assert len(swap) == 3 and swap[0][1].startswith(renoma.RENAME_TMP_PREFIX) and swap[-1] == (swap[0][1], 'b')
+    (cycle,), _ = renoma.order_renames({'a': 'b', 'b': 'c', 'c': 'a'}, {'a', 'b', 'c'})
+    assert len(cycle) == 4 and [dst for _, dst in cycle[1:]] == ['a', 'c', 'b']
+
+def test_target_held_by_an_unrelated_file_blocks_the_whole_chain():
+    groups, blocked = renoma.order_renames({'a': 'b', 'b': 'x', 'c': 'd'}, {'a', 'b', 'c', 'x'})
+    assert groups == [[('c', 'd')]] and blocked == {'b': 'x', 'a': 'b'}
+
+def test_names_that_differ_only_in_case_are_the_same_file():
+    renames = {'a.mkv': 'Show S01E01.mkv', 'show s01e01.mkv': 'Show S01E02.mkv'}
+    groups, blocked = renoma.order_renames(renames, {'a.mkv', 'show s01e01.mkv'})
+    assert groups == [[('show s01e01.mkv', 'Show S01E02.mkv'), ('a.mkv', 'Show S01E01.mkv')]] and not blocked
+    # Troca só de maiúsculas: passa por um temporário (um rename direto não muda nada em FAT/NTFS).
+    (steps,), _ = renoma.order_renames({'show.mkv': 'Show.mkv'}, {'show.mkv'})
+    assert len(steps) == 2 and steps[0][1].startswith(renoma.RENAME_TMP_PREFIX) and steps[1][1] == 'Show.mkv'
+
+def test_apply_and_undo_restore_every_file(tmp_path):
+    folder = _folder(tmp_path, ['a', 'b', 'c', 'd', 'keep'])
+    before = _contents(folder)
+    errors, undo = _apply(tmp_path, folder, {'a': 'b', 'b': 'a', 'c': 'e', 'd': 'keep'})
+    assert errors == 1  # 'keep' é de outro arquivo
+    assert _contents(folder) == {'a': 'b', 'b': 'a', 'e': 'c', 'd': 'd', 'keep': 'keep'}
+    assert renoma.undo_renames(undo) == 0
+    assert _contents(folder) == before and not undo.exists()
+
+def test_undo_after_a_crash_between_journal_write_and_rename(tmp_path, monkeypatch):
+    folder = _folder(tmp_path, ['a', 'b', 'c'])
+    before = _contents(folder)
+    real_rename, calls = renoma.os.rename, [0]
+
+    class Crash(BaseException):
+        pass
+
+    def _rename(src, dst):
+        calls[0] += 1
+        if calls[0] == 3: raise Crash  # o passo já está no diário, o rename nunca acontece
+        real_rename(src, dst)
+    monkeypatch.setattr(renoma.os, 'rename', _rename)
+    with pytest.raises(Crash):
+        _apply(tmp_path, folder, {'a': 'b', 'b': 'c', 'c': 'a'})
+    monkeypatch.setattr(renoma.os, 'rename', real_rename)
+
+    undo = tmp_path / renoma.UNDO_FILE
+    steps = [json.loads(line) for line in undo.read_text().splitlines()]
+    assert len(steps) == 3  # dois executados e um só registrado
+    assert renoma.undo_renames(undo) == 0
+    assert _contents(folder) == before
+    assert not [p for p in folder.iterdir() if p.name.startswith(renoma.RENAME_TMP_PREFIX)]
+
+def test_failed_rename_is_cancelled_in_the_journal(tmp_path, monkeypatch):
+    folder = _folder(tmp_path, ['a'])
+    def _rename(src, dst): raise PermissionError("somente leitura")
+    monkeypatch.setattr(renoma.os, 'rename', _rename)
+    errors, undo = _apply(tmp_path, folder, {'a': 'b'})
+    monkeypatch.undo()
+    assert errors == 1
+    assert [json.loads(line).get('cancelled') for line in undo.read_text().splitlines()] == [None, True]
+    assert renoma.undo_renames(undo) == 0 and _contents(folder) == {'a': 'a'}
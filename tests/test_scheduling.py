@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""Histórico de vazão e ordem dos jobs do lote (sem ffmpeg: probe_media devolve mídias de teste)."""
+
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+import renoma
+
+@pytest.fixture
+def media(monkeypatch):
+    """nome -> (duração, altura); altura 0 = só áudio."""
+    known = {}
+    def probe(path):
+        duration, height = known[Path(path).name]
+        return SimpleNamespace(duration=duration, video_streams=[{'height': height}] if height else [])
+    monkeypatch.setattr(renoma, 'probe_media', probe)
+    return known
+
+def test_rate_decays_old_runs(tmp_path):
+    history = renoma.ThroughputHistory(tmp_path / "throughput.sqlite")
+    assert history.rate('libx264', 1080) is None
+    history.record('libx264', 1080, 600, 300)
+    assert history.rate('libx264', 1080) == pytest.approx(2.0)
+    history.record('libx264', 1080, 600, 100)  # máquina nova, bem mais rápida: o antigo pesa THROUGHPUT_DECAY
+    decay = renoma.THROUGHPUT_DECAY
+    assert history.rate('libx264', 1080) == pytest.approx((600 * decay + 600) / (300 * decay + 100))
+    assert history.rate('h264_nvenc', 1080) is None
+
+def test_rate_scales_from_the_nearest_resolution(tmp_path):
+    history = renoma.ThroughputHistory(tmp_path / "throughput.sqlite")
+    history.record('libx264', 720, 900, 300)
+    assert history.rate('libx264', 1080) == pytest.approx(3.0 * (720 / 1080) ** 2)
+    history.record('libx264', 1080, 600, 600)
+    assert history.rate('libx264', 1080) == pytest.approx(1.0)
+    assert history.rate('libx264', 2160) == pytest.approx(1.0 / 4)
+
+def test_order_by_duration_times_area(media):
+    media.update({'ep01.mkv': (1200, 480), 'ep02.mkv': (600, 1080), 'ep03.mkv': (2400, 360), 'podcast.flac': (3000, 0)})
+    files = [Path(n) for n in media]
+    assert renoma.order_jobs(files) is files
+    assert [f.name for f in renoma.order_jobs(files, 'longest')] == ['ep02.mkv', 'podcast.flac', 'ep03.mkv', 'ep01.mkv']
+    assert [f.name for f in renoma.order_jobs(files, 'shortest')] == ['ep01.mkv', 'ep03.mkv', 'podcast.flac', 'ep02.mkv']
+    with pytest.raises(ValueError): renoma.order_jobs(files, 'random')
+
+def test_history_only_ranks_when_every_file_has_a_prediction(media):
+    media.update({'a.mkv': (600, 1080), 'b.mkv': (1200, 1080)})
+    files = [Path('a.mkv'), Path('b.mkv')]
+    predicted = {'a.mkv': 900, 'b.mkv': 100}
+    assert [f.name for f in renoma.order_jobs(files, 'longest', lambda f: predicted[f.name])] == ['a.mkv', 'b.mkv']
+    del predicted['b.mkv']  # sem previsão para um deles: volta ao substituto para todos
+    assert [f.name for f in renoma.order_jobs(files, 'longest', lambda f: predicted.get(f.name))] == ['b.mkv', 'a.mkv']
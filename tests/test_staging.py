@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+"""Pastas de preparo abandonadas por execuções que morreram (sem ffmpeg)."""
+
+import os
+import platform
+import subprocess
+import sys
+
+import renoma
+
+def _dead_pid():
+    proc = subprocess.Popen([sys.executable, "-c", "pass"]); proc.wait()
+    return proc.pid
+
+def test_sweep_removes_only_stages_of_dead_local_processes(tmp_path):
+    node = platform.node()
+    names = {'dead': f"{renoma.STAGE_PREFIX}{node}-{_dead_pid()}-abc", 'alive': f"{renoma.STAGE_PREFIX}{node}-{os.getppid()}-abc",
+             'other_host': f"{renoma.STAGE_PREFIX}outra-maquina-{_dead_pid()}-abc", 'legacy': f"{renoma.STAGE_PREFIX}abc123"}
+    for name in names.values(): (tmp_path / name).mkdir(); (tmp_path / name / "ep01.mkv").write_text("x")
+    renoma.sweep_stale_stages(tmp_path)
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted(v for k, v in names.items() if k != 'dead')
+
+def test_staged_job_leaves_a_sweepable_stage(tmp_path):
+    src = tmp_path / "ep01.mkv"; src.write_text("origem")
+    seen = []
+    def convert(staged):
+        seen.append(staged.parent.name); (staged.parent / "ep01.mp4").write_text("saída"); return True
+    assert renoma.run_staged(src, [tmp_path / "ep01.mp4"], convert) is True
+    assert seen[0].startswith(f"{renoma.STAGE_PREFIX}{platform.node()}-{os.getpid()}-")
+    assert (tmp_path / "ep01.mp4").read_text() == "saída" and not (tmp_path / seen[0]).exists()
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""Espera de estabilidade do modo watch (sem ffmpeg nem inotify: watcher e relógio de teste)."""
+
+import threading
+from types import SimpleNamespace
+
+import renoma
+
+class ScriptedWatcher:
+    """
+    Cada poll avança o relógio pelo timeout pedido (5 s ocioso, 1 s com arquivos aguardando)
+    e executa o passo do roteiro marcado para aquele segundo.
+    """
+
+    def __init__(self, folder, clock, script, stop, until):
+        self.folder, self.clock, self.script, self.stop, self.until = folder, clock, script, stop, until
+        self.closed = False
+
+    def watch_tree(self, path):
+        return [str(p) for p in self.folder.iterdir()]
+
+    def poll(self, timeout):
+        self.clock[0] += timeout
+        if self.clock[0] >= self.until: self.stop.set()
+        return [str(self.folder / name) for name in self.script.pop(round(self.clock[0]), lambda: [])()]
+
+    def close(self):
+        self.closed = True
+
+def _watch(monkeypatch, folder, script, until=60, settle=10):
+    """Arquivos liberados, cada um com o segundo (do relógio de teste) em que saiu."""
+    clock, stop = [0.0], threading.Event()
+    watcher = ScriptedWatcher(folder, clock, script, stop, until)
+    monkeypatch.setattr(renoma, 'make_watcher', lambda recursive, polling: watcher)
+    monkeypatch.setattr(renoma, 'time', SimpleNamespace(monotonic=lambda: clock[0]))
+    released = [(p.name, round(clock[0])) for p in renoma.watch_ready_files([str(folder)], 'mkv', settle=settle, poll_interval=5, stop=stop)]
+    assert watcher.closed and not script  # todos os passos do roteiro aconteceram
+    return released
+
+def _write(path, size):
+    def step():
+        path.write_bytes(b"x" * size); return [path.name]
+    return step
+
+def test_existing_file_waits_for_settle(tmp_path, monkeypatch):
+    (tmp_path / "ep01.mkv").write_bytes(b"x" * 100)
+    (tmp_path / "ep01.srt").write_bytes(b"x" * 100)
+    (tmp_path / ".ep02.mkv.part").write_bytes(b"x" * 100)
+    assert _watch(monkeypatch, tmp_path, {}) == [("ep01.mkv", 10)]
+
+def test_growing_file_restarts_the_wait(tmp_path, monkeypatch):
+    new = tmp_path / "ep02.mkv"
+    script = {5: _write(new, 100), 8: _write(new, 200), 15: _write(new, 300)}
+    assert _watch(monkeypatch, tmp_path, script) == [("ep02.mkv", 25)]
+
+def test_empty_file_is_held_until_it_has_data(tmp_path, monkeypatch):
+    new = tmp_path / "ep03.mkv"
+    assert _watch(monkeypatch, tmp_path, {5: _write(new, 0), 30: _write(new, 100)}) == [("ep03.mkv", 40)]
+
+def test_repeated_event_does_not_release_twice(tmp_path, monkeypatch):
+    done = tmp_path / "ep04.mkv"; done.write_bytes(b"x" * 100)
+    script = {20: lambda: [done.name], 35: _write(done, 500)}
+    assert _watch(monkeypatch, tmp_path, script) == [("ep04.mkv", 10), ("ep04.mkv", 45)]